@@ -0,0 +1,358 @@
+"""
+anomaly_batch.py - Columnar Anomaly Results
+===========================================
+Array-backed batches of anomalies and root cause drivers, built straight
+from detector and analyzer frames as typed columns, and written by the connector without per-record dictionaries.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+def _objects(values: Any) -> np.ndarray:
+    """Values as a 1-D object array (strings stay Python strings)."""
+    return np.asarray(values, dtype=object).reshape(-1)
+
+
+def _names(values: Any) -> np.ndarray:
+    """
+    Values as str() of each, like the per-row records (None -> 'None');
+    Series.astype(str) keeps missing values as NaN under pandas 3, so
+    only those are converted one by one.
+    """
+    values = pd.Series(_objects(values), dtype=object)
+    names = values.astype(str).to_numpy(dtype=object)
+    missing = np.flatnonzero(values.isna().to_numpy())
+    names[missing] = [str(value) for value in values.to_numpy()[missing]]
+    return names
+
+
+def _rounded(values: Any, places: int) -> np.ndarray:
+    """
+    Values rounded like the per-row records' round(float(x), places);
+    np.round scales by 10**places first and differs on decimal ties.
+    """
+    values = np.asarray(values, dtype=np.float64).tolist()
+    return np.array([round(value, places) for value in values], dtype=np.float64)
+
+
+class AnomalyBatch:
+    """
+    Anomalies as typed columns, rounded as anomaly_log stores them.
+
+    Values are rounded to the stored precision: cents for values and
+    deviations, 4 places for the Z-score. Each (kpi_name, metric_date)
+    appears once, so ids returned by the database map back to rows.
+    """
+
+    __slots__ = (
+        'kpi_name', 'metric_date', 'expected_value', 'actual_value',
+        'deviation_percent', 'z_score', 'severity'
+    )
+
+    def __init__(
+        self,
+        kpi_name: np.ndarray,
+        metric_date: np.ndarray,
+        expected_value: np.ndarray,
+        actual_value: np.ndarray,
+        deviation_percent: np.ndarray,
+        z_score: np.ndarray,
+        severity: np.ndarray
+    ):
+        """
+        Wrap equal-length columns (use from_frame / from_records to build).
+
+        Args:
+            kpi_name: KPI names (object)
+            metric_date: Dates (datetime64[D])
+            expected_value: Rolling baseline, rounded to 2 places
+            actual_value: Observed value, rounded to 2 places
+            deviation_percent: Deviation from baseline, rounded to 2 places
+            z_score: Signed score, rounded to 4 places
+            severity: Severity labels (object)
+        """
+        self.kpi_name = kpi_name
+        self.metric_date = metric_date
+        self.expected_value = expected_value
+        self.actual_value = actual_value
+        self.deviation_percent = deviation_percent
+        self.z_score = z_score
+        self.severity = severity
+
+    @classmethod
+    def from_frame(cls, anomalies: pd.DataFrame, kpi: Optional[str] = None) -> "AnomalyBatch":
+        """
+        Build from detector output (detect_many / update format).
+
+        Args:
+            anomalies: Anomaly rows
+            kpi: KPI name for every row (default: the kpi_name column)
+
+        Returns:
+            AnomalyBatch: The rows, rounded and typed
+        """
+        n = len(anomalies)
+        kpi_name = (
+            np.full(n, kpi, dtype=object) if kpi is not None
+            else _objects(anomalies['kpi_name'])
+        )
+
+        def rounded(column: str, places: int) -> np.ndarray:
+            return _rounded(anomalies[column].to_numpy(dtype=np.float64), places)
+
+        return cls(
+            kpi_name=kpi_name,
+            metric_date=pd.to_datetime(anomalies['metric_date']).to_numpy().astype('datetime64[D]'),
+            expected_value=rounded('expected_value', 2),
+            actual_value=rounded('actual_value', 2),
+            deviation_percent=rounded('deviation_percent', 2),
+            z_score=rounded('z_score', 4),
+            severity=_objects(anomalies['severity']),
+        )
+
+    @classmethod
+    def from_records(cls, records: Sequence[Dict[str, Any]]) -> "AnomalyBatch":
+        """
+        Build from anomaly dictionaries as for log_anomaly.
+
+        Args:
+            records: Anomaly records
+
+        Returns:
+            AnomalyBatch: The records as columns
+        """
+        frame = pd.DataFrame.from_records(list(records), columns=[
+            'kpi_name', 'metric_date', 'expected_value', 'actual_value',
+            'deviation_percent', 'z_score', 'severity'
+        ])
+        return cls.from_frame(frame)
+
+    @classmethod
+    def concat(cls, batches: Sequence["AnomalyBatch"]) -> "AnomalyBatch":
+        """
+        Stack batches in order.
+
+        Args:
+            batches: Batches to stack
+
+        Returns:
+            AnomalyBatch: One batch with every row
+        """
+        if not batches:
+            return cls.from_records([])
+        return cls(*(
+            np.concatenate([getattr(batch, column) for batch in batches])
+            for column in cls.__slots__
+        ))
+
+    def __len__(self) -> int:
+        return len(self.kpi_name)
+
+    def dates(self) -> List[Any]:
+        """Metric dates as datetime.date objects."""
+        return self.metric_date.astype(object).tolist()
+
+    def keys(self) -> List[Tuple[str, Any]]:
+        """(kpi_name, metric_date) of every row, dates as datetime.date."""
+        return list(zip(self.kpi_name.tolist(), self.dates()))
+
+    def rows(self) -> List[Tuple[Any, ...]]:
+        """
+        Parameter tuples in ANOMALY_COLUMNS order with plain Python values.
+
+        Returns:
+            List: (metric_date, kpi_type, anomaly_score, expected_value,
+                actual_value, deviation_percent, severity) per row
+        """
+        return list(zip(
+            self.dates(),
+            self.kpi_name.tolist(),
+            self.z_score.tolist(),
+            self.expected_value.tolist(),
+            self.actual_value.tolist(),
+            self.deviation_percent.tolist(),
+            self.severity.tolist(),
+        ))
+
+
+class DriverBatch:
+    """
+    Root cause drivers as typed columns, each pointing at its anomaly's
+    row in an AnomalyBatch and grouped by that row (in ranked order).
+    """
+
+    __slots__ = (
+        'anomaly_index', 'driver_type', 'entity_id', 'entity_name',
+        'contribution_percent', 'impact_value'
+    )
+
+    def __init__(
+        self,
+        anomaly_index: np.ndarray,
+        driver_type: np.ndarray,
+        entity_id: np.ndarray,
+        entity_name: np.ndarray,
+        contribution_percent: np.ndarray,
+        impact_value: np.ndarray
+    ):
+        """
+        Wrap equal-length columns (use from_frame / from_records to build).
+
+        Args:
+            anomaly_index: Row of each driver's anomaly (int64, ascending)
+            driver_type: Dimension names (object)
+            entity_id: Entity ids (int64)
+            entity_name: Entity names (object, str)
+            contribution_percent: Share of the change, rounded to 2 places
+            impact_value: Change in the KPI, rounded to 2 places
+        """
+        self.anomaly_index = anomaly_index
+        self.driver_type = driver_type
+        self.entity_id = entity_id
+        self.entity_name = entity_name
+        self.contribution_percent = contribution_percent
+        self.impact_value = impact_value
+
+    @classmethod
+    def from_frame(
+        cls,
+        drivers: Optional[pd.DataFrame],
+        anomalies: AnomalyBatch
+    ) -> "DriverBatch":
+        """
+        Build from find_root_causes_batch output for one KPI's anomalies.
+
+        Drivers are matched to anomalies by anomaly_date; drivers of dates
+        not in the batch are dropped.
+
+        Args:
+            drivers: Long-format drivers (anomaly_date, driver_type,
+                entity_id, entity_name, contribution_percent, impact_value),
+                or None
+            anomalies: The KPI's anomalies the drivers explain
+
+        Returns:
+            DriverBatch: The drivers, rounded and typed
+        """
+        if drivers is None or drivers.empty:
+            return cls.empty()
+
+        dates = pd.to_datetime(drivers['anomaly_date']).to_numpy().astype('datetime64[D]')
+        index = pd.Index(anomalies.metric_date).get_indexer(dates)
+        keep = index >= 0
+
+        # Stable, so each anomaly keeps its drivers' ranked order
+        order = np.argsort(index[keep], kind='stable')
+        picked = np.flatnonzero(keep)[order]
+
+        def rounded(column: str) -> np.ndarray:
+            return _rounded(drivers[column].to_numpy(dtype=np.float64)[picked], 2)
+
+        return cls(
+            anomaly_index=index[picked].astype(np.int64),
+            driver_type=_objects(drivers['driver_type'])[picked],
+            entity_id=drivers['entity_id'].to_numpy().astype(np.int64)[picked],
+            entity_name=_names(drivers['entity_name'].to_numpy()[picked]),
+            contribution_percent=rounded('contribution_percent'),
+            impact_value=rounded('impact_value'),
+        )
+
+    @classmethod
+    def from_records(cls, drivers_per_anomaly: Sequence[List[Dict[str, Any]]]) -> "DriverBatch":
+        """
+        Build from per-anomaly driver dictionaries as for log_root_causes.
+
+        Args:
+            drivers_per_anomaly: Driver records for each anomaly row, in row
+                order
+
+        Returns:
+            DriverBatch: The drivers as columns
+        """
+        counts = [len(drivers) for drivers in drivers_per_anomaly]
+        flat = [d for drivers in drivers_per_anomaly for d in drivers]
+        if not flat:
+            return cls.empty()
+
+        frame = pd.DataFrame.from_records(flat)
+        return cls(
+            anomaly_index=np.repeat(np.arange(len(counts), dtype=np.int64), counts),
+            driver_type=_objects(frame['driver_type']),
+            entity_id=frame['entity_id'].to_numpy().astype(np.int64),
+            entity_name=_names(frame['entity_name']),
+            contribution_percent=_rounded(frame['contribution_percent'], 2),
+            impact_value=_rounded(frame['impact_value'], 2),
+        )
+
+    @classmethod
+    def empty(cls) -> "DriverBatch":
+        """A batch without drivers."""
+        return cls(
+            np.empty(0, dtype=np.int64), np.empty(0, dtype=object),
+            np.empty(0, dtype=np.int64), np.empty(0, dtype=object),
+            np.empty(0), np.empty(0)
+        )
+
+    @classmethod
+    def concat(
+        cls,
+        batches: Sequence["DriverBatch"],
+        anomaly_counts: Sequence[int]
+    ) -> "DriverBatch":
+        """
+        Stack batches whose anomaly batches were stacked in the same order.
+
+        Args:
+            batches: Driver batches
+            anomaly_counts: Rows of each batch's anomaly batch
+
+        Returns:
+            DriverBatch: One batch pointing into the stacked anomalies
+        """
+        if not batches:
+            return cls.empty()
+
+        offsets = np.concatenate([[0], np.cumsum(anomaly_counts)[:-1]]).astype(np.int64)
+        columns = {
+            column: np.concatenate([getattr(batch, column) for batch in batches])
+            for column in cls.__slots__[1:]
+        }
+        anomaly_index = np.concatenate([
+            batch.anomaly_index + offset for batch, offset in zip(batches, offsets)
+        ])
+        return cls(anomaly_index=anomaly_index, **columns)
+
+    def __len__(self) -> int:
+        return len(self.anomaly_index)
+
+    def counts(self, n_anomalies: int) -> np.ndarray:
+        """Drivers per anomaly row."""
+        return np.bincount(self.anomaly_index, minlength=n_anomalies)
+
+    def for_anomaly(self, row: int) -> slice:
+        """Positions of one anomaly row's drivers."""
+        lo, hi = np.searchsorted(self.anomaly_index, [row, row + 1])
+        return slice(int(lo), int(hi))
+
+    def rows(self, anomaly_ids: np.ndarray) -> List[Tuple[Any, ...]]:
+        """
+        Parameter tuples in DRIVER_COLUMNS order with plain Python values.
+
+        Args:
+            anomaly_ids: anomaly_id of every row of the anomaly batch
+
+        Returns:
+            List: (anomaly_id, driver_type, driver_entity_id,
+                driver_entity_name, contribution_percent, impact_value)
+        """
+        return list(zip(
+            np.asarray(anomaly_ids, dtype=np.int64)[self.anomaly_index].tolist(),
+            self.driver_type.tolist(),
+            self.entity_id.tolist(),
+            self.entity_name.tolist(),
+            self.contribution_percent.tolist(),
+            self.impact_value.tolist(),
+        ))
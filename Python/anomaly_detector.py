@@ -1,30 +1,408 @@
 """
 anomaly_detector.py - Anomaly Detection
 ========================================
-Statistical anomaly detection using Z-score method.
+Statistical anomaly detection using Z-score method (rolling mean/std,
+or robust rolling median/MAD).
 """
 
+import json
+import os
+
 import pandas as pd
 import numpy as np
-from typing import Optional
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from config import (
+    SENSITIVITY_THRESHOLDS,
+    SEVERITY_THRESHOLDS,
+    ROLLING_WINDOW_DAYS,
+    DETECTION_METHOD,
+    NUMPY_DETECTION_KERNEL,
+    DETECTOR_STATE_PATH,
+    SEGMENT_CHUNK_SERIES,
+)
+
+
+def _rolling_mean_std(
+    values: np.ndarray,
+    window: int,
+    min_periods: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Trailing rolling mean and sample std down the rows of a 2-D array.
+    
+    Matches pandas rolling(window, min_periods).mean()/.std() column by
+    column: NaN values are skipped and rows with fewer than min_periods
+    observations in their window are NaN.
+    
+    Args:
+        values: (dates × series) float array
+        window: Window length in rows
+        min_periods: Minimum observations required
+        
+    Returns:
+        Tuple: (rolling_mean, rolling_std) arrays shaped like values
+    """
+    n, k = values.shape
+    padded = np.full((n + window - 1, k), np.nan)
+    padded[window - 1:] = values
+    
+    # (dates × series × window) view, no copy
+    windows = sliding_window_view(padded, window, axis=0)
+    observed = ~np.isnan(windows)
+    count = observed.sum(axis=2)
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = np.where(observed, windows, 0.0).sum(axis=2) / count
+        deviations = np.where(observed, windows - mean[:, :, None], 0.0)
+        std = np.sqrt((deviations ** 2).sum(axis=2) / (count - 1))
+    
+    mean[count < min_periods] = np.nan
+    std[(count < min_periods) | (count < 2)] = np.nan
+    
+    return mean, std
+
+
+def _rolling_mean_std_1d(
+    values: np.ndarray,
+    window: int,
+    min_periods: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Trailing rolling mean and sample std of one series.
+    
+    Runs pandas' rolling aggregations (running sums updated as rows enter
+    and leave the window) straight on the float array, so the statistics
+    are identical to rolling(window, min_periods).mean()/.std() on the
+    DataFrame column, without building the frame's columns.
+    
+    Args:
+        values: 1-D float array
+        window: Window length in rows
+        min_periods: Minimum observations required
+        
+    Returns:
+        Tuple: (rolling_mean, rolling_std) arrays shaped like values
+    """
+    rolling = pd.Series(values, copy=False).rolling(window=window, min_periods=min_periods)
+    return rolling.mean().to_numpy(), rolling.std().to_numpy()
+
+
+# Severity levels above 'low' by ascending threshold, and every label
+_SEVERITY_LEVELS = sorted(
+    (value, name) for name, value in SEVERITY_THRESHOLDS.items() if name != 'low'
+)
+_SEVERITY_BOUNDS = np.array([value for value, _ in _SEVERITY_LEVELS])
+_SEVERITY_LABELS = pd.Series(['low'] + [name for _, name in _SEVERITY_LEVELS]).array
+
+
+def _severity_labels(z_scores: np.ndarray) -> Any:
+    """
+    Severity of many Z-scores at once (vectorized _classify_severity).
+    
+    Args:
+        z_scores: Z-score array
+        
+    Returns:
+        Severity labels, 'low' below every threshold, as an array of the
+        dtype pandas infers for strings
+    """
+    abs_z = np.abs(z_scores)
+    level = np.searchsorted(_SEVERITY_BOUNDS, abs_z, side='right')
+    level[np.isnan(abs_z)] = 0
+    return _SEVERITY_LABELS.take(level)
+
+
+# Scales the MAD to a standard deviation estimate for normal data
+MAD_SCALE = 1.4826
+
+# Window cells sorted per block in the rolling median/MAD (bounds its
+# temporaries)
+MEDIAN_BLOCK_CELLS = 1 << 22
+
+
+def _middle(ordered: np.ndarray, count: np.ndarray) -> np.ndarray:
+    """
+    Median of each sorted window whose first count entries are observed.
+    
+    Args:
+        ordered: (... × window) array sorted along the last axis, NaN last
+        count: Observed values per window
+        
+    Returns:
+        np.ndarray: Mean of the two middle order statistics per window
+    """
+    c = np.maximum(count, 1)[..., None]
+    lower = np.take_along_axis(ordered, (c - 1) // 2, axis=-1)[..., 0]
+    upper = np.take_along_axis(ordered, c // 2, axis=-1)[..., 0]
+    return (lower + upper) / 2
+
+
+def _rolling_median_mad(
+    values: np.ndarray,
+    window: int,
+    min_periods: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Trailing rolling median and scaled MAD down the rows of a 2-D array.
+    
+    The median matches pandas rolling(window, min_periods).median(); the
+    MAD is the median absolute deviation from it, times MAD_SCALE. NaN
+    values are skipped like in _rolling_mean_std.
+    
+    Every window is sorted along a sliding_window_view, across all series
+    at once, in blocks of series and dates of at most MEDIAN_BLOCK_CELLS
+    window cells; the deviations from each median are sorted the same way.
+    
+    Args:
+        values: (dates × series) float array
+        window: Window length in rows
+        min_periods: Minimum observations required
+        
+    Returns:
+        Tuple: (rolling_median, rolling_scaled_mad) arrays shaped like values
+    """
+    n, k = values.shape
+    median = np.full((n, k), np.nan)
+    mad = np.full((n, k), np.nan)
+    count = np.zeros((n, k), dtype=np.int64)
+    
+    if n == 0 or k == 0:
+        return median, mad
+    
+    padded = np.full((n + window - 1, k), np.nan)
+    padded[window - 1:] = values
+    
+    # (dates × series × window) view, no copy
+    windows = sliding_window_view(padded, window, axis=0)
+    
+    cols = max(1, min(k, MEDIAN_BLOCK_CELLS // (window * max(n, 1))))
+    rows = max(1, MEDIAN_BLOCK_CELLS // (window * cols))
+    
+    for c0 in range(0, k, cols):
+        for r0 in range(0, n, rows):
+            block = (slice(r0, r0 + rows), slice(c0, c0 + cols))
+            
+            ordered = np.sort(windows[block], axis=-1)
+            observed = (~np.isnan(ordered)).sum(axis=-1)
+            m = _middle(ordered, observed)
+            
+            deviations = np.sort(np.abs(ordered - m[..., None]), axis=-1)
+            median[block] = m
+            mad[block] = _middle(deviations, observed)
+            count[block] = observed
+    
+    median[count < min_periods] = np.nan
+    mad[(count < min_periods) | (count < 2)] = np.nan
+    
+    return median, mad * MAD_SCALE
+
+
+def _daily_totals(
+    df: pd.DataFrame,
+    kpi_columns: List[str],
+    date_column: str
+) -> pd.DataFrame:
+    """
+    Per-date KPI sums, accumulated in float64.
+    
+    Equivalent to df.groupby(date_column)[kpi_columns].sum(), but measures
+    stored as float32 are summed at full precision and only one column is
+    upcast at a time.
+    
+    Args:
+        df: DataFrame with date and KPI columns
+        kpi_columns: KPI columns to sum
+        date_column: Name of date column
+        
+    Returns:
+        pd.DataFrame: KPI sums indexed by sorted date
+    """
+    codes, dates = pd.factorize(df[date_column], sort=True)
+    valid = codes >= 0
+    codes = codes[valid]
+    
+    totals = {
+        kpi: np.bincount(
+            codes,
+            weights=np.nan_to_num(df[kpi].to_numpy(dtype=np.float64)[valid]),
+            minlength=len(dates)
+        )
+        for kpi in kpi_columns
+    }
+    
+    return pd.DataFrame(totals, index=pd.Index(dates, name=date_column))
+
+
+class RollingWindowState:
+    """
+    Rolling window state for one KPI series.
+    
+    Ring buffer of the last `window` daily values (and their dates) plus a
+    running sum, so a new point is scored in O(window) without the history.
+    """
+
+    def __init__(self, window: int):
+        """
+        Initialize an empty window.
+        
+        Args:
+            window: Window length in days
+        """
+        self.window = window
+        self.values = np.zeros(window)
+        self.dates = np.full(window, np.datetime64('NaT'), dtype='datetime64[ns]')
+        self.head = 0  # Next slot to overwrite
+        self.count = 0
+        self.total = 0.0
+
+    def push(self, date: Any, value: float) -> None:
+        """
+        Append a point, evicting the oldest once the window is full.
+        
+        Args:
+            date: Date of the point
+            value: KPI value
+        """
+        if self.count == self.window:
+            self.total -= self.values[self.head]
+        else:
+            self.count += 1
+        
+        self.values[self.head] = value
+        self.dates[self.head] = np.datetime64(pd.Timestamp(date), 'ns')
+        self.total += value
+        self.head = (self.head + 1) % self.window
+
+    @property
+    def last_date(self) -> Optional[pd.Timestamp]:
+        """Date of the most recent point, if any."""
+        if self.count == 0:
+            return None
+        return pd.Timestamp(self.dates[(self.head - 1) % self.window])
+
+    def chronological(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Window contents oldest first.
+        
+        Returns:
+            Tuple: (dates, values) arrays of length count
+        """
+        order = (self.head - self.count + np.arange(self.count)) % self.window
+        return self.dates[order], self.values[order]
+
+    def mean_std(self) -> Tuple[float, float]:
+        """
+        Mean and sample std of the current window.
+        
+        Returns:
+            Tuple: (mean, std); std is NaN with fewer than 2 points
+        """
+        if self.count == 0:
+            return np.nan, np.nan
+        
+        mean = self.total / self.count
+        
+        if self.count < 2:
+            return mean, np.nan
+        
+        # Two-pass variance around the running mean for stability
+        _, values = self.chronological()
+        var = np.sum((values - mean) ** 2) / (self.count - 1)
+        
+        return mean, float(np.sqrt(var))
+
+    def median_mad(self) -> Tuple[float, float]:
+        """
+        Median and scaled MAD of the current window.
+        
+        Returns:
+            Tuple: (median, MAD × MAD_SCALE); MAD is NaN with fewer than 2 points
+        """
+        if self.count == 0:
+            return np.nan, np.nan
+        
+        _, values = self.chronological()
+        median = float(np.median(values))
+        
+        if self.count < 2:
+            return median, np.nan
+        
+        return median, float(np.median(np.abs(values - median)) * MAD_SCALE)
 
-from config import SENSITIVITY_THRESHOLDS, SEVERITY_THRESHOLDS, ROLLING_WINDOW_DAYS
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize window contents for a checkpoint."""
+        dates, values = self.chronological()
+        return {
+            'dates': [str(pd.Timestamp(d).date()) for d in dates],
+            'values': values.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, window: int, data: Dict[str, Any]) -> "RollingWindowState":
+        """
+        Restore a window from a checkpoint; running sum is recomputed.
+        
+        Args:
+            window: Window length in days
+            data: Output of to_dict()
+            
+        Returns:
+            RollingWindowState: Restored state
+        """
+        state = cls(window)
+        for date, value in zip(data['dates'], data['values']):
+            state.push(date, float(value))
+        return state
 
 
 class KPIAnomalyDetector:
     """Z-score based anomaly detector for KPI metrics."""
 
-    def __init__(self, sensitivity: str = "medium"):
+    def __init__(
+        self,
+        sensitivity: str = "medium",
+        method: str = DETECTION_METHOD,
+        numpy_kernel: bool = NUMPY_DETECTION_KERNEL
+    ):
         """
         Initialize detector with sensitivity threshold.
         
         Args:
             sensitivity: 'low', 'medium', or 'high'
+            method: 'zscore' (rolling mean/std) or 'robust' (rolling
+                median/MAD; rolling_mean and rolling_std in the output
+                then hold the median and scaled MAD)
+            numpy_kernel: Score detect_anomalies on a float array and
+                build only the anomalous rows (False: the DataFrame path)
         """
+        if method not in ("zscore", "robust"):
+            raise ValueError(f"Unknown detection method: {method!r}")
+        
         self.threshold = SENSITIVITY_THRESHOLDS.get(sensitivity, 2.5)
+        self.method = method
+        self.numpy_kernel = numpy_kernel
         self.window = ROLLING_WINDOW_DAYS
+        self.min_periods = 7
+        self.states: Dict[str, RollingWindowState] = {}
         
-        print(f"  ✓ Detector initialized — sensitivity={sensitivity}, threshold={self.threshold}σ")
+        robust = ", robust median/MAD" if method == "robust" else ""
+        print(f"  ✓ Detector initialized — sensitivity={sensitivity}, threshold={self.threshold}σ{robust}")
+
+    def _rolling_stats(self, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Rolling center and spread of a (dates × series) array.
+        
+        Args:
+            values: (dates × series) float array
+            
+        Returns:
+            Tuple: (mean, std), or (median, scaled MAD) in robust mode
+        """
+        if self.method == "robust":
+            return _rolling_median_mad(values, self.window, self.min_periods)
+        return _rolling_mean_std(values, self.window, self.min_periods)
 
     def detect_anomalies(
         self,
@@ -35,6 +413,32 @@ class KPIAnomalyDetector:
         """
         Detect anomalies using rolling Z-score method.
         
+        Args:
+            df: DataFrame with date and KPI columns
+            kpi_column: Name of KPI column to analyze
+            date_column: Name of date column
+            
+        Returns:
+            pd.DataFrame: Anomalies only (where is_anomaly == True)
+        """
+        if self.numpy_kernel and not df.empty:
+            anomalies = self._detect_anomalies_kernel(df, kpi_column, date_column)
+        else:
+            anomalies = self._detect_anomalies_frame(df, kpi_column, date_column)
+        
+        self.report_anomalies(anomalies)
+        
+        return anomalies
+
+    def _detect_anomalies_frame(
+        self,
+        df: pd.DataFrame,
+        kpi_column: str,
+        date_column: str
+    ) -> pd.DataFrame:
+        """
+        detect_anomalies with every statistic as a column of the sorted copy.
+        
         Args:
             df: DataFrame with date and KPI columns
             kpi_column: Name of KPI column to analyze
@@ -47,15 +451,24 @@ class KPIAnomalyDetector:
         df = df.sort_values(date_column).copy()
         
         # Calculate rolling statistics
-        df['rolling_mean'] = df[kpi_column].rolling(
-            window=self.window, 
-            min_periods=7
-        ).mean()
-        
-        df['rolling_std'] = df[kpi_column].rolling(
-            window=self.window, 
-            min_periods=7
-        ).std()
+        if self.method == "robust":
+            median, mad = _rolling_median_mad(
+                df[[kpi_column]].to_numpy(dtype=np.float64),
+                self.window,
+                self.min_periods
+            )
+            df['rolling_mean'] = median[:, 0]
+            df['rolling_std'] = mad[:, 0]
+        else:
+            df['rolling_mean'] = df[kpi_column].rolling(
+                window=self.window, 
+                min_periods=self.min_periods
+            ).mean()
+            
+            df['rolling_std'] = df[kpi_column].rolling(
+                window=self.window, 
+                min_periods=self.min_periods
+            ).std()
         
         # Calculate Z-score
         df['z_score'] = (
@@ -78,8 +491,450 @@ class KPIAnomalyDetector:
         df['severity'] = df['z_score'].apply(self._classify_severity)
         
         # Return only anomalies
-        anomalies = df[df['is_anomaly'] == True].copy()
+        return df[df['is_anomaly'] == True].copy()
+
+    def _detect_anomalies_kernel(
+        self,
+        df: pd.DataFrame,
+        kpi_column: str,
+        date_column: str
+    ) -> pd.DataFrame:
+        """
+        detect_anomalies on a contiguous float array.
+        
+        Rolling statistics, Z-scores and severities are computed on NumPy
+        arrays in date order and only the anomalous rows are taken from
+        df, so no sorted copy of df or full-length columns are built. Output
+        matches _detect_anomalies_frame.
+        
+        Args:
+            df: Non-empty DataFrame with date and KPI columns
+            kpi_column: Name of KPI column to analyze
+            date_column: Name of date column
+            
+        Returns:
+            pd.DataFrame: Anomalies only (where is_anomaly == True)
+        """
+        # Same row order as sort_values (quicksort, missing dates last)
+        keys = df[date_column].to_numpy()
+        missing = pd.isna(keys)
+        if missing.any():
+            present = np.flatnonzero(~missing)
+            order = np.concatenate([
+                present[keys[present].argsort(kind='quicksort')],
+                np.flatnonzero(missing)
+            ])
+        else:
+            order = keys.argsort(kind='quicksort')
+        
+        values = df[kpi_column].to_numpy(dtype=np.float64)[order]
+        
+        if self.method == "robust":
+            median, mad = _rolling_median_mad(values[:, None], self.window, self.min_periods)
+            mean, std = median[:, 0], mad[:, 0]
+        else:
+            mean, std = _rolling_mean_std_1d(values, self.window, self.min_periods)
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            z_score = (values - mean) / std
+        flagged = np.flatnonzero(np.abs(z_score) > self.threshold)
+        
+        # Materialize only anomalous rows
+        expected = mean[flagged]
+        z = z_score[flagged]
         
+        with np.errstate(divide='ignore', invalid='ignore'):
+            deviation = (values[flagged] - expected) / expected * 100
+        
+        picked = df.take(order[flagged])
+        columns = {name: picked[name].array for name in picked.columns}
+        columns.update({
+            'rolling_mean': expected,
+            'rolling_std': std[flagged],
+            'z_score': z,
+            'is_anomaly': True,
+            'anomaly_score': np.abs(z),
+            'expected_value': expected,
+            'actual_value': columns[kpi_column],
+            'deviation_percent': deviation,
+            'severity': _severity_labels(z),
+        })
+        return pd.DataFrame(columns, index=picked.index)
+
+    def detect_many(
+        self,
+        df: pd.DataFrame,
+        kpi_columns: Sequence[str],
+        date_column: str = "metric_date"
+    ) -> pd.DataFrame:
+        """
+        Detect anomalies for several KPIs in a single columnar pass.
+        
+        All KPIs are aggregated per date with one groupby and the rolling
+        statistics are computed on one (dates × KPIs) array, instead of one
+        sort/copy/groupby per KPI.
+        
+        Args:
+            df: DataFrame with date and KPI columns (fact or daily grain)
+            kpi_columns: KPI columns to analyze
+            date_column: Name of date column
+            
+        Returns:
+            pd.DataFrame: Anomalies only, long format tagged with kpi_name,
+                ordered by KPI (as given) then date
+        """
+        kpi_columns = list(kpi_columns)
+        
+        # One groupby for every KPI
+        daily = _daily_totals(df, kpi_columns, date_column)
+        dates = daily.index.to_numpy()
+        actual = daily.to_numpy(dtype=np.float64)
+        
+        # Rolling statistics on the (dates × KPIs) array
+        mean, std = self._rolling_stats(actual)
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            z_score = (actual - mean) / std
+            is_anomaly = np.abs(z_score) > self.threshold
+        
+        # Materialize only anomalous cells, KPI-major
+        kpi_idx, date_idx = np.nonzero(is_anomaly.T)
+        
+        expected = mean[date_idx, kpi_idx]
+        observed = actual[date_idx, kpi_idx]
+        z = z_score[date_idx, kpi_idx]
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            deviation = (observed - expected) / expected * 100
+        
+        anomalies = pd.DataFrame({
+            date_column: dates[date_idx],
+            'kpi_name': np.asarray(kpi_columns, dtype=object)[kpi_idx],
+            'rolling_mean': expected,
+            'rolling_std': std[date_idx, kpi_idx],
+            'z_score': z,
+            'is_anomaly': True,
+            'anomaly_score': np.abs(z),
+            'expected_value': expected,
+            'actual_value': observed,
+            'deviation_percent': deviation,
+            'severity': _severity_labels(z),
+        })
+        
+        return anomalies
+
+    def detect_segments(
+        self,
+        df: pd.DataFrame,
+        kpi_columns: Sequence[str],
+        segment_column: str,
+        segment_type: Optional[str] = None,
+        date_column: str = "metric_date"
+    ) -> pd.DataFrame:
+        """
+        Detect anomalies on every (KPI × segment) series at once.
+        
+        Rows are pivoted into one (dates × KPIs·segments) matrix with
+        bincount and scored with the same rolling Z-score as detect_many,
+        in blocks of SEGMENT_CHUNK_SERIES series. A segment's series has a
+        gap (skipped by the rolling statistics) on dates where it has no rows.
+        
+        Args:
+            df: DataFrame with date, segment and KPI columns (fact grain or
+                pre-aggregated per date and segment)
+            kpi_columns: KPI columns to analyze
+            segment_column: Segment id column (e.g. 'store_id')
+            segment_type: Label for the segment_type column (default:
+                segment_column)
+            date_column: Name of date column
+            
+        Returns:
+            pd.DataFrame: Anomalies only, long format tagged with kpi_name,
+                segment_type and segment_id, ordered by KPI, segment, date
+        """
+        kpi_columns = list(kpi_columns)
+        
+        date_codes, dates = pd.factorize(df[date_column], sort=True)
+        segment_codes, segments = pd.factorize(df[segment_column], sort=True)
+        valid = (date_codes >= 0) & (segment_codes >= 0)
+        
+        n_dates, n_segments = len(dates), len(segments)
+        cell = date_codes[valid] * n_segments + segment_codes[valid]
+        size = n_dates * n_segments
+        
+        # (dates × segments) per KPI, side by side; NaN where no rows
+        present = np.bincount(cell, minlength=size).reshape(n_dates, n_segments) > 0
+        actual = np.empty((n_dates, len(kpi_columns) * n_segments))
+        for i, kpi in enumerate(kpi_columns):
+            sums = np.bincount(
+                cell,
+                weights=np.nan_to_num(df[kpi].to_numpy(dtype=np.float64)[valid]),
+                minlength=size
+            ).reshape(n_dates, n_segments)
+            actual[:, i * n_segments:(i + 1) * n_segments] = np.where(present, sums, np.nan)
+        
+        # Rolling statistics in blocks of series
+        mean = np.empty_like(actual)
+        std = np.empty_like(actual)
+        for lo in range(0, actual.shape[1], SEGMENT_CHUNK_SERIES):
+            hi = lo + SEGMENT_CHUNK_SERIES
+            mean[:, lo:hi], std[:, lo:hi] = self._rolling_stats(actual[:, lo:hi])
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            z_score = (actual - mean) / std
+            is_anomaly = np.abs(z_score) > self.threshold
+        
+        # Materialize only anomalous cells, series-major
+        series_idx, date_idx = np.nonzero(is_anomaly.T)
+        kpi_idx, segment_idx = np.divmod(series_idx, n_segments)
+        
+        expected = mean[date_idx, series_idx]
+        observed = actual[date_idx, series_idx]
+        z = z_score[date_idx, series_idx]
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            deviation = (observed - expected) / expected * 100
+        
+        anomalies = pd.DataFrame({
+            date_column: np.asarray(dates)[date_idx],
+            'kpi_name': np.asarray(kpi_columns, dtype=object)[kpi_idx],
+            'segment_type': segment_type or segment_column,
+            'segment_id': np.asarray(segments)[segment_idx],
+            'rolling_mean': expected,
+            'rolling_std': std[date_idx, series_idx],
+            'z_score': z,
+            'is_anomaly': True,
+            'anomaly_score': np.abs(z),
+            'expected_value': expected,
+            'actual_value': observed,
+            'deviation_percent': deviation,
+            'severity': _severity_labels(z),
+        })
+        
+        return anomalies
+
+    def update(
+        self,
+        new_points: pd.DataFrame,
+        kpi_columns: Optional[Sequence[str]] = None,
+        date_column: str = "metric_date"
+    ) -> pd.DataFrame:
+        """
+        Score only new dates against the resumed rolling window state.
+        
+        Each new date is pushed into its KPI's window and scored in
+        O(window). Dates at or before a KPI's last scored date are skipped.
+        
+        Args:
+            new_points: DataFrame with date and KPI columns (fact or daily grain)
+            kpi_columns: KPI columns to score (default: all with state)
+            date_column: Name of date column
+            
+        Returns:
+            pd.DataFrame: Anomalies only, same long format as detect_many
+        """
+        if kpi_columns is None:
+            kpi_columns = list(self.states)
+        kpi_columns = list(kpi_columns)
+        
+        daily = _daily_totals(new_points, kpi_columns, date_column)
+        records = []
+        
+        for kpi in kpi_columns:
+            state = self.states.setdefault(kpi, RollingWindowState(self.window))
+            
+            for date, value in daily[kpi].items():
+                if state.last_date is not None and date <= state.last_date:
+                    continue
+                
+                state.push(date, float(value))
+                
+                if state.count < self.min_periods:
+                    continue
+                
+                mean, std = (
+                    state.median_mad() if self.method == "robust" else state.mean_std()
+                )
+                
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    z_score = (value - mean) / np.float64(std)
+                    deviation = (value - mean) / np.float64(mean) * 100
+                
+                if not np.abs(z_score) > self.threshold:
+                    continue
+                
+                records.append({
+                    date_column: date,
+                    'kpi_name': kpi,
+                    'rolling_mean': mean,
+                    'rolling_std': std,
+                    'z_score': z_score,
+                    'is_anomaly': True,
+                    'anomaly_score': abs(z_score),
+                    'expected_value': mean,
+                    'actual_value': float(value),
+                    'deviation_percent': deviation,
+                    'severity': self._classify_severity(z_score),
+                })
+        
+        return pd.DataFrame(records, columns=[
+            date_column, 'kpi_name', 'rolling_mean', 'rolling_std', 'z_score',
+            'is_anomaly', 'anomaly_score', 'expected_value', 'actual_value',
+            'deviation_percent', 'severity'
+        ])
+
+    def detect_incremental(
+        self,
+        df: pd.DataFrame,
+        kpi_columns: Sequence[str],
+        date_column: str = "metric_date",
+        state_path: str = DETECTOR_STATE_PATH
+    ) -> pd.DataFrame:
+        """
+        Resume from the window state and score only dates after it.
+        
+        The state held in memory from an earlier call is used when it
+        matches the data; only otherwise is the checkpoint file read. Falls
+        back to a full detect_many recompute (and rebuilds the state) when
+        the checkpoint is missing, was built with other parameters, or its
+        window values no longer match the data. The checkpoint is saved
+        afterwards either way.
+        
+        Args:
+            df: DataFrame with date and KPI columns (fact or daily grain)
+            kpi_columns: KPI columns to analyze
+            date_column: Name of date column
+            state_path: Checkpoint file path
+            
+        Returns:
+            pd.DataFrame: Anomalies on newly scored dates (all dates on a
+                full recompute), same long format as detect_many
+        """
+        kpi_columns = list(kpi_columns)
+        daily = _daily_totals(df, kpi_columns, date_column)
+        
+        resumable = self._state_matches(daily, kpi_columns) or (
+            self.load_state(state_path) and self._state_matches(daily, kpi_columns)
+        )
+        
+        if resumable:
+            last_date = min(self.states[kpi].last_date for kpi in kpi_columns)
+            new_points = daily[daily.index > last_date].reset_index()
+            
+            print(f"  ✓ Resumed detector state — scoring {len(new_points)} new date(s)")
+            anomalies = self.update(new_points, kpi_columns, date_column)
+        else:
+            print(f"  ⚠ Detector checkpoint missing or stale — full recompute")
+            anomalies = self.detect_many(daily.reset_index(), kpi_columns, date_column)
+            
+            self.states = {}
+            for kpi in kpi_columns:
+                state = RollingWindowState(self.window)
+                for date, value in daily[kpi].iloc[-self.window:].items():
+                    state.push(date, float(value))
+                self.states[kpi] = state
+        
+        self.save_state(state_path)
+        
+        return anomalies
+
+    def _state_matches(self, daily: pd.DataFrame, kpi_columns: List[str]) -> bool:
+        """
+        Check the loaded window state against freshly aggregated data.
+        
+        The checkpoint's last date must lie inside the data's date range,
+        and every checkpointed date in that range must still be present
+        with the same value; otherwise the data doesn't cover the
+        checkpoint or history was revised.
+        
+        Args:
+            daily: Daily KPI totals indexed by date
+            kpi_columns: KPI columns to check
+            
+        Returns:
+            bool: True if the state can be resumed
+        """
+        if daily.empty:
+            return False
+        
+        first_date = daily.index.min()
+        last_date = daily.index.max()
+        
+        for kpi in kpi_columns:
+            state = self.states.get(kpi)
+            if state is None or state.count == 0:
+                return False
+            if not first_date <= state.last_date <= last_date:
+                return False
+            
+            dates, values = state.chronological()
+            in_range = pd.DatetimeIndex(dates) >= first_date
+            current = daily[kpi].reindex(pd.DatetimeIndex(dates[in_range]))
+            
+            if current.isna().any():
+                return False
+            if not np.allclose(current.to_numpy(), values[in_range], rtol=1e-9, atol=1e-6):
+                return False
+        
+        return True
+
+    def save_state(self, path: str = DETECTOR_STATE_PATH) -> None:
+        """
+        Checkpoint per-KPI window state to a local JSON file.
+        
+        Args:
+            path: Checkpoint file path
+        """
+        checkpoint = {
+            'window': self.window,
+            'min_periods': self.min_periods,
+            'kpis': {kpi: state.to_dict() for kpi, state in self.states.items()},
+        }
+        
+        # Write then rename so a crash never leaves a torn checkpoint
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(checkpoint, f)
+        os.replace(tmp_path, path)
+
+    def load_state(self, path: str = DETECTOR_STATE_PATH) -> bool:
+        """
+        Restore per-KPI window state from a checkpoint file.
+        
+        Args:
+            path: Checkpoint file path
+            
+        Returns:
+            bool: True if a compatible checkpoint was loaded
+        """
+        if not os.path.exists(path):
+            return False
+        
+        try:
+            with open(path) as f:
+                checkpoint = json.load(f)
+            
+            if (checkpoint['window'] != self.window or
+                    checkpoint['min_periods'] != self.min_periods):
+                return False
+            
+            self.states = {
+                kpi: RollingWindowState.from_dict(self.window, data)
+                for kpi, data in checkpoint['kpis'].items()
+            }
+            return True
+            
+        except (OSError, ValueError, KeyError) as e:
+            print(f"  ⚠ Could not read detector checkpoint: {e}")
+            return False
+
+    def report_anomalies(self, anomalies: pd.DataFrame) -> None:
+        """
+        Print detection summary with severity breakdown.
+        
+        Args:
+            anomalies: Detected anomalies for one KPI
+        """
         if not anomalies.empty:
             severity_counts = anomalies['severity'].value_counts()
             print(f"  ✓ Detected {len(anomalies)} anomalie(s)")
@@ -88,8 +943,6 @@ class KPIAnomalyDetector:
                     print(f"    {sev.capitalize()}: {severity_counts[sev]}")
         else:
             print(f"  ✓ No anomalies detected")
-        
-        return anomalies
 
     def _classify_severity(self, z_score: float) -> str:
         """
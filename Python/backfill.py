@@ -0,0 +1,364 @@
+"""
+backfill.py - Historical Backfill
+=================================
+Scores a historical date range chunk by chunk, so memory is bounded by
+the chunk size rather than the range. Each chunk loads its own warm-up,
+so the anomalies and drivers logged match a single run over the range.
+
+Usage:
+    python backfill.py START_DATE END_DATE [--fresh]
+"""
+
+import contextlib
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from config import (
+    KPIS_TO_MONITOR,
+    ROLLING_WINDOW_DAYS,
+    LOOKBACK_PERIOD_DAYS,
+    AGGREGATION_PUSHDOWN,
+    CACHED_DIMENSION_NAMES,
+    BACKFILL_CHUNK_DAYS,
+    BACKFILL_WORKERS,
+    BACKFILL_CHECKPOINT_PATH,
+)
+from db_connector import AnomalyDBConnector
+from anomaly_detector import KPIAnomalyDetector
+from root_cause_analyzer import RootCauseAnalyzer, DIMENSIONS
+from anomaly_batch import AnomalyBatch, DriverBatch
+from main_pipeline import build_cube, explain_kpi
+
+
+def plan_chunks(
+    metric_dates: pd.DatetimeIndex,
+    start_date: Any,
+    end_date: Any,
+    chunk_days: int = BACKFILL_CHUNK_DAYS,
+    window: int = ROLLING_WINDOW_DAYS,
+    lookback_days: int = LOOKBACK_PERIOD_DAYS
+) -> List[Dict[str, pd.Timestamp]]:
+    """
+    Split a date range into chunks, each with the warm-up it needs.
+
+    Scored dates need the window - 1 fact dates before them for their
+    rolling statistics (gaps in the data stretch that span) and
+    lookback_days calendar days for their root cause baseline; a chunk's
+    load starts at whichever reaches further back. Chunks without fact
+    dates are skipped.
+
+    Args:
+        metric_dates: Sorted dates with fact rows, up to end_date
+        start_date: First date to score
+        end_date: Last date to score
+        chunk_days: Days scored per chunk
+        window: Rolling window of the detector (rows)
+        lookback_days: Root cause baseline (calendar days)
+
+    Returns:
+        List: Chunks as {start, end, load_start}
+    """
+    start = pd.Timestamp(start_date).normalize()
+    end = pd.Timestamp(end_date).normalize()
+    chunks = []
+
+    chunk_start = start
+    while chunk_start <= end:
+        chunk_end = min(chunk_start + timedelta(days=chunk_days - 1), end)
+        first = metric_dates.searchsorted(chunk_start)
+        last = metric_dates.searchsorted(chunk_end, side='right')
+
+        if last > first:
+            warm_up = metric_dates[max(0, first - (window - 1))]
+            chunks.append({
+                'start': chunk_start,
+                'end': chunk_end,
+                'load_start': min(warm_up, chunk_start - timedelta(days=lookback_days)),
+            })
+
+        chunk_start = chunk_end + timedelta(days=1)
+
+    return chunks
+
+
+def analyze_chunk(
+    db: AnomalyDBConnector,
+    detector: KPIAnomalyDetector,
+    analyzer: RootCauseAnalyzer,
+    chunk: Dict[str, pd.Timestamp]
+) -> Optional[Tuple[AnomalyBatch, DriverBatch]]:
+    """
+    Load one chunk with its warm-up, detect and explain its anomalies.
+
+    Args:
+        db: Database connector
+        detector: Anomaly detector
+        analyzer: Root cause analyzer
+        chunk: {start, end, load_start} from plan_chunks
+
+    Returns:
+        Tuple: (anomalies, their drivers) for dates in [start, end], or
+            None if the chunk failed to load
+    """
+    if AGGREGATION_PUSHDOWN:
+        data, dimension_totals = db.load_kpi_aggregates(
+            chunk['load_start'], chunk['end'], KPIS_TO_MONITOR, DIMENSIONS,
+            with_names=not CACHED_DIMENSION_NAMES
+        )
+    else:
+        data = db.load_kpi_data(
+            chunk['load_start'], chunk['end'], with_names=not CACHED_DIMENSION_NAMES
+        )
+
+    # Planned chunks have fact dates, so no data means the load failed
+    if data.empty:
+        return None
+
+    if not AGGREGATION_PUSHDOWN:
+        dimension_totals = None
+
+    anomalies = detector.detect_many(data, KPIS_TO_MONITOR, "metric_date")
+
+    # Warm-up dates belong to the previous chunk
+    anomalies = anomalies[anomalies["metric_date"] >= chunk['start']]
+
+    batches = []
+    driver_batches = []
+
+    if anomalies.empty:
+        return AnomalyBatch.concat(batches), DriverBatch.empty()
+
+    cube = build_cube(data, dimension_totals, KPIS_TO_MONITOR)
+
+    for kpi in KPIS_TO_MONITOR:
+        kpi_anomalies = anomalies[anomalies["kpi_name"] == kpi]
+
+        if kpi_anomalies.empty:
+            continue
+
+        batch, drivers = explain_kpi(db, analyzer, data, cube, kpi_anomalies, kpi)
+        batches.append(batch)
+        driver_batches.append(drivers)
+
+    return (
+        AnomalyBatch.concat(batches),
+        DriverBatch.concat(driver_batches, [len(batch) for batch in batches])
+    )
+
+
+def iter_backfill(
+    db: AnomalyDBConnector,
+    chunks: List[Dict[str, pd.Timestamp]],
+    workers: int = BACKFILL_WORKERS,
+    detector: Optional[KPIAnomalyDetector] = None,
+    analyzer: Optional[RootCauseAnalyzer] = None
+) -> Iterator[Tuple[Dict[str, pd.Timestamp], Any]]:
+    """
+    Analyze chunks and yield their results in chunk order.
+
+    Sequentially, each chunk is loaded only when the previous result has
+    been consumed, so one chunk is held at a time. With several workers,
+    chunks run on threads sharing the connection pool in a sliding
+    window: the next chunk is submitted only once a result has been
+    consumed, so at most `workers` chunks (including the one being
+    yielded) are loaded at once. Closing the generator early cancels the
+    chunks not yet started.
+
+    Args:
+        db: Database connector
+        chunks: Chunks from plan_chunks
+        workers: Concurrent chunks
+        detector: Anomaly detector (default: medium sensitivity)
+        analyzer: Root cause analyzer (default settings)
+
+    Yields:
+        Tuple: (chunk, analyze_chunk result)
+    """
+    if detector is None:
+        detector = KPIAnomalyDetector(sensitivity="medium")
+    if analyzer is None:
+        analyzer = RootCauseAnalyzer()
+
+    if workers <= 1 or len(chunks) <= 1:
+        for chunk in chunks:
+            yield chunk, analyze_chunk(db, detector, analyzer, chunk)
+        return
+
+    # Chunks share pooled connections, which must not cross a fork
+    executor = ThreadPoolExecutor(max_workers=workers)
+    remaining = iter(chunks)
+    window: deque = deque()
+
+    def submit_next() -> None:
+        chunk = next(remaining, None)
+        if chunk is not None:
+            window.append((chunk, executor.submit(analyze_chunk, db, detector, analyzer, chunk)))
+
+    try:
+        for _ in range(workers):
+            submit_next()
+
+        while window:
+            chunk, future = window.popleft()
+            yield chunk, future.result()
+            submit_next()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def load_checkpoint(
+    path: str,
+    start: pd.Timestamp,
+    end: pd.Timestamp,
+    chunk_days: int
+) -> Optional[pd.Timestamp]:
+    """
+    Last fully logged date of a matching earlier backfill.
+
+    Args:
+        path: Checkpoint file
+        start: First date of this backfill
+        end: Last date of this backfill
+        chunk_days: Days per chunk of this backfill
+
+    Returns:
+        pd.Timestamp: Completed-through date, or None to start fresh
+    """
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with open(path) as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"  ⚠ Ignoring unreadable checkpoint {path}: {e}")
+        return None
+
+    if (checkpoint.get('start') != str(start.date()) or
+            checkpoint.get('end') != str(end.date()) or
+            checkpoint.get('chunk_days') != chunk_days):
+        print(f"  ⚠ Checkpoint {path} is for another backfill — starting fresh")
+        return None
+
+    return pd.Timestamp(checkpoint['completed_through'])
+
+
+def save_checkpoint(
+    path: str,
+    start: pd.Timestamp,
+    end: pd.Timestamp,
+    chunk_days: int,
+    completed_through: pd.Timestamp
+) -> None:
+    """Atomically record the last fully logged date of a backfill."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({
+            'start': str(start.date()),
+            'end': str(end.date()),
+            'chunk_days': chunk_days,
+            'completed_through': str(completed_through.date()),
+        }, f)
+    os.replace(tmp_path, path)
+
+
+def run_backfill(
+    start_date: Any,
+    end_date: Any,
+    db: Optional[AnomalyDBConnector] = None,
+    chunk_days: int = BACKFILL_CHUNK_DAYS,
+    workers: int = BACKFILL_WORKERS,
+    checkpoint_path: str = BACKFILL_CHECKPOINT_PATH,
+    resume: bool = True
+) -> Optional[int]:
+    """
+    Detect, explain and log anomalies for a historical date range.
+
+    Each chunk's anomalies and drivers are logged in one transaction and
+    then checkpointed, so an interrupted backfill resumes after the last
+    logged chunk.
+
+    Args:
+        start_date: First date to score
+        end_date: Last date to score
+        db: Connector to use (default: per DB_CONFIG / DB_BACKEND)
+        chunk_days: Days scored per chunk
+        workers: Concurrent chunks (threads)
+        checkpoint_path: Checkpoint file
+        resume: Skip chunks completed by a matching earlier run
+
+    Returns:
+        int: Anomalies logged, or None if the backfill stopped on an error
+    """
+    start = pd.Timestamp(start_date).normalize()
+    end = pd.Timestamp(end_date).normalize()
+
+    print("=" * 70)
+    print("   KPI ANOMALY BACKFILL")
+    print("=" * 70)
+    print(f"  Range       : {start.date()} → {end.date()} ({chunk_days}-day chunks)")
+
+    if db is None:
+        db = AnomalyDBConnector()
+
+    try:
+        if not db.test_connection():
+            print("  ✗ Cannot proceed. Exiting.")
+            return None
+
+        chunks = plan_chunks(db.load_metric_dates(end_date=end), start, end, chunk_days)
+
+        completed = load_checkpoint(checkpoint_path, start, end, chunk_days) if resume else None
+        if completed is not None:
+            chunks = [chunk for chunk in chunks if chunk['end'] > completed]
+            print(f"  ✓ Resuming after {completed.date()} — {len(chunks)} chunk(s) left")
+        else:
+            print(f"  ✓ Planned {len(chunks)} chunk(s)")
+        print()
+
+        logged = 0
+
+        # Closed before the connector, so no chunk is still loading
+        with contextlib.closing(iter_backfill(db, chunks, workers)) as results:
+            for chunk, result in results:
+                label = f"{chunk['start'].date()} → {chunk['end'].date()}"
+
+                if result is None:
+                    print(f"  ✗ Chunk {label} failed to load — stopping (re-run to resume)")
+                    return None
+
+                anomalies, drivers = result
+                if db.log_anomaly_batch(anomalies, drivers) is None:
+                    print(f"  ✗ Chunk {label} failed to log — stopping (re-run to resume)")
+                    return None
+
+                save_checkpoint(checkpoint_path, start, end, chunk_days, chunk['end'])
+                logged += len(anomalies)
+
+                print(f"  ✓ Chunk {label}: {len(anomalies)} anomalie(s), {len(drivers)} driver(s) logged")
+    finally:
+        db.close()
+
+    print()
+    print("=" * 70)
+    print(f"  ✓ Backfill Complete — {logged} anomalie(s) logged")
+    print(f"  Finished at : {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print("=" * 70)
+
+    return logged
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print(__doc__)
+        sys.exit(1)
+
+    result = run_backfill(sys.argv[1], sys.argv[2], resume="--fresh" not in sys.argv[3:])
+    sys.exit(0 if result is not None else 1)
@@ -0,0 +1,67 @@
+"""
+bench_compact.py - Compact Frame Benchmark
+==========================================
+Measures the deep memory of a load_kpi_data-shaped frame (synthetic fact
+rows with their joined dimension names) before and after
+compact_kpi_frame, and the largest measure error it introduces.
+
+Usage:
+    python bench_compact.py [rows]
+"""
+
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from db_connector import MEASURE_COLUMNS, compact_kpi_frame
+from synthetic_data import generate_dimensions, generate_facts, scale_for_rows
+
+
+def joined_facts(rows: int) -> pd.DataFrame:
+    """
+    Synthetic fact rows with the columns KPI_DATA_SELECT returns.
+
+    Args:
+        rows: Approximate number of fact rows
+
+    Returns:
+        pd.DataFrame: Facts joined to store, product and region names
+    """
+    scale = scale_for_rows(rows)
+    dims = generate_dimensions(scale['n_stores'], scale['n_products'])
+
+    return (
+        generate_facts(**scale)
+        .merge(dims['dim_stores'][['store_id', 'store_name', 'store_type']], on='store_id', how='left')
+        .merge(dims['dim_products'][['product_id', 'product_name', 'category']], on='product_id', how='left')
+        .merge(dims['dim_regions'][['region_id', 'region_name']], on='region_id', how='left')
+    )
+
+
+def main() -> None:
+    """Run the compaction benchmark."""
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000_000
+
+    df = joined_facts(rows)
+    measures = {col: df[col].to_numpy(dtype=np.float64) for col in MEASURE_COLUMNS}
+    before_mb = df.memory_usage(deep=True).sum() / 1e6
+
+    start = time.perf_counter()
+    df = compact_kpi_frame(df)
+    elapsed = time.perf_counter() - start
+    after_mb = df.memory_usage(deep=True).sum() / 1e6
+
+    print(f"  Rows: {len(df):,}")
+    print("  " + "-" * 60)
+    print(f"  float64/str  frame {before_mb:8.1f} MB")
+    print(f"  compacted    frame {after_mb:8.1f} MB  ({before_mb / after_mb:.1f}× smaller, {elapsed:.2f}s)")
+
+    for col, values in measures.items():
+        error = np.nanmax(np.abs(df[col].to_numpy(dtype=np.float64) - values), initial=0.0)
+        print(f"  {col:<12} {str(df[col].dtype):<8} max error {error:.4f}")
+
+
+if __name__ == "__main__":
+    main()
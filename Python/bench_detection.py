@@ -0,0 +1,113 @@
+"""
+bench_detection.py - Single-KPI Detection Benchmark
+===================================================
+Times detect_anomalies on synthetic daily KPI frames with the DataFrame
+path and the NumPy kernel, reports the speedup and peak traced memory of
+each, and checks that both return the same anomalies.
+
+Usage:
+    python bench_detection.py [repeats]
+"""
+
+import contextlib
+import io
+import sys
+import time
+import tracemalloc
+from typing import Callable, Tuple
+
+import numpy as np
+import pandas as pd
+
+from anomaly_detector import KPIAnomalyDetector
+from config import KPIS_TO_MONITOR
+
+SIZES = (90, 365, 3_650, 36_500)
+
+
+def daily_totals(days: int, rng: np.random.Generator) -> pd.DataFrame:
+    """
+    Daily KPI totals with ~2% of days dropped to half.
+
+    Args:
+        days: Number of days
+        rng: Random generator
+
+    Returns:
+        pd.DataFrame: One row per date
+    """
+    revenue = 250_000 * rng.normal(1.0, 0.05, days)
+    revenue[rng.random(days) < 0.02] *= 0.5
+    margin = rng.uniform(20, 40, days)
+
+    return pd.DataFrame({
+        "metric_date": pd.date_range("2000-01-01", periods=days, freq="D"),
+        "revenue": revenue,
+        "profit": revenue * margin / 100,
+        "margin": margin,
+    })
+
+
+def measure(fn: Callable[[], pd.DataFrame], repeats: int) -> Tuple[float, int, pd.DataFrame]:
+    """
+    Best wall time over repeats, then peak traced memory of one more call.
+
+    Args:
+        fn: Detection call
+        repeats: Timed calls
+
+    Returns:
+        Tuple: (best seconds, peak traced bytes, result)
+    """
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    result = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return best, peak, result
+
+
+def main() -> None:
+    """Run the detection benchmark."""
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    rng = np.random.default_rng(42)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        detectors = {
+            "frame": KPIAnomalyDetector(sensitivity="medium", numpy_kernel=False),
+            "kernel": KPIAnomalyDetector(sensitivity="medium", numpy_kernel=True),
+        }
+
+    print(f"  KPIs: {len(KPIS_TO_MONITOR)}  |  Best of {repeats}")
+    print("  " + "-" * 70)
+
+    for days in SIZES:
+        daily = daily_totals(days, rng)
+        results = {}
+
+        for name, detector in detectors.items():
+            def detect_all() -> pd.DataFrame:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    return pd.concat([
+                        detector.detect_anomalies(daily, kpi) for kpi in KPIS_TO_MONITOR
+                    ])
+            results[name] = measure(detect_all, repeats)
+
+        (frame_s, frame_peak, expected), (kernel_s, kernel_peak, found) = results.values()
+        pd.testing.assert_frame_equal(expected, found, check_exact=True)
+
+        print(
+            f"  {days:>6,} days  frame {frame_s * 1e3:8.2f} ms {frame_peak / 1e6:6.2f} MB"
+            f"  kernel {kernel_s * 1e3:7.2f} ms {kernel_peak / 1e6:6.2f} MB"
+            f"  {frame_s / kernel_s:5.1f}×  {len(found):,} anomalies ✓"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+bench_fetch.py - Fetch Benchmark
+================================
+Compares the row-tuple read (as pd.read_sql does it) against the
+columnar fetch path on a local SQLite stand-in for the joined fact query.
+
+Usage:
+    python bench_fetch.py [rows]
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from db_connector import AnomalyDBConnector
+
+
+def build_sqlite_standin(path: str, rows: int, seed: int = 42) -> None:
+    """
+    Create fact and dimension tables with random data in a SQLite file.
+    
+    Args:
+        path: SQLite database file
+        rows: Number of fact rows
+        seed: Random seed
+    """
+    rng = np.random.default_rng(seed)
+    
+    dates = pd.Timestamp("2025-01-01") + pd.to_timedelta(
+        np.sort(rng.integers(0, 365, rows)), unit="D"
+    )
+    store_id = rng.integers(1, 51, rows)
+    revenue = np.round(rng.uniform(1000, 5000, rows), 2)
+    margin = rng.integers(20, 40, rows).astype(float)
+    
+    conn = sqlite3.connect(path)
+    pd.DataFrame({
+        "metric_date": dates.strftime("%Y-%m-%d"),
+        "store_id": store_id,
+        "product_id": rng.integers(1, 101, rows),
+        "region_id": (store_id - 1) % 5 + 1,
+        "revenue": revenue,
+        "profit": np.round(revenue * margin / 100, 2),
+        "margin": margin,
+        "units_sold": (revenue / 100).astype(int),
+    }).to_sql("fact_kpi_metrics", conn, index=False)
+    pd.DataFrame({
+        "store_id": np.arange(1, 51),
+        "store_name": [f"Store_{i:03d}" for i in range(1, 51)],
+        "store_type": ["Mall", "Street"] * 25,
+    }).to_sql("dim_stores", conn, index=False)
+    pd.DataFrame({
+        "product_id": np.arange(1, 101),
+        "product_name": [f"Product_{i:03d}" for i in range(1, 101)],
+        "category": ["Electronics", "Clothing", "Food", "Home"] * 25,
+    }).to_sql("dim_products", conn, index=False)
+    pd.DataFrame({
+        "region_id": np.arange(1, 6),
+        "region_name": [f"Region_{i}" for i in range(1, 6)],
+    }).to_sql("dim_regions", conn, index=False)
+    conn.commit()
+    conn.close()
+
+
+def measure(db: AnomalyDBConnector) -> tuple:
+    """
+    Time one full-year load, then repeat it under tracemalloc for peak memory.
+    
+    Returns:
+        Tuple: (dataframe, seconds, peak_mb)
+    """
+    start = time.perf_counter()
+    df = db.load_kpi_data("2025-01-01", "2025-12-31")
+    elapsed = time.perf_counter() - start
+    
+    tracemalloc.start()
+    db.load_kpi_data("2025-01-01", "2025-12-31")
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    
+    return df, elapsed, peak / 1e6
+
+
+def main() -> None:
+    """Run the fetch benchmark."""
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "dbo.db")
+        build_sqlite_standin(path, rows)
+        
+        def connect() -> sqlite3.Connection:
+            conn = sqlite3.connect(":memory:")
+            conn.execute("ATTACH DATABASE ? AS dbo", (path,))
+            return conn
+        
+        db = AnomalyDBConnector(connect_factory=connect)
+        
+        print(f"  Rows: {rows:,}")
+        print("  " + "-" * 60)
+        
+        results = {}
+        for mode, columnar in (("row tuples", False), ("columnar", True)):
+            db.columnar_fetch = columnar
+            df, elapsed, peak_mb = measure(db)
+            frame_mb = df.memory_usage(deep=True).sum() / 1e6
+            results[mode] = df
+            print(
+                f"  {mode:<12} {elapsed:7.2f}s  peak {peak_mb:8.1f} MB"
+                f"  frame {frame_mb:8.1f} MB"
+            )
+        
+        pd.testing.assert_frame_equal(
+            results["row tuples"], results["columnar"], check_dtype=False
+        )
+        print("  ✓ Results identical")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+bench_segments.py - Segment Detection Benchmark
+===============================================
+Times detect_segments on synthetic per-store, per-product and per-region
+daily aggregates at the base size (50 stores × 100 products) and at 10×,
+and on 10,000 store × product pairs (tens of thousands of series),
+with the Z-score and the robust median/MAD methods.
+
+Usage:
+    python bench_segments.py [days]
+"""
+
+import contextlib
+import io
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from anomaly_detector import KPIAnomalyDetector
+from config import KPIS_TO_MONITOR
+
+
+def segment_totals(
+    n_segments: int,
+    id_col: str,
+    days: int,
+    rng: np.random.Generator
+) -> pd.DataFrame:
+    """
+    Daily KPI totals per segment with ~1% of cells dropped to half.
+    
+    Args:
+        n_segments: Number of segments
+        id_col: Segment id column name
+        days: Number of days
+        rng: Random generator
+        
+    Returns:
+        pd.DataFrame: One row per (date, segment)
+    """
+    dates = pd.date_range("2025-01-01", periods=days, freq="D")
+    base = rng.uniform(1_000, 50_000, n_segments)
+    revenue = base * rng.normal(1.0, 0.08, (days, n_segments))
+    revenue[rng.random((days, n_segments)) < 0.01] *= 0.5
+    margin = rng.uniform(20, 40, (days, n_segments))
+    
+    return pd.DataFrame({
+        "metric_date": np.repeat(dates, n_segments),
+        id_col: np.tile(np.arange(1, n_segments + 1), days),
+        "revenue": revenue.ravel(),
+        "profit": (revenue * margin / 100).ravel(),
+        "margin": margin.ravel(),
+    })
+
+
+def main() -> None:
+    """Run the segment detection benchmark."""
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else 365
+    rng = np.random.default_rng(42)
+    
+    with contextlib.redirect_stdout(io.StringIO()):
+        detectors = {
+            method: KPIAnomalyDetector(sensitivity="medium", method=method)
+            for method in ("zscore", "robust")
+        }
+    
+    print(f"  Days: {days}  |  KPIs: {len(KPIS_TO_MONITOR)}")
+    print("  " + "-" * 70)
+    
+    scales = {
+        f"{50 * scale:>4} stores × {100 * scale:>4} products": {
+            "store": ("store_id", 50 * scale),
+            "product": ("product_id", 100 * scale),
+            "region": ("region_id", 5),
+        }
+        for scale in (1, 10)
+    }
+    scales["10,000 store × product pairs"] = {
+        "store_product": ("store_product_id", 100 * 100),
+    }
+    
+    for label, dimensions in scales.items():
+        frames = {
+            dim_name: segment_totals(n, id_col, days, rng)
+            for dim_name, (id_col, n) in dimensions.items()
+        }
+        series = len(KPIS_TO_MONITOR) * sum(n for _, n in dimensions.values())
+        
+        for method, detector in detectors.items():
+            start = time.perf_counter()
+            found = sum(
+                len(detector.detect_segments(frame, KPIS_TO_MONITOR, id_col, dim_name))
+                for (dim_name, (id_col, _)), frame in zip(dimensions.items(), frames.values())
+            )
+            elapsed = time.perf_counter() - start
+            
+            print(
+                f"  {method:<6} {label:<28}"
+                f"  {series:>6,} series  {elapsed:6.2f}s"
+                f"  {series / elapsed:>9,.0f} series/s  {found:,} anomalies"
+            )
+
+
+if __name__ == "__main__":
+    main()
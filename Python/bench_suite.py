@@ -0,0 +1,190 @@
+"""
+bench_suite.py - Benchmark Suite
+================================
+Times and memory-profiles detection, root cause analysis and an
+end-to-end pipeline run on synthetic data in an embedded local backend,
+and writes the results to a JSON file for comparison across commits.
+
+Usage:
+    python bench_suite.py [rows] [results.json] [sqlite|duckdb]
+"""
+
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+import main_pipeline
+from anomaly_detector import KPIAnomalyDetector
+from config import KPIS_TO_MONITOR, DATA_LOAD_DAYS
+from db_backends import create_backend
+from db_connector import AnomalyDBConnector
+from root_cause_analyzer import RootCauseAnalyzer, DimensionCube
+from synthetic_data import generate_dimensions, iter_facts, scale_for_rows
+
+
+SEED = 42
+ROOT_CAUSE_DATES = 10  # Anomaly dates analyzed by the root cause benchmarks
+
+def build_local_db(db: AnomalyDBConnector, rows: int, seed: int = SEED) -> int:
+    """
+    Load synthetic dimensions and facts ending today into a local store.
+
+    Args:
+        db: Connector on an embedded backend (schema created on connect)
+        rows: Approximate fact rows
+        seed: Random seed
+
+    Returns:
+        int: Fact rows written
+    """
+    scale = scale_for_rows(rows, DATA_LOAD_DAYS)
+    dimensions = generate_dimensions(scale['n_stores'], scale['n_products'])
+
+    for table, frame in dimensions.items():
+        db.load_table(f"dbo.{table}", frame)
+
+    written = 0
+    for chunk in iter_facts(**scale, seed=seed):
+        db.load_table("dbo.fact_kpi_metrics", chunk)
+        written += len(chunk)
+
+    return written
+
+
+def measure(
+    name: str,
+    func: Callable[[], Any],
+    setup: Optional[Callable[[], None]] = None
+) -> Dict[str, Any]:
+    """
+    Time one run of func, then repeat it under tracemalloc for peak memory.
+
+    Args:
+        name: Benchmark name
+        func: Zero-argument callable to run (its output is silenced)
+        setup: Optional callable run before each pass
+
+    Returns:
+        Dict: {name, seconds, peak_mb}
+    """
+    sink = io.StringIO()
+
+    if setup is not None:
+        setup()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(sink):
+        func()
+    elapsed = time.perf_counter() - start
+
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    with contextlib.redirect_stdout(sink):
+        func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {'name': name, 'seconds': round(elapsed, 4), 'peak_mb': round(peak / 1e6, 2)}
+
+
+def git_commit() -> Optional[str]:
+    """Current git commit, or None outside a work tree."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> None:
+    """Run the benchmark suite."""
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    out_path = sys.argv[2] if len(sys.argv) > 2 else "bench_results.json"
+    backend_name = sys.argv[3] if len(sys.argv) > 3 else "sqlite"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "anomaly_local.db")
+        backend = create_backend(backend_name, path)
+        db = AnomalyDBConnector(backend=backend)
+        written = build_local_db(db, rows)
+        end_date = datetime.today()
+        start_date = end_date - timedelta(days=DATA_LOAD_DAYS)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            detector = KPIAnomalyDetector(sensitivity="medium")
+            analyzer = RootCauseAnalyzer()
+            data = db.load_kpi_data(start_date, end_date)
+
+        daily = data.groupby('metric_date', as_index=False)[KPIS_TO_MONITOR].sum()
+        dates = daily['metric_date'].iloc[-ROOT_CAUSE_DATES:]
+
+        def root_causes_each() -> None:
+            for date in dates:
+                analyzer.find_root_causes(data, date, 'revenue')
+
+        def root_causes_cube() -> None:
+            cube = DimensionCube(data, KPIS_TO_MONITOR)
+            analyzer.find_root_causes_batch(data, dates, 'revenue', cube=cube)
+
+        def clear_logs() -> None:
+            with db.pool.connection() as conn:
+                conn.execute("DELETE FROM dbo.root_cause_drivers")
+                conn.execute("DELETE FROM dbo.anomaly_log")
+                conn.commit()
+
+        benchmarks = [
+            measure("load_kpi_data", lambda: db.load_kpi_data(start_date, end_date)),
+            measure(
+                "detect_anomalies[revenue]",
+                lambda: detector.detect_anomalies(daily, 'revenue')
+            ),
+            measure("detect_many", lambda: detector.detect_many(data, KPIS_TO_MONITOR)),
+            measure(f"find_root_causes x{len(dates)}", root_causes_each),
+            measure(f"find_root_causes_batch x{len(dates)} (cube)", root_causes_cube),
+            measure(
+                "main_pipeline",
+                lambda: main_pipeline.main(db=AnomalyDBConnector(backend=backend)),
+                setup=clear_logs
+            ),
+        ]
+        db.close()
+
+    results = {
+        'suite': 'bench_suite',
+        'commit': git_commit(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'backend': backend_name,
+        'rows': written,
+        'seed': SEED,
+        'benchmarks': benchmarks,
+    }
+
+    with open(out_path, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print(f"  Rows: {written:,}")
+    print("  " + "-" * 66)
+    for bench in benchmarks:
+        print(f"  {bench['name']:<42} {bench['seconds']:8.3f}s  peak {bench['peak_mb']:8.1f} MB")
+    print(f"  ✓ Results written to {out_path}")
+
+
+if __name__ == "__main__":
+    main()
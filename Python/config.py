@@ -15,6 +15,28 @@ DB_CONFIG = {
     "trusted_connection": True,  # Windows Authentication
 }
 
+# Database backend: "sqlserver" (DB_CONFIG), or an embedded local store
+# ("sqlite", or "duckdb" if installed) for offline runs and backtests
+DB_BACKEND = "sqlserver"
+
+# Database file for the embedded backends (":memory:" for in-process only)
+LOCAL_DB_PATH = "anomaly_local.db"
+
+# Connection pool settings
+POOL_MAX_SIZE = 4                   # Max open connections
+POOL_IDLE_TIMEOUT_SECONDS = 300     # Close connections idle longer than this
+POOL_HEALTH_CHECK_SECONDS = 30      # Ping connections idle longer than this on checkout
+POOL_CHECKOUT_TIMEOUT_SECONDS = 30  # Max wait for a free connection
+
+# Write-behind queue settings
+WRITE_BATCH_SIZE = 500        # Flush after this many queued writes
+WRITE_FLUSH_SECONDS = 1.0     # ...or after the oldest queued write waited this long
+WRITE_QUEUE_SIZE = 10000      # Producers block when this many writes are pending
+
+# Per-KPI executor settings
+KPI_WORKERS = 1               # Workers analyzing KPIs concurrently (1 = sequential)
+KPI_EXECUTOR = "process"      # "process" (fork-shared data) or "thread"
+
 # ==============================================================================
 # DETECTION PARAMETERS
 # ==============================================================================
@@ -29,6 +51,16 @@ SENSITIVITY_THRESHOLDS = {
 # Default sensitivity
 DEFAULT_SENSITIVITY = "medium"
 
+# Detection method: "zscore" (rolling mean/std) or "robust" (rolling
+# median and MAD, so one spike doesn't inflate the baseline and mask the
+# spikes after it for a whole window)
+DETECTION_METHOD = "zscore"
+
+# Score single-KPI detection on a contiguous float array (vectorized
+# severity) and build only the anomalous rows, instead of adding every
+# statistic as a full-length column
+NUMPY_DETECTION_KERNEL = True
+
 # Minimum contribution % to report as root cause driver
 MIN_CONTRIBUTION_PERCENT = 2.0
 
@@ -38,9 +70,78 @@ ROLLING_WINDOW_DAYS = 28
 # Lookback period for root cause comparison (days)
 LOOKBACK_PERIOD_DAYS = 28
 
+# Hierarchical drill-down over fact rows: walk these columns in order, e.g.
+# add "store_type" or "category" when dimension attributes are loaded. With
+# AGGREGATION_PUSHDOWN on, fact rows are fetched only for the anomalies'
+# dates and their lookback
+DRILL_DOWN = False
+DRILL_DOWN_HIERARCHY = ["region_id", "store_id", "product_id"]
+DRILL_DOWN_MAX_RESULTS = 10              # Cells reported per anomaly
+DRILL_DOWN_MAX_CELLS = 10000             # Cells expanded before stopping
+DRILL_DOWN_TIME_BUDGET_SECONDS = 2.0     # Wall time before stopping
+
 # Data loading period (days to look back from today)
 DATA_LOAD_DAYS = 90
 
+# Stream query results via cursor.fetchmany into typed NumPy column buffers
+# instead of a list of row tuples (lower peak memory on large loads)
+COLUMNAR_FETCH = False
+
+# Rows per fetchmany batch in columnar fetch mode
+FETCH_BATCH_SIZE = 50000
+
+# Push daily and per-dimension aggregation down to SQL Server so only
+# compact aggregates cross the wire instead of every fact row
+AGGREGATION_PUSHDOWN = True
+
+# Compact fact frames: categorical dimension attributes, downcast ids and
+# float32 measures where cent precision survives the round-trip
+COMPACT_FACTS = False
+
+# Fetch and group facts by integer ids only; dimension names come from an
+# in-memory cache of the dim tables and are resolved for top drivers only
+CACHED_DIMENSION_NAMES = True
+
+# Seconds before a cached dim table is re-validated against the database
+DIMENSION_CACHE_TTL_SECONDS = 3600
+
+# Days before the load watermark re-fetched on incremental loads, so
+# late-revised fact rows replace their stale local copies
+LATE_REVISION_DAYS = 3
+
+# Incremental detection: resume rolling window state from a checkpoint
+# and score only dates newer than the checkpoint
+INCREMENTAL_DETECTION = False
+
+# Checkpoint file for per-KPI rolling window state
+DETECTOR_STATE_PATH = "detector_state.json"
+
+# Idempotent logging: skip root cause analysis for anomalies already in
+# anomaly_log with the same score. Writes are always keyed on (KPI, date):
+# re-detected anomalies whose score or value changed (e.g. after late fact
+# revisions) are updated in place, keeping their triage status
+IDEMPOTENT_LOGGING = True
+
+# Segment detection: also score every (KPI × store/product/region) series
+SEGMENT_DETECTION = False
+
+# Segment anomalies of each run (CSV, overwritten per run)
+SEGMENT_ANOMALIES_PATH = "segment_anomalies.csv"
+
+# Series per rolling-statistics block in segment detection (bounds the
+# dates × series × window temporaries)
+SEGMENT_CHUNK_SERIES = 2048
+
+# Backfill (backfill.py): days of history scored per chunk; each chunk also
+# loads its own warm-up, so peak memory scales with this, not the range
+BACKFILL_CHUNK_DAYS = 90
+
+# Chunks processed concurrently on threads (1 = sequential, lowest memory)
+BACKFILL_WORKERS = 1
+
+# Checkpoint of the last fully logged backfill chunk, for resuming
+BACKFILL_CHECKPOINT_PATH = "backfill_state.json"
+
 # ==============================================================================
 # KPI CONFIGURATION
 # ==============================================================================
@@ -54,4 +155,56 @@ SEVERITY_THRESHOLDS = {
     "high": 3.0,
     "medium": 2.0,
     "low": 0.0,
-}
\ No newline at end of file
+}
+
+# ==============================================================================
+# INSTRUMENTATION
+# ==============================================================================
+
+# Per-stage timers and counters (rows, anomalies, DB round-trips, bytes,
+# peak memory) for each run; no-op hooks when off
+INSTRUMENTATION = False
+
+# Run report file and format: "json", or "prometheus" for the node
+# exporter textfile collector (e.g. ".../textfile/kpi_pipeline.prom")
+INSTRUMENTATION_REPORT_PATH = "run_report.json"
+INSTRUMENTATION_FORMAT = "json"
+
+# Deep dive: None, "cprofile" (pstats file) or "tracemalloc" (top
+# allocation sites), written to INSTRUMENTATION_PROFILE_PATH
+INSTRUMENTATION_PROFILE = None
+INSTRUMENTATION_PROFILE_PATH = "run_profile.prof"
+
+# ==============================================================================
+# STREAMING
+# ==============================================================================
+
+# Share of today that must have elapsed before its running totals are
+# projected to a full day and scored (earlier projections are too noisy)
+STREAM_MIN_DAY_FRACTION = 0.25
+
+# Bytes read per batch from a tailed file or socket connection
+STREAM_READ_BYTES = 1 << 20
+
+# Seconds between polls of a tailed file at end of file
+STREAM_POLL_SECONDS = 0.5
+
+# Parsed batches buffered between socket readers and the detector
+# (readers pause when it is full)
+STREAM_QUEUE_BATCHES = 64
+
+# ==============================================================================
+# SCHEDULER
+# ==============================================================================
+
+# KPI groups run by the scheduler daemon (scheduler.py), each either every
+# "interval" seconds or on a five-field "cron" spec (minute hour
+# day-of-month month day-of-week, local time)
+SCHEDULE = {
+    "all": {"kpis": KPIS_TO_MONITOR, "interval": 3600},
+}
+
+# Local health/trigger endpoint (GET /health, POST /run/<group>);
+# None disables it (SIGUSR1 still triggers every group)
+SCHEDULER_HOST = "127.0.0.1"
+SCHEDULER_PORT = 8765
@@ -0,0 +1,269 @@
+"""
+connection_pool.py - Connection Pool
+====================================
+Bounded, thread-safe pool of DB-API connections with health checks and
+idle eviction.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, List, Tuple
+
+from config import (
+    POOL_MAX_SIZE,
+    POOL_IDLE_TIMEOUT_SECONDS,
+    POOL_HEALTH_CHECK_SECONDS,
+    POOL_CHECKOUT_TIMEOUT_SECONDS,
+)
+
+
+class ConnectionPool:
+    """Bounded pool of reusable database connections."""
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        max_size: int = POOL_MAX_SIZE,
+        idle_timeout: float = POOL_IDLE_TIMEOUT_SECONDS,
+        health_check_after: float = POOL_HEALTH_CHECK_SECONDS,
+        checkout_timeout: float = POOL_CHECKOUT_TIMEOUT_SECONDS,
+        health_check_query: str = "SELECT 1"
+    ):
+        """
+        Initialize an empty pool; connections are opened on demand.
+        
+        Args:
+            connect: Zero-argument callable returning a new connection
+            max_size: Maximum number of open connections
+            idle_timeout: Seconds after which idle connections are closed
+            health_check_after: Idle seconds after which a connection is
+                pinged before being handed out
+            checkout_timeout: Seconds to wait for a free connection
+            health_check_query: Query used to ping a connection
+        """
+        self.connect = connect
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.health_check_after = health_check_after
+        self.checkout_timeout = checkout_timeout
+        self.health_check_query = health_check_query
+        
+        self._idle: List[Tuple[Any, float]] = []  # (connection, last_used)
+        self._open = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        
+        # Counters for instrumentation
+        self.connects = 0
+        self.reuses = 0
+        self.round_trips = 0
+        self._count_lock = threading.Lock()
+
+    def count_round_trip(self) -> None:
+        """Count one statement or fetch sent to the database."""
+        with self._count_lock:
+            self.round_trips += 1
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """
+        Check out a connection for the duration of a with-block.
+        
+        On an exception the connection is rolled back and discarded, since
+        its state is unknown; otherwise it goes back to the pool.
+        
+        Yields:
+            Connection: Pooled database connection (wrapped so statements
+                and fetches are counted in round_trips)
+        """
+        conn = self.acquire()
+        
+        try:
+            yield conn
+        except Exception:
+            self._discard(conn)
+            raise
+        else:
+            self.release(conn)
+
+    def acquire(self) -> Any:
+        """
+        Take a healthy connection from the pool, opening one if allowed.
+        
+        Returns:
+            Connection: Database connection (return it with release())
+            
+        Raises:
+            TimeoutError: No connection became free within checkout_timeout
+        """
+        deadline = time.monotonic() + self.checkout_timeout
+        
+        while True:
+            with self._cond:
+                if self._closed:
+                    raise RuntimeError("Connection pool is closed")
+                
+                self._evict_idle()
+                
+                if self._idle:
+                    conn, last_used = self._idle.pop()  # Most recently used
+                elif self._open < self.max_size:
+                    self._open += 1
+                    conn, last_used = None, None
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError(
+                            f"No free connection within {self.checkout_timeout}s"
+                        )
+                    self._cond.wait(remaining)
+                    continue
+            
+            # Open or ping outside the lock
+            if conn is None:
+                try:
+                    conn = _CountedConnection(self.connect(), self)
+                except Exception:
+                    with self._cond:
+                        self._open -= 1
+                        self._cond.notify()
+                    raise
+                self.connects += 1
+                return conn
+            
+            if time.monotonic() - last_used < self.health_check_after or self._ping(conn):
+                self.reuses += 1
+                return conn
+            
+            self._discard(conn)
+
+    def release(self, conn: Any) -> None:
+        """
+        Return a checked-out connection to the pool.
+        
+        Args:
+            conn: Connection obtained from acquire()
+        """
+        with self._cond:
+            if self._closed:
+                self._open -= 1
+                self._close_quietly(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def close(self) -> None:
+        """Close all idle connections and refuse further checkouts."""
+        with self._cond:
+            self._closed = True
+            for conn, _ in self._idle:
+                self._close_quietly(conn)
+            self._open -= len(self._idle)
+            self._idle = []
+            self._cond.notify_all()
+
+    @property
+    def size(self) -> int:
+        """Number of open connections (idle + checked out)."""
+        return self._open
+
+    def _discard(self, conn: Any) -> None:
+        """Roll back and close a connection, freeing its slot."""
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        self._close_quietly(conn)
+        
+        with self._cond:
+            self._open -= 1
+            self._cond.notify()
+
+    def _evict_idle(self) -> None:
+        """Close connections idle longer than idle_timeout (lock held)."""
+        cutoff = time.monotonic() - self.idle_timeout
+        expired = [conn for conn, last_used in self._idle if last_used < cutoff]
+        
+        if expired:
+            self._idle = [(c, t) for c, t in self._idle if t >= cutoff]
+            self._open -= len(expired)
+            for conn in expired:
+                self._close_quietly(conn)
+
+    def _ping(self, conn: Any) -> bool:
+        """Run the health check query; False if the connection is dead."""
+        try:
+            cursor = conn.cursor()
+            cursor.execute(self.health_check_query)
+            cursor.fetchone()
+            cursor.close()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close_quietly(conn: Any) -> None:
+        """Close a connection, ignoring errors from dead connections."""
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+class _CountedCursor:
+    """Cursor proxy counting execute and fetch calls as round trips."""
+
+    def __init__(self, cursor: Any, pool: ConnectionPool):
+        object.__setattr__(self, '_cursor', cursor)
+        object.__setattr__(self, '_pool', pool)
+
+    def execute(self, *args: Any) -> "_CountedCursor":
+        self._pool.count_round_trip()
+        self._cursor.execute(*args)
+        return self
+
+    def executemany(self, *args: Any) -> "_CountedCursor":
+        self._pool.count_round_trip()
+        self._cursor.executemany(*args)
+        return self
+
+    def fetchone(self) -> Any:
+        self._pool.count_round_trip()
+        return self._cursor.fetchone()
+
+    def fetchmany(self, *args: Any) -> List[Any]:
+        self._pool.count_round_trip()
+        return self._cursor.fetchmany(*args)
+
+    def fetchall(self) -> List[Any]:
+        self._pool.count_round_trip()
+        return self._cursor.fetchall()
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._cursor)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._cursor, name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        # Driver options such as pyodbc's fast_executemany
+        setattr(self._cursor, name, value)
+
+
+class _CountedConnection:
+    """Connection proxy whose cursors count round trips for the pool."""
+
+    def __init__(self, conn: Any, pool: ConnectionPool):
+        self._conn = conn
+        self._pool = pool
+
+    def cursor(self) -> _CountedCursor:
+        return _CountedCursor(self._conn.cursor(), self._pool)
+
+    def execute(self, *args: Any) -> _CountedCursor:
+        self._pool.count_round_trip()
+        return _CountedCursor(self._conn.execute(*args), self._pool)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._conn, name)
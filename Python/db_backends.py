@@ -0,0 +1,518 @@
+"""
+db_backends.py - Database Backends
+==================================
+SQL dialect and connection handling behind AnomalyDBConnector: SQL Server
+via pyodbc, or an embedded SQLite / DuckDB store for offline runs.
+"""
+
+import itertools
+import sqlite3
+import threading
+from typing import Any, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from config import DB_BACKEND, LOCAL_DB_PATH
+
+try:
+    import pyodbc
+except ImportError:  # Only required for the SQL Server backend
+    pyodbc = None
+
+try:
+    import duckdb
+except ImportError:  # Only required for the DuckDB backend
+    duckdb = None
+
+
+# Statement limits for multi-row INSERTs (SQL Server: 2100 parameters,
+# 1000 rows per VALUES clause)
+MAX_STATEMENT_PARAMS = 2000
+MAX_VALUES_ROWS = 1000
+
+
+# Schema of the embedded stores, mirroring SQL/Dropped Tables and Creating.sql.
+# {identity} is the backend's auto-increment primary key type.
+LOCAL_SCHEMA = {
+    'dim_regions': """
+        region_id INTEGER PRIMARY KEY,
+        region_name VARCHAR(100) NOT NULL,
+        country VARCHAR(50) NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    """,
+    'dim_stores': """
+        store_id INTEGER PRIMARY KEY,
+        store_name VARCHAR(100) NOT NULL,
+        region_id INTEGER NOT NULL,
+        store_type VARCHAR(50) NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    """,
+    'dim_products': """
+        product_id INTEGER PRIMARY KEY,
+        product_name VARCHAR(200) NOT NULL,
+        category VARCHAR(100) NOT NULL,
+        subcategory VARCHAR(100) NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    """,
+    'fact_kpi_metrics': """
+        metric_id {identity},
+        metric_date DATE NOT NULL,
+        store_id INTEGER NOT NULL,
+        product_id INTEGER NOT NULL,
+        region_id INTEGER NOT NULL,
+        revenue DOUBLE NOT NULL,
+        profit DOUBLE NOT NULL,
+        margin DOUBLE NOT NULL,
+        units_sold INTEGER NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    """,
+    'anomaly_log': """
+        anomaly_id {identity},
+        detection_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        metric_date DATE NOT NULL,
+        kpi_type VARCHAR(50) NOT NULL,
+        anomaly_score DOUBLE NOT NULL,
+        expected_value DOUBLE NOT NULL,
+        actual_value DOUBLE NOT NULL,
+        deviation_percent DOUBLE NOT NULL,
+        severity VARCHAR(20) NOT NULL,
+        status VARCHAR(20) DEFAULT 'new',
+        narrative TEXT,
+        assigned_to VARCHAR(100),
+        resolved_date TIMESTAMP,
+        resolution_notes TEXT
+    """,
+    'root_cause_drivers': """
+        driver_id {identity},
+        anomaly_id BIGINT NOT NULL,
+        driver_type VARCHAR(50) NOT NULL,
+        driver_entity_id INTEGER NOT NULL,
+        driver_entity_name VARCHAR(200) NOT NULL,
+        contribution_percent DOUBLE NOT NULL,
+        impact_value DOUBLE NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    """,
+}
+
+# Tables with an identity column
+IDENTITY_TABLES = ['fact_kpi_metrics', 'anomaly_log', 'root_cause_drivers']
+
+# (index name, table, columns) created by the embedded backends
+LOCAL_INDEXES = [
+    ('idx_metrics_date', 'fact_kpi_metrics', 'metric_date'),
+    ('idx_metrics_date_store', 'fact_kpi_metrics', 'metric_date, store_id'),
+    ('idx_anomaly_date', 'anomaly_log', 'metric_date'),
+    ('idx_anomaly_kpi_date', 'anomaly_log', 'kpi_type, metric_date'),
+    ('idx_driver_anomaly', 'root_cause_drivers', 'anomaly_id'),
+]
+
+
+def read_records(query: str, conn: Any, params: Sequence[Any]) -> pd.DataFrame:
+    """
+    Run a query into a DataFrame through the connection's cursor.
+
+    Does what pd.read_sql does for a plain DB-API connection, but accepts
+    any connection object (e.g. the pool's counting wrapper) without
+    pandas' warning about connections other than sqlite3 / SQLAlchemy.
+
+    Args:
+        query: SQL query with ? placeholders
+        conn: Open database connection
+        params: Query parameters
+
+    Returns:
+        pd.DataFrame: Query results
+    """
+    cursor = conn.cursor()
+    cursor.execute(query, list(params))
+    columns = [desc[0] for desc in cursor.description]
+    frame = pd.DataFrame.from_records(cursor.fetchall(), columns=columns, coerce_float=True)
+    cursor.close()
+    return frame
+
+
+class SQLServerBackend:
+    """SQL Server via pyodbc (the production database)."""
+
+    label = "SQL Server"
+    float_type = "FLOAT"
+
+    # Table hint holding the keys read by an upsert until it commits, so
+    # concurrent writers can't both insert the same (kpi_type, metric_date)
+    upsert_lock_hint = "WITH (UPDLOCK, HOLDLOCK)"
+
+    def __init__(self, conn_str: str):
+        """
+        Initialize with an ODBC connection string.
+
+        Args:
+            conn_str: pyodbc connection string
+        """
+        self.conn_str = conn_str
+
+    def connect(self) -> Any:
+        """
+        Open a new database connection.
+
+        Returns:
+            Connection: Active database connection
+        """
+        if pyodbc is None:
+            raise ImportError("pyodbc is required for SQL Server connections")
+
+        return pyodbc.connect(self.conn_str)
+
+    def describe(self, cursor: Any) -> Optional[Tuple[Any, Any, Any]]:
+        """
+        Identify the server for connection tests.
+
+        Args:
+            cursor: Open cursor
+
+        Returns:
+            Tuple: (server, database, user), or None if nothing came back
+        """
+        cursor.execute("""
+            SELECT
+                @@SERVERNAME AS ServerName,
+                DB_NAME() AS DatabaseName,
+                SUSER_NAME() AS CurrentUser
+        """)
+        row = cursor.fetchone()
+        return None if row is None else (row[0], row[1], row[2])
+
+    def read_frame(self, query: str, conn: Any, params: Sequence[Any]) -> pd.DataFrame:
+        """
+        Run a query into a DataFrame.
+
+        Args:
+            query: SQL query with ? placeholders
+            conn: Open database connection
+            params: Query parameters
+
+        Returns:
+            pd.DataFrame: Query results
+        """
+        return read_records(query, conn, params)
+
+    def insert_returning(
+        self,
+        cursor: Any,
+        table: str,
+        columns: Sequence[str],
+        rows: Sequence[Tuple[Any, ...]],
+        returning: Sequence[str]
+    ) -> List[Tuple[Any, ...]]:
+        """
+        Multi-row INSERT that returns selected columns of the new rows.
+
+        Rows are chunked to stay under the statement parameter and VALUES
+        row limits.
+
+        Args:
+            cursor: Open cursor (inside the caller's transaction)
+            table: Target table
+            columns: Inserted columns
+            rows: Row tuples matching columns
+            returning: Columns to return for each inserted row
+
+        Returns:
+            List: Returned row tuples (order not guaranteed)
+        """
+        chunk_size = min(MAX_VALUES_ROWS, MAX_STATEMENT_PARAMS // len(columns))
+        row_placeholder = "(" + ", ".join("?" * len(columns)) + ")"
+        returned = []
+
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            cursor.execute(
+                self._insert_returning_sql(
+                    table, columns, ", ".join([row_placeholder] * len(chunk)), returning
+                ),
+                [value for row in chunk for value in row]
+            )
+            returned.extend(tuple(row) for row in cursor.fetchall())
+
+        return returned
+
+    def _insert_returning_sql(
+        self,
+        table: str,
+        columns: Sequence[str],
+        values: str,
+        returning: Sequence[str]
+    ) -> str:
+        """T-SQL OUTPUT INSERTED form."""
+        output = ", ".join(f"INSERTED.{col}" for col in returning)
+        return f"INSERT INTO {table} ({', '.join(columns)}) OUTPUT {output} VALUES {values}"
+
+    def bulk_insert(self, conn: Any, table: str, frame: pd.DataFrame) -> None:
+        """
+        Append a DataFrame to a table (caller commits).
+
+        Args:
+            conn: Open database connection
+            table: Target table
+            frame: Rows with column names matching the table
+        """
+        frame = frame.copy()
+        for col in frame.columns:
+            if pd.api.types.is_datetime64_any_dtype(frame[col]):
+                frame[col] = frame[col].dt.strftime('%Y-%m-%d')
+
+        cursor = conn.cursor()
+        if hasattr(cursor, 'fast_executemany'):
+            cursor.fast_executemany = True
+
+        cursor.executemany(
+            f"INSERT INTO {table} ({', '.join(frame.columns)}) "
+            f"VALUES ({', '.join('?' * len(frame.columns))})",
+            list(frame.itertuples(index=False, name=None))
+        )
+
+    def create_schema(self, conn: Any) -> None:
+        """Schema is managed by the SQL scripts in SQL/."""
+
+
+class SQLiteBackend(SQLServerBackend):
+    """Embedded SQLite file attached as schema dbo."""
+
+    label = "SQLite (embedded)"
+    float_type = "REAL"
+    upsert_lock_hint = ""  # A concurrent writer fails the upsert instead
+    identity = "INTEGER PRIMARY KEY AUTOINCREMENT"
+
+    _memory_ids = itertools.count()
+
+    def __init__(self, path: str = LOCAL_DB_PATH):
+        """
+        Initialize the store; the schema is created on first connect.
+
+        Args:
+            path: Database file, or ":memory:" for a private in-memory
+                store shared by this backend's connections
+        """
+        self.path = path
+        self._keeper = None
+        self._schema_ready = False
+        self._lock = threading.Lock()
+
+        if path == ":memory:":
+            # Shared-cache memory database, kept alive by one connection
+            self.path = f"file:anomaly_local_{next(self._memory_ids)}?mode=memory&cache=shared"
+            self._keeper = self._open()
+
+    def connect(self) -> sqlite3.Connection:
+        """
+        Open a new connection with the store attached as dbo.
+
+        Returns:
+            sqlite3.Connection: Active connection (usable across threads)
+        """
+        conn = self._open()
+
+        with self._lock:
+            if not self._schema_ready:
+                self.create_schema(conn)
+                conn.commit()
+                self._schema_ready = True
+
+        return conn
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(":memory:", uri=True, timeout=30, check_same_thread=False)
+        conn.execute("ATTACH DATABASE ? AS dbo", (self.path,))
+        if self._keeper is None and not self.path.startswith("file:"):
+            conn.execute("PRAGMA dbo.journal_mode=WAL")
+        return conn
+
+    def describe(self, cursor: Any) -> Optional[Tuple[Any, Any, Any]]:
+        cursor.execute("SELECT sqlite_version()")
+        return (f"SQLite {cursor.fetchone()[0]}", self.path, "local")
+
+    def _insert_returning_sql(
+        self,
+        table: str,
+        columns: Sequence[str],
+        values: str,
+        returning: Sequence[str]
+    ) -> str:
+        """Standard RETURNING form."""
+        return (
+            f"INSERT INTO {table} ({', '.join(columns)}) "
+            f"VALUES {values} RETURNING {', '.join(returning)}"
+        )
+
+    def create_schema(self, conn: Any) -> None:
+        """
+        Create the fact, dimension and logging tables if missing.
+
+        Args:
+            conn: Open database connection
+        """
+        for table, columns in LOCAL_SCHEMA.items():
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS dbo.{table} "
+                f"({columns.format(identity=self.identity)})"
+            )
+        for name, table, columns in LOCAL_INDEXES:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS dbo.{name} ON {table} ({columns})")
+
+
+class DuckDBBackend(SQLiteBackend):
+    """Embedded DuckDB database (columnar scans) with schema dbo."""
+
+    label = "DuckDB (embedded)"
+    float_type = "DOUBLE"
+    identity = "BIGINT PRIMARY KEY DEFAULT nextval('dbo.{table}_seq')"
+
+    def __init__(self, path: str = LOCAL_DB_PATH):
+        """
+        Open the database; the schema is created on first connect.
+
+        Args:
+            path: Database file, or ":memory:"
+        """
+        if duckdb is None:
+            raise ImportError("duckdb is required for the DuckDB backend")
+
+        self.path = path
+        self._schema_ready = False
+        self._lock = threading.Lock()
+        self._db = duckdb.connect(path)
+
+    def _open(self) -> "_DuckDBConnection":
+        # cursor() opens another connection to the same database
+        return _DuckDBConnection(self._db.cursor())
+
+    def describe(self, cursor: Any) -> Optional[Tuple[Any, Any, Any]]:
+        cursor.execute("SELECT version()")
+        return (f"DuckDB {cursor.fetchone()[0]}", self.path, "local")
+
+    def read_frame(self, query: str, conn: Any, params: Sequence[Any]) -> pd.DataFrame:
+        """Columnar result straight into a DataFrame."""
+        return conn.execute(query, list(params)).df()
+
+    def bulk_insert(self, conn: Any, table: str, frame: pd.DataFrame) -> None:
+        """Columnar append of a DataFrame (caller commits)."""
+        columns = ", ".join(frame.columns)
+        conn.register_frame("_bulk_frame", frame)
+        conn.execute(f"INSERT INTO {table} ({columns}) SELECT {columns} FROM _bulk_frame")
+        conn.unregister_frame("_bulk_frame")
+
+    def create_schema(self, conn: Any) -> None:
+        """
+        Create the fact, dimension and logging tables if missing.
+
+        Args:
+            conn: Open database connection
+        """
+        conn.execute("CREATE SCHEMA IF NOT EXISTS dbo")
+        for table in IDENTITY_TABLES:
+            conn.execute(f"CREATE SEQUENCE IF NOT EXISTS dbo.{table}_seq")
+        for table, columns in LOCAL_SCHEMA.items():
+            identity = self.identity.format(table=table)
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS dbo.{table} "
+                f"({columns.format(identity=identity)})"
+            )
+        for name, table, columns in LOCAL_INDEXES:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON dbo.{table} ({columns})")
+
+
+class _DuckDBConnection:
+    """
+    DB-API shim over a DuckDB connection.
+
+    cursor() returns the connection itself so statements share the
+    caller's transaction, and a transaction is opened on the first write
+    after each commit (reads stay in autocommit and see fresh data).
+    """
+
+    def __init__(self, conn: Any):
+        self._conn = conn
+        self._in_transaction = False
+
+    def cursor(self) -> "_DuckDBConnection":
+        return self
+
+    def execute(self, query: str, params: Optional[Sequence[Any]] = None) -> "_DuckDBConnection":
+        if query.lstrip()[:6].upper() in ("INSERT", "UPDATE", "DELETE"):
+            self._begin()
+        self._conn.execute(query, list(params) if params is not None else [])
+        return self
+
+    def executemany(self, query: str, rows: Sequence[Sequence[Any]]) -> "_DuckDBConnection":
+        self._begin()
+        self._conn.executemany(query, [list(row) for row in rows])
+        return self
+
+    def fetchone(self) -> Any:
+        return self._conn.fetchone()
+
+    def fetchmany(self, size: int) -> List[Any]:
+        return self._conn.fetchmany(size)
+
+    def fetchall(self) -> List[Any]:
+        return self._conn.fetchall()
+
+    def df(self) -> pd.DataFrame:
+        return self._conn.df()
+
+    @property
+    def description(self) -> Any:
+        return self._conn.description
+
+    def register_frame(self, name: str, frame: pd.DataFrame) -> None:
+        self._begin()
+        self._conn.register(name, frame)
+
+    def unregister_frame(self, name: str) -> None:
+        self._conn.unregister(name)
+
+    def commit(self) -> None:
+        if self._in_transaction:
+            self._conn.commit()
+            self._in_transaction = False
+
+    def rollback(self) -> None:
+        if self._in_transaction:
+            self._conn.rollback()
+            self._in_transaction = False
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def _begin(self) -> None:
+        if not self._in_transaction:
+            self._conn.execute("BEGIN TRANSACTION")
+            self._in_transaction = True
+
+
+def create_backend(
+    name: str = DB_BACKEND,
+    path: str = LOCAL_DB_PATH,
+    conn_str: Optional[str] = None
+) -> SQLServerBackend:
+    """
+    Build a backend by name.
+
+    Args:
+        name: "sqlserver", "sqlite" or "duckdb"
+        path: Database file for the embedded backends
+        conn_str: ODBC connection string for SQL Server
+
+    Returns:
+        SQLServerBackend: The backend (embedded ones subclass it)
+    """
+    if name == "sqlserver":
+        return SQLServerBackend(conn_str or "")
+    if name == "sqlite":
+        return SQLiteBackend(path)
+    if name == "duckdb":
+        return DuckDBBackend(path)
+
+    raise ValueError(f"Unknown database backend: {name!r}")
@@ -1,21 +1,319 @@
 """
 db_connector.py - Database Connector
 ====================================
-Handles all SQL Server database operations using pyodbc.
+Handles all database operations, on SQL Server (pyodbc) or an embedded
+local backend (see db_backends.py).
 """
 
-import pyodbc
+import itertools
+import re
+
+import numpy as np
 import pandas as pd
-from typing import Dict, List, Optional, Any
+from datetime import timedelta
+from typing import Callable, Dict, List, Optional, Any, Sequence, Tuple
+
+from config import (
+    DB_CONFIG,
+    DB_BACKEND,
+    POOL_MAX_SIZE,
+    DATA_LOAD_DAYS,
+    LATE_REVISION_DAYS,
+    COLUMNAR_FETCH,
+    FETCH_BATCH_SIZE,
+    COMPACT_FACTS,
+)
+from anomaly_batch import AnomalyBatch, DriverBatch
+from connection_pool import ConnectionPool
+from db_backends import SQLServerBackend, create_backend
+from dimension_cache import DimensionCache
+
+try:
+    import pyarrow as pa
+except ImportError:  # Only required for Arrow output
+    pa = None
+
+
+# Fact rows joined with their dimension attributes
+KPI_DATA_SELECT = """
+        SELECT 
+            fm.metric_date,
+            fm.store_id,
+            fm.product_id,
+            fm.region_id,
+            fm.revenue,
+            fm.profit,
+            fm.margin,
+            fm.units_sold,
+            ds.store_name,
+            ds.store_type,
+            dp.product_name,
+            dp.category,
+            dr.region_name
+        FROM dbo.fact_kpi_metrics fm
+        LEFT JOIN dbo.dim_stores ds ON fm.store_id = ds.store_id
+        LEFT JOIN dbo.dim_products dp ON fm.product_id = dp.product_id
+        LEFT JOIN dbo.dim_regions dr ON fm.region_id = dr.region_id
+"""
+
+# Fact rows alone, keyed by integer dimension ids
+KPI_FACT_SELECT = """
+        SELECT 
+            fm.metric_date,
+            fm.store_id,
+            fm.product_id,
+            fm.region_id,
+            fm.revenue,
+            fm.profit,
+            fm.margin,
+            fm.units_sold
+        FROM dbo.fact_kpi_metrics fm
+"""
+
+
+# Dimension id column -> (table, alias) for joins and the dimension cache
+DIMENSION_TABLES = {
+    'store_id': ('dbo.dim_stores', 'ds'),
+    'product_id': ('dbo.dim_products', 'dp'),
+    'region_id': ('dbo.dim_regions', 'dr'),
+}
+
+# Column dtypes for columnar fetch (unlisted columns stay object)
+KPI_DATA_DTYPES = {
+    'metric_date': 'datetime64[ns]',
+    'store_id': np.int64,
+    'product_id': np.int64,
+    'region_id': np.int64,
+    'revenue': np.float64,
+    'profit': np.float64,
+    'margin': np.float64,
+    'units_sold': np.int64,
+}
+
+ANOMALY_DTYPES = {
+    'anomaly_id': np.int64,
+    'metric_date': 'datetime64[ns]',
+    'deviation_percent': np.float64,
+    'actual_value': np.float64,
+    'expected_value': np.float64,
+    'anomaly_score': np.float64,
+}
+
+
+# Compact representation of KPI data frames
+CATEGORICAL_COLUMNS = ['store_name', 'store_type', 'product_name', 'category', 'region_name']
+INTEGER_COLUMNS = ['store_id', 'product_id', 'region_id', 'units_sold']
+MEASURE_COLUMNS = ['revenue', 'profit', 'margin']
 
-from config import DB_CONFIG
+# Max absolute error allowed when storing a measure as float32 (half a cent)
+FLOAT32_TOLERANCE = 0.005
+
+
+def compact_kpi_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Shrink a KPI data frame in place.
+    
+    Dimension attributes become categoricals, ids and counts are downcast
+    to the smallest integer type that holds them, and measures become
+    float32 when every value round-trips within FLOAT32_TOLERANCE.
+    On 5M synthetic fact rows with their joined names (bench_compact.py)
+    this cuts the frame from about 2.0 GB to 170 MB.
+    Totals summed from float32 measures may differ from the float64 path
+    by about a cent; detection and root causes sum in float64.
+    
+    Args:
+        df: Frame returned by load_kpi_data
+        
+    Returns:
+        pd.DataFrame: The same frame, compacted
+    """
+    for col in CATEGORICAL_COLUMNS:
+        if col in df:
+            df[col] = df[col].astype('category')
+    
+    for col in INTEGER_COLUMNS:
+        if col in df and df[col].notna().all():
+            df[col] = pd.to_numeric(df[col], downcast='integer')
+    
+    for col in MEASURE_COLUMNS:
+        if col not in df:
+            continue
+        values = df[col].to_numpy(dtype=np.float64)
+        narrow = values.astype(np.float32)
+        error = np.abs(narrow.astype(np.float64) - values)
+        if np.nanmax(error, initial=0.0) <= FLOAT32_TOLERANCE:
+            df[col] = narrow
+    
+    return df
+
+
+def _column_chunk(values: Sequence[Any], kind: np.dtype) -> np.ndarray:
+    """
+    One fetched batch of a column as a typed array.
+    
+    Dates (strings, date or datetime objects) are parsed in one vectorized
+    call. Integer columns holding NULLs come back as float64 with NaN.
+    Repeated values of object columns share one object, so the batch's
+    per-row strings can be freed.
+    """
+    if kind.kind == 'M':
+        return pd.to_datetime(pd.Index(values, dtype=object)).to_numpy(kind)
+    
+    if kind == object:
+        codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+        chunk = uniques.astype(object, copy=False).take(codes)
+        chunk[codes < 0] = None
+        return chunk
+    
+    try:
+        return np.array(values, dtype=kind)
+    except TypeError:
+        return np.array(values, dtype=np.float64)
+
+
+def fetch_columnar(
+    cursor: Any,
+    dtypes: Dict[str, Any],
+    batch_size: int = FETCH_BATCH_SIZE
+) -> Dict[str, np.ndarray]:
+    """
+    Stream an executed cursor into typed NumPy columns.
+    
+    Rows are pulled with fetchmany and each batch is converted to one
+    typed array per column right away, so only one batch of row tuples is
+    alive at a time. The batches are concatenated once at the end, one
+    column at a time, so the peak stays near the final arrays plus one
+    column. Decimals become floats, NULLs become NaN/NaT in float and date
+    columns, and an integer column with NULLs falls back to float64.
+    
+    Args:
+        cursor: DB-API cursor after execute()
+        dtypes: Column name -> NumPy dtype (unlisted columns are object)
+        batch_size: Rows per fetchmany call
+        
+    Returns:
+        Dict: {column_name: array}
+    """
+    names = [desc[0] for desc in cursor.description]
+    kinds = [np.dtype(dtypes.get(name, object)) for name in names]
+    chunks: List[List[np.ndarray]] = [[] for _ in names]
+    
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        
+        for column, kind, values in zip(chunks, kinds, zip(*rows)):
+            column.append(_column_chunk(values, kind))
+        del rows
+    
+    columns = {}
+    for name, kind, column in zip(names, kinds, chunks):
+        if not column:
+            columns[name] = np.empty(0, dtype=kind)
+            continue
+        
+        # A float batch (NULLs in an integer column) promotes the column
+        columns[name] = np.concatenate(column)
+        column.clear()
+    
+    return columns
+
+
+def fetch_arrow(
+    cursor: Any,
+    dtypes: Dict[str, Any],
+    batch_size: int = FETCH_BATCH_SIZE
+) -> Any:
+    """
+    Stream an executed cursor into a pyarrow Table (requires pyarrow).
+    
+    Args:
+        cursor: DB-API cursor after execute()
+        dtypes: Column name -> NumPy dtype (unlisted columns are object)
+        batch_size: Rows per fetchmany call
+        
+    Returns:
+        pyarrow.Table: Query results
+    """
+    if pa is None:
+        raise ImportError("pyarrow is required for Arrow output")
+    
+    return pa.table(fetch_columnar(cursor, dtypes, batch_size))
+
+
+# Columns written by the bulk logging path
+ANOMALY_COLUMNS = [
+    'metric_date', 'kpi_type', 'anomaly_score', 'expected_value',
+    'actual_value', 'deviation_percent', 'severity'
+]
+
+DRIVER_COLUMNS = [
+    'anomaly_id', 'driver_type', 'driver_entity_id', 'driver_entity_name',
+    'contribution_percent', 'impact_value'
+]
+
+
+# Half a unit in the last stored digit of anomaly_score / actual_value, so
+# re-detections that round to the logged values count as unchanged
+SCORE_TOLERANCE = 0.00005
+VALUE_TOLERANCE = 0.005
+
+
+def same_as_logged(
+    logged: Tuple[int, float, float, str],
+    z_score: float,
+    actual_value: float,
+    severity: str
+) -> bool:
+    """
+    Whether a re-detected anomaly matches its logged row.
+
+    Args:
+        logged: (anomaly_id, anomaly_score, actual_value, severity) as
+            from load_known_anomalies
+        z_score: Re-detected Z-score
+        actual_value: Re-detected value
+        severity: Re-detected severity
+
+    Returns:
+        bool: True if score, value and severity are unchanged as stored
+    """
+    _, logged_score, logged_actual, logged_severity = logged
+    return (
+        abs(round(float(z_score), 4) - logged_score) <= SCORE_TOLERANCE
+        and abs(round(float(actual_value), 2) - logged_actual) <= VALUE_TOLERANCE
+        and severity == logged_severity
+    )
+
+
+def _date_str(value: Any) -> str:
+    """Format a date-like value as YYYY-MM-DD."""
+    if hasattr(value, 'strftime'):
+        return value.strftime('%Y-%m-%d')
+    return str(value)
 
 
 class AnomalyDBConnector:
     """SQL Server database connector for anomaly detection system."""
 
-    def __init__(self):
-        """Initialize connection string for SQL Server."""
+    def __init__(
+        self,
+        connect_factory: Optional[Callable[[], Any]] = None,
+        pool_size: int = POOL_MAX_SIZE,
+        backend: Optional[SQLServerBackend] = None
+    ):
+        """
+        Initialize connection string and database backend.
+        
+        Args:
+            connect_factory: Optional zero-argument callable returning a
+                DB-API connection (e.g. a local SQLite stand-in). Defaults
+                to the backend's own connections.
+            pool_size: Maximum pooled connections
+            backend: SQL dialect and connections (default: DB_BACKEND,
+                i.e. SQL Server with DB_CONFIG)
+        """
         self.conn_str = (
             f"DRIVER={{{DB_CONFIG['driver']}}};"
             f"SERVER={DB_CONFIG['server']};"
@@ -24,15 +322,70 @@ class AnomalyDBConnector:
         )
         self.server = DB_CONFIG['server']
         self.database = DB_CONFIG['database']
+        self.connect_factory = connect_factory
+        self.backend = backend or create_backend(DB_BACKEND, conn_str=self.conn_str)
+        self.columnar_fetch = COLUMNAR_FETCH
+        self.compact = COMPACT_FACTS
+        
+        # Connections are reused across calls and threads
+        self.pool = ConnectionPool(self.get_connection, max_size=pool_size)
+        
+        # Small dim tables held in memory for name lookups
+        self.dimensions = DimensionCache(self.pool, read_frame=self.backend.read_frame)
+        
+        # Locally held fact history for watermark-based loading
+        self.history = pd.DataFrame()
+        self.watermark: Optional[pd.Timestamp] = None
+        self.history_with_names = True
+        
+        # Locally held aggregates per (KPIs, dimensions, names) request:
+        # (watermark, daily_totals, {dimension_name: dimension_totals})
+        self.aggregates: Dict[Tuple[Any, ...], Tuple[pd.Timestamp, pd.DataFrame, Dict[str, pd.DataFrame]]] = {}
 
-    def get_connection(self) -> pyodbc.Connection:
+    def get_connection(self) -> Any:
         """
-        Get a database connection.
+        Open a new (unpooled) database connection.
         
         Returns:
-            pyodbc.Connection: Active database connection
+            Connection: Active database connection
         """
-        return pyodbc.connect(self.conn_str)
+        if self.connect_factory is not None:
+            return self.connect_factory()
+        
+        return self.backend.connect()
+
+    def close(self) -> None:
+        """Close all pooled connections."""
+        self.pool.close()
+
+    def _read_frame(
+        self,
+        query: str,
+        conn: Any,
+        params: Sequence[Any],
+        dtypes: Dict[str, Any]
+    ) -> pd.DataFrame:
+        """
+        Run a query into a DataFrame, columnar or as row tuples.
+        
+        Args:
+            query: SQL query with ? placeholders
+            conn: Open database connection
+            params: Query parameters
+            dtypes: Column dtypes for columnar fetch
+            
+        Returns:
+            pd.DataFrame: Query results
+        """
+        if not self.columnar_fetch:
+            return self.backend.read_frame(query, conn, params)
+        
+        cursor = conn.cursor()
+        cursor.execute(query, list(params))
+        columns = fetch_columnar(cursor, dtypes)
+        cursor.close()
+        
+        return pd.DataFrame(columns, copy=False)
 
     def test_connection(self) -> bool:
         """
@@ -42,29 +395,20 @@ class AnomalyDBConnector:
             bool: True if connection successful, False otherwise
         """
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                SELECT 
-                    @@SERVERNAME AS ServerName,
-                    DB_NAME() AS DatabaseName,
-                    SUSER_NAME() AS CurrentUser
-            """)
-            
-            result = cursor.fetchone()
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                result = self.backend.describe(cursor)
             
             if result is None:
                 print(f"  ✗ Connection test returned no results")
-                conn.close()
                 return False
             
-            print(f"  ✓ Connected to SQL Server")
-            print(f"    Server   : {result.ServerName}")
-            print(f"    Database : {result.DatabaseName}")
-            print(f"    User     : {result.CurrentUser}")
+            server, database, user = result
+            print(f"  ✓ Connected to {self.backend.label}")
+            print(f"    Server   : {server}")
+            print(f"    Database : {database}")
+            print(f"    User     : {user}")
             
-            conn.close()
             return True
             
         except Exception as e:
@@ -74,7 +418,8 @@ class AnomalyDBConnector:
     def load_kpi_data(
         self, 
         start_date: Any, 
-        end_date: Any
+        end_date: Any,
+        with_names: bool = True
     ) -> pd.DataFrame:
         """
         Load KPI metrics with dimension data.
@@ -82,48 +427,25 @@ class AnomalyDBConnector:
         Args:
             start_date: Start date for data range
             end_date: End date for data range
+            with_names: Join dimension attributes; when False, rows carry
+                integer ids only (see resolve_driver_names)
             
         Returns:
             pd.DataFrame: KPI data with dimensions
         """
-        # Convert dates to string format
-        if hasattr(start_date, 'strftime'):
-            start_str = start_date.strftime('%Y-%m-%d')
-        else:
-            start_str = str(start_date)
+        start_str = _date_str(start_date)
+        end_str = _date_str(end_date)
+        select = KPI_DATA_SELECT if with_names else KPI_FACT_SELECT
         
-        if hasattr(end_date, 'strftime'):
-            end_str = end_date.strftime('%Y-%m-%d')
-        else:
-            end_str = str(end_date)
-        
-        query = f"""
-        SELECT 
-            fm.metric_date,
-            fm.store_id,
-            fm.product_id,
-            fm.region_id,
-            fm.revenue,
-            fm.profit,
-            fm.margin,
-            fm.units_sold,
-            ds.store_name,
-            ds.store_type,
-            dp.product_name,
-            dp.category,
-            dr.region_name
-        FROM dbo.fact_kpi_metrics fm
-        LEFT JOIN dbo.dim_stores ds ON fm.store_id = ds.store_id
-        LEFT JOIN dbo.dim_products dp ON fm.product_id = dp.product_id
-        LEFT JOIN dbo.dim_regions dr ON fm.region_id = dr.region_id
-        WHERE CAST(fm.metric_date AS DATE) BETWEEN '{start_str}' AND '{end_str}'
+        # Plain range predicate on the DATE column so the date index is usable
+        query = select + """
+        WHERE fm.metric_date BETWEEN ? AND ?
         ORDER BY fm.metric_date
         """
         
-        conn = self.get_connection()
-        
         try:
-            df = pd.read_sql(query, conn)
+            with self.pool.connection() as conn:
+                df = self._read_frame(query, conn, [start_str, end_str], KPI_DATA_DTYPES)
             
             if df.empty:
                 print(f"  ⚠ No data found between {start_str} and {end_str}")
@@ -132,14 +454,417 @@ class AnomalyDBConnector:
             # Convert metric_date to datetime
             df['metric_date'] = pd.to_datetime(df['metric_date'])
             
+            if self.compact:
+                df = compact_kpi_frame(df)
+            
             return df
             
         except Exception as e:
             print(f"  ✗ Error loading data: {e}")
             return pd.DataFrame()
+
+    def load_metric_dates(
+        self,
+        start_date: Optional[Any] = None,
+        end_date: Optional[Any] = None
+    ) -> pd.DatetimeIndex:
+        """
+        Distinct fact dates, e.g. to plan chunked backfills.
+
+        Args:
+            start_date: Earliest date (default: no lower bound)
+            end_date: Latest date (default: no upper bound)
+
+        Returns:
+            pd.DatetimeIndex: Sorted dates with at least one fact row
+                (empty on error)
+        """
+        query = "SELECT DISTINCT fm.metric_date FROM dbo.fact_kpi_metrics fm"
+        predicates = []
+        params = []
+
+        if start_date is not None:
+            predicates.append("fm.metric_date >= ?")
+            params.append(_date_str(start_date))
+        if end_date is not None:
+            predicates.append("fm.metric_date <= ?")
+            params.append(_date_str(end_date))
+        if predicates:
+            query += " WHERE " + " AND ".join(predicates)
+        query += " ORDER BY fm.metric_date"
+
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(query, params)
+                rows = cursor.fetchall()
+
+            return pd.DatetimeIndex(pd.to_datetime([row[0] for row in rows]))
+
+        except Exception as e:
+            print(f"  ✗ Error loading metric dates: {e}")
+            return pd.DatetimeIndex([])
+
+    def load_known_anomalies(
+        self,
+        start_date: Any,
+        end_date: Optional[Any] = None
+    ) -> Optional[Dict[Tuple[str, pd.Timestamp], Tuple[int, float, float, str]]]:
+        """
+        Anomalies already logged in a date range, keyed like the detector's.
+
+        Served by the (kpi_type, metric_date) index. If a key was logged
+        more than once (by runs before idempotent logging), the latest
+        row wins.
+
+        Args:
+            start_date: Earliest metric date
+            end_date: Latest metric date (default: no upper bound)
+
+        Returns:
+            Dict: {(kpi_type, metric_date): (anomaly_id, anomaly_score,
+                actual_value, severity)}, or None on error
+        """
+        query = """
+        SELECT al.anomaly_id, al.kpi_type, al.metric_date,
+               al.anomaly_score, al.actual_value, al.severity
+        FROM dbo.anomaly_log al
+        WHERE al.metric_date >= ?
+        """
+        params = [_date_str(start_date)]
+
+        if end_date is not None:
+            query += " AND al.metric_date <= ?"
+            params.append(_date_str(end_date))
+        query += " ORDER BY al.anomaly_id"
+
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(query, params)
+                rows = cursor.fetchall()
+
+            return {
+                (kpi_type, pd.Timestamp(metric_date)): (
+                    int(anomaly_id), float(score), float(actual), severity
+                )
+                for anomaly_id, kpi_type, metric_date, score, actual, severity in rows
+            }
+
+        except Exception as e:
+            print(f"  ✗ Error loading known anomalies: {e}")
+            return None
+
+    def load_kpi_data_since(
+        self,
+        watermark: Optional[Any] = None,
+        history_days: int = DATA_LOAD_DAYS,
+        with_names: bool = True
+    ) -> pd.DataFrame:
+        """
+        Incrementally load KPI data newer than a watermark.
+        
+        Fetches only rows from LATE_REVISION_DAYS before the watermark
+        onwards (so late-revised rows are picked up), replaces those dates
+        in the locally held history and trims it to history_days. Without a
+        watermark (first call), loads the full history_days window; so does
+        a call whose with_names differs from the held history's.
+        
+        Args:
+            watermark: Last loaded metric_date (default: remembered one)
+            history_days: Days of history to keep locally
+            with_names: Join dimension attributes; when False, rows carry
+                integer ids only (see resolve_driver_names)
+            
+        Returns:
+            pd.DataFrame: Merged KPI history with dimensions
+        """
+        if with_names != self.history_with_names:
+            self.history = pd.DataFrame()
+            self.watermark = None
+            self.history_with_names = with_names
+        
+        if watermark is None:
+            watermark = self.watermark
+        
+        if watermark is None:
+            end_date = pd.Timestamp.today().normalize()
+            fetch_start = end_date - timedelta(days=history_days)
+        else:
+            fetch_start = pd.Timestamp(watermark).normalize() - timedelta(days=LATE_REVISION_DAYS)
+        
+        select = KPI_DATA_SELECT if with_names else KPI_FACT_SELECT
+        query = select + """
+        WHERE fm.metric_date >= ?
+        ORDER BY fm.metric_date
+        """
+        
+        try:
+            with self.pool.connection() as conn:
+                delta = self._read_frame(
+                    query, conn, [_date_str(fetch_start)], KPI_DATA_DTYPES
+                )
+            delta['metric_date'] = pd.to_datetime(delta['metric_date'])
+            
+        except Exception as e:
+            print(f"  ✗ Error loading data: {e}")
+            return self.history
+        
+        # Replace re-fetched dates, keep older history
+        if self.history.empty:
+            history = delta
+        else:
+            kept = self.history[self.history['metric_date'] < fetch_start]
+            history = pd.concat([kept, delta], ignore_index=True)
+        
+        if not history.empty:
+            self.watermark = history['metric_date'].max()
+            cutoff = self.watermark - timedelta(days=history_days)
+            history = history[history['metric_date'] >= cutoff].reset_index(drop=True)
+            
+            if self.compact:
+                history = compact_kpi_frame(history)
+        
+        self.history = history
+        
+        print(
+            f"  ✓ Fetched {len(delta):,} row(s) since {_date_str(fetch_start)}"
+            f" — history holds {len(history):,} row(s)"
+        )
+        
+        return history
+
+    def load_kpi_aggregates(
+        self,
+        start_date: Any,
+        end_date: Any,
+        kpi_columns: Sequence[str],
+        dimensions: Optional[Dict[str, Tuple[str, str]]] = None,
+        with_names: bool = True
+    ) -> Tuple[pd.DataFrame, Dict[str, pd.DataFrame]]:
+        """
+        Load server-side aggregates instead of fact rows.
+        
+        Runs one GROUP BY metric_date query for all KPIs and, for root
+        cause analysis, one GROUP BY (metric_date, id, name) query per
+        dimension. Every result carries a row_count column with the number
+        of fact rows aggregated. Without names, dimensions are grouped by
+        (metric_date, id) on the fact table alone.
+        
+        Args:
+            start_date: Start date for data range
+            end_date: End date for data range
+            kpi_columns: KPI columns to sum
+            dimensions: {dimension_name: (id_col, name_col)} to aggregate
+                by, or None for daily totals only
+            with_names: Join each dimension table for its name column
+            
+        Returns:
+            Tuple: (daily_totals, {dimension_name: dimension_totals});
+                daily_totals is empty on error
+        """
+        for column in kpi_columns:
+            if not re.fullmatch(r"\w+", column):
+                raise ValueError(f"Invalid KPI column name: {column!r}")
+        
+        params = [_date_str(start_date), _date_str(end_date)]
+        sums = ",\n            ".join(
+            f"CAST(SUM(fm.{kpi}) AS {self.backend.float_type}) AS {kpi}"
+            for kpi in kpi_columns
+        )
+        dtypes = {
+            'metric_date': 'datetime64[ns]',
+            'row_count': np.int64,
+            **{kpi: np.float64 for kpi in kpi_columns},
+        }
+        
+        totals_query = f"""
+        SELECT 
+            fm.metric_date,
+            {sums},
+            COUNT(*) AS row_count
+        FROM dbo.fact_kpi_metrics fm
+        WHERE fm.metric_date BETWEEN ? AND ?
+        GROUP BY fm.metric_date
+        ORDER BY fm.metric_date
+        """
+        
+        try:
+            with self.pool.connection() as conn:
+                daily_totals = self._read_frame(totals_query, conn, params, dtypes)
+                daily_totals['metric_date'] = pd.to_datetime(daily_totals['metric_date'])
+                
+                dimension_totals = {}
+                for dim_name, (id_col, name_col) in (dimensions or {}).items():
+                    table, alias = DIMENSION_TABLES[id_col]
+                    if with_names:
+                        name = f"{alias}.{name_col}"
+                        select = f"fm.{id_col}, {name}"
+                        join = f"LEFT JOIN {table} {alias} ON fm.{id_col} = {alias}.{id_col}"
+                        group = f"fm.metric_date, fm.{id_col}, {name}"
+                    else:
+                        select = f"fm.{id_col}"
+                        join = ""
+                        group = f"fm.metric_date, fm.{id_col}"
+                    query = f"""
+                    SELECT 
+                        fm.metric_date,
+                        {select},
+                        {sums},
+                        COUNT(*) AS row_count
+                    FROM dbo.fact_kpi_metrics fm
+                    {join}
+                    WHERE fm.metric_date BETWEEN ? AND ?
+                    GROUP BY {group}
+                    """
+                    frame = self._read_frame(
+                        query, conn, params, {**dtypes, id_col: np.int64}
+                    )
+                    frame['metric_date'] = pd.to_datetime(frame['metric_date'])
+                    dimension_totals[dim_name] = frame
+            
+            if daily_totals.empty:
+                print(f"  ⚠ No data found between {params[0]} and {params[1]}")
+            
+            return daily_totals, dimension_totals
+            
+        except Exception as e:
+            print(f"  ✗ Error loading aggregates: {e}")
+            return pd.DataFrame(), {}
+
+    def load_kpi_aggregates_since(
+        self,
+        end_date: Any,
+        kpi_columns: Sequence[str],
+        dimensions: Optional[Dict[str, Tuple[str, str]]] = None,
+        with_names: bool = True,
+        history_days: int = DATA_LOAD_DAYS
+    ) -> Tuple[pd.DataFrame, Dict[str, pd.DataFrame]]:
+        """
+        Incrementally refresh locally held aggregates up to end_date.
+        
+        The aggregate counterpart of load_kpi_data_since: the first call
+        loads history_days before end_date, later calls re-aggregate only
+        from LATE_REVISION_DAYS before the last loaded date, replace those
+        dates and drop dates older than history_days. The result matches
+        load_kpi_aggregates over the same window.
+        
+        Args:
+            end_date: Last date to load
+            kpi_columns: KPI columns to sum
+            dimensions: {dimension_name: (id_col, name_col)} to aggregate
+                by, or None for daily totals only
+            with_names: Join each dimension table for its name column
+            history_days: Days of history to keep locally
+            
+        Returns:
+            Tuple: (daily_totals, {dimension_name: dimension_totals}) as for
+                load_kpi_aggregates; the held aggregates if the refresh fails
+        """
+        key = (tuple(kpi_columns), tuple(dimensions or {}), with_names)
+        end = pd.Timestamp(end_date).normalize()
+        cutoff = end - timedelta(days=history_days)
+        held = self.aggregates.get(key)
+        
+        if held is None:
+            fetch_start = cutoff
+        else:
+            fetch_start = max(cutoff, held[0] - timedelta(days=LATE_REVISION_DAYS))
         
-        finally:
-            conn.close()
+        daily_delta, dimension_delta = self.load_kpi_aggregates(
+            fetch_start, end, kpi_columns, dimensions, with_names
+        )
+        
+        if daily_delta.empty and held is not None:
+            return held[1], held[2]
+        
+        def splice(kept: Optional[pd.DataFrame], delta: pd.DataFrame) -> pd.DataFrame:
+            # Replace re-fetched dates, keep older history inside the window
+            if kept is None:
+                return delta
+            kept = kept[(kept['metric_date'] >= cutoff) & (kept['metric_date'] < fetch_start)]
+            return pd.concat([kept, delta], ignore_index=True)
+        
+        held_daily, held_dimensions = (None, {}) if held is None else held[1:]
+        daily = splice(held_daily, daily_delta)
+        dimension_totals = {
+            dim_name: splice(held_dimensions.get(dim_name), frame)
+            for dim_name, frame in dimension_delta.items()
+        }
+        
+        if not daily.empty:
+            self.aggregates[key] = (daily['metric_date'].max(), daily, dimension_totals)
+        
+        print(
+            f"  ✓ Re-aggregated {len(daily_delta):,} day(s) since {_date_str(fetch_start)}"
+            f" — holding {len(daily):,} day(s)"
+        )
+        
+        return daily, dimension_totals
+
+    def resolve_driver_names(
+        self,
+        drivers: pd.DataFrame,
+        dimensions: Dict[str, Tuple[str, str]]
+    ) -> pd.DataFrame:
+        """
+        Fill entity names for ranked drivers from the dimension cache.
+        
+        Only the (few) top drivers are looked up, so fact queries can
+        skip the dimension joins entirely. Ids missing from the dimension
+        table, or any cache error, fall back to the id as the name.
+        
+        Args:
+            drivers: Long-format drivers (driver_type, entity_id, entity_name)
+            dimensions: {dimension_name: (id_col, name_col)}
+            
+        Returns:
+            pd.DataFrame: The drivers with entity_name filled in
+        """
+        if drivers.empty:
+            return drivers
+        
+        names = drivers['entity_name'].astype(object)
+        
+        try:
+            for dim_name, (id_col, name_col) in dimensions.items():
+                missing = (drivers['driver_type'] == dim_name) & names.isna()
+                if not missing.any():
+                    continue
+                table, _ = DIMENSION_TABLES[id_col]
+                names[missing] = self.dimensions.names(
+                    table, id_col, name_col, drivers.loc[missing, 'entity_id']
+                )
+        except Exception as e:
+            print(f"  ⚠ Dimension names unavailable: {e}")
+        
+        fallback = drivers['entity_id'].astype(str)
+        drivers['entity_name'] = names.where(names.notna(), fallback)
+        
+        return drivers
+
+    def load_table(self, table: str, frame: pd.DataFrame) -> bool:
+        """
+        Append rows to a table, e.g. to seed an embedded store with
+        dimension and fact data.
+        
+        Args:
+            table: Target table (e.g. 'dbo.fact_kpi_metrics')
+            frame: Rows with column names matching the table
+            
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        try:
+            with self.pool.connection() as conn:
+                self.backend.bulk_insert(conn, table, frame)
+                conn.commit()
+            
+            return True
+            
+        except Exception as e:
+            print(f"  ✗ Error loading {table}: {e}")
+            return False
 
     def log_anomaly(self, anomaly_record: Dict[str, Any]) -> Optional[int]:
         """
@@ -151,54 +876,47 @@ class AnomalyDBConnector:
         Returns:
             int: Anomaly ID if successful, None otherwise
         """
+        row = (
+            anomaly_record['metric_date'],
+            anomaly_record['kpi_name'],
+            anomaly_record['z_score'],
+            anomaly_record['expected_value'],
+            anomaly_record['actual_value'],
+            anomaly_record['deviation_percent'],
+            anomaly_record['severity']
+        )
+        
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            query = """
-            INSERT INTO dbo.anomaly_log 
-                (metric_date, kpi_type, anomaly_score, expected_value, 
-                 actual_value, deviation_percent, severity)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            """
-            
-            cursor.execute(
-                query,
-                anomaly_record['metric_date'],
-                anomaly_record['kpi_name'],
-                anomaly_record['z_score'],
-                anomaly_record['expected_value'],
-                anomaly_record['actual_value'],
-                anomaly_record['deviation_percent'],
-                anomaly_record['severity']
-            )
-            
-            # Get the inserted anomaly_id
-            cursor.execute("SELECT @@IDENTITY AS anomaly_id")
-            row = cursor.fetchone()
-            
-            if row is None:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                
+                # Insert and get the new anomaly_id in one statement
+                returned = self._insert_returning(
+                    cursor, 'dbo.anomaly_log', ANOMALY_COLUMNS, [row], ['anomaly_id']
+                )
+                
                 conn.commit()
-                conn.close()
-                return None
-            
-            anomaly_id = int(row[0])
             
-            conn.commit()
-            conn.close()
+            if not returned:
+                return None
             
-            return anomaly_id
+            return int(returned[0][0])
             
         except Exception as e:
             print(f"  ✗ Error logging anomaly: {e}")
             return None
 
-    def log_root_causes(self, drivers: List[Dict[str, Any]]) -> bool:
+    def log_root_causes(
+        self,
+        drivers: List[Dict[str, Any]],
+        raise_errors: bool = False
+    ) -> bool:
         """
         Insert root cause driver records.
         
         Args:
             drivers: List of driver dictionaries
+            raise_errors: Raise database errors instead of printing them
             
         Returns:
             bool: True if successful, False otherwise
@@ -206,41 +924,303 @@ class AnomalyDBConnector:
         if not drivers:
             return True
         
+        query = """
+        INSERT INTO dbo.root_cause_drivers 
+            (anomaly_id, driver_type, driver_entity_id, driver_entity_name,
+             contribution_percent, impact_value)
+        VALUES (?, ?, ?, ?, ?, ?)
+        """
+        
+        # Bulk insert
+        records = [
+            (
+                d['anomaly_id'],
+                d['driver_type'],
+                d['entity_id'],
+                d['entity_name'],
+                d['contribution_percent'],
+                d['impact_value']
+            )
+            for d in drivers
+        ]
+        
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            query = """
-            INSERT INTO dbo.root_cause_drivers 
-                (anomaly_id, driver_type, driver_entity_id, driver_entity_name,
-                 contribution_percent, impact_value)
-            VALUES (?, ?, ?, ?, ?, ?)
-            """
-            
-            # Bulk insert
-            records = [
-                (
-                    d['anomaly_id'],
-                    d['driver_type'],
-                    d['entity_id'],
-                    d['entity_name'],
-                    d['contribution_percent'],
-                    d['impact_value']
-                )
-                for d in drivers
-            ]
-            
-            cursor.executemany(query, records)
-            
-            conn.commit()
-            conn.close()
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                cursor.executemany(query, records)
+                conn.commit()
             
             return True
             
         except Exception as e:
+            if raise_errors:
+                raise
             print(f"  ✗ Error logging root causes: {e}")
             return False
 
+    def retract_anomalies(
+        self,
+        keys: Sequence[Tuple[str, Any]],
+        raise_errors: bool = False
+    ) -> Optional[int]:
+        """
+        Delete logged anomalies and their root causes by key, in one
+        transaction (e.g. an intraday projection the closed day didn't
+        confirm).
+        
+        Args:
+            keys: (kpi_name, metric_date) of the anomalies to delete
+            raise_errors: Raise database errors instead of printing them
+            
+        Returns:
+            int: Anomaly rows deleted, or None on failure
+        """
+        if not keys:
+            return 0
+        
+        rows = [(kpi_name, _date_str(metric_date)) for kpi_name, metric_date in keys]
+        
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                
+                # Drivers first; only SQL Server cascades the delete
+                cursor.executemany(
+                    "DELETE FROM dbo.root_cause_drivers WHERE anomaly_id IN ("
+                    "SELECT anomaly_id FROM dbo.anomaly_log "
+                    "WHERE kpi_type = ? AND metric_date = ?)",
+                    rows
+                )
+                deleted = 0
+                for row in rows:
+                    cursor.execute(
+                        "DELETE FROM dbo.anomaly_log WHERE kpi_type = ? AND metric_date = ?", row
+                    )
+                    deleted += max(cursor.rowcount, 0)
+                conn.commit()
+            
+            return deleted
+            
+        except Exception as e:
+            if raise_errors:
+                raise
+            print(f"  ✗ Error retracting anomalies: {e}")
+            return None
+
+    def log_anomalies_bulk(
+        self,
+        records: List[Dict[str, Any]],
+        drivers_by_key: Dict[Tuple[str, Any], List[Dict[str, Any]]],
+        raise_errors: bool = False
+    ) -> Optional[Dict[Tuple[str, Any], int]]:
+        """
+        Insert a run's anomalies and their root causes in one transaction.
+        
+        Record-at-a-time form of log_anomaly_batch, for callers that build
+        dictionaries (e.g. the write-behind queue).
+        
+        Args:
+            records: Anomaly dictionaries as for log_anomaly
+            drivers_by_key: {(kpi_name, metric_date): driver dictionaries
+                as for log_root_causes, without anomaly_id}
+            raise_errors: Raise database errors instead of printing them
+            
+        Returns:
+            Dict: {(kpi_name, metric_date): anomaly_id}, or None on failure
+        """
+        if not records:
+            return {}
+        
+        keys = [(r['kpi_name'], r['metric_date']) for r in records]
+        anomalies = AnomalyBatch.from_records(records)
+        drivers = DriverBatch.from_records([drivers_by_key.get(key, []) for key in keys])
+        
+        anomaly_ids = self._log_batch(anomalies, drivers, raise_errors)
+        if anomaly_ids is None:
+            return None
+        
+        return dict(zip(keys, anomaly_ids.tolist()))
+
+    def log_anomaly_batch(
+        self,
+        anomalies: AnomalyBatch,
+        drivers: Optional[DriverBatch] = None,
+        raise_errors: bool = False
+    ) -> Optional[np.ndarray]:
+        """
+        Upsert a batch of anomalies and their root causes in one transaction.
+        
+        Rows are keyed on (kpi_type, metric_date), so re-running any date
+        range never logs an anomaly twice:
+        
+        - New keys go in as multi-row INSERTs that return the generated ids
+          (one statement per few hundred rows).
+        - Keys already logged with the same score, value and severity are
+          left alone, drivers included.
+        - Keys logged with a different score, value or severity are
+          UPDATEd in place, keeping their triage columns (status,
+          assigned_to, ...), and their drivers are rewritten.
+        
+        Drivers are mapped to the ids and written with a single executemany
+        (fast mode when the driver supports it). Either everything is
+        committed or nothing.
+        
+        Args:
+            anomalies: Anomalies, one row per (kpi_name, metric_date)
+            drivers: Their root cause drivers
+            raise_errors: Raise database errors instead of printing them
+            
+        Returns:
+            np.ndarray: anomaly_id of every anomaly row, or None on failure
+        """
+        return self._log_batch(anomalies, drivers, raise_errors)
+
+    def _log_batch(
+        self,
+        anomalies: AnomalyBatch,
+        drivers: Optional[DriverBatch],
+        raise_errors: bool = False
+    ) -> Optional[np.ndarray]:
+        """Shared body of log_anomaly_batch and log_anomalies_bulk."""
+        if len(anomalies) == 0:
+            return np.empty(0, dtype=np.int64)
+        
+        # Returned keys are normalized to match regardless of date type
+        row_of = {
+            (kpi_name, _date_str(metric_date)): i
+            for i, (kpi_name, metric_date) in enumerate(anomalies.keys())
+        }
+        if len(row_of) < len(anomalies):
+            raise ValueError("Anomaly batch has duplicate (kpi_name, metric_date) keys")
+        
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                logged = self._logged_rows(cursor, anomalies)
+                
+                anomaly_ids = np.zeros(len(anomalies), dtype=np.int64)
+                written = np.ones(len(anomalies), dtype=bool)
+                inserts, updates = [], []
+                for i, (key, row) in enumerate(zip(row_of, anomalies.rows())):
+                    match = logged.get(key)
+                    if match is None:
+                        inserts.append(row)
+                        continue
+                    
+                    anomaly_ids[i] = match[0]
+                    if same_as_logged(match, row[2], row[4], row[6]):
+                        written[i] = False
+                    else:
+                        updates.append(row[2:] + (match[0],))
+                
+                for anomaly_id, kpi_type, metric_date in self._insert_returning(
+                    cursor, 'dbo.anomaly_log', ANOMALY_COLUMNS, inserts,
+                    ['anomaly_id', 'kpi_type', 'metric_date']
+                ):
+                    anomaly_ids[row_of[(kpi_type, _date_str(metric_date))]] = int(anomaly_id)
+                
+                if not anomaly_ids.all():
+                    raise RuntimeError("Not every inserted anomaly id was returned")
+                
+                if updates:
+                    # Changed scores in place; their drivers are rewritten below
+                    cursor.executemany(
+                        "UPDATE dbo.anomaly_log SET anomaly_score = ?, expected_value = ?, "
+                        "actual_value = ?, deviation_percent = ?, severity = ? "
+                        "WHERE anomaly_id = ?",
+                        updates
+                    )
+                    cursor.executemany(
+                        "DELETE FROM dbo.root_cause_drivers WHERE anomaly_id = ?",
+                        [(row[-1],) for row in updates]
+                    )
+                
+                if drivers is not None and len(drivers):
+                    driver_rows = list(itertools.compress(
+                        drivers.rows(anomaly_ids), written[drivers.anomaly_index]
+                    ))
+                    if driver_rows:
+                        if hasattr(cursor, 'fast_executemany'):
+                            cursor.fast_executemany = True
+                        
+                        placeholders = ", ".join("?" * len(DRIVER_COLUMNS))
+                        cursor.executemany(
+                            f"INSERT INTO dbo.root_cause_drivers "
+                            f"({', '.join(DRIVER_COLUMNS)}) VALUES ({placeholders})",
+                            driver_rows
+                        )
+                
+                conn.commit()
+            
+            return anomaly_ids
+            
+        except Exception as e:
+            if raise_errors:
+                raise
+            print(f"  ✗ Error bulk logging anomalies: {e}")
+            return None
+
+    def _logged_rows(
+        self,
+        cursor: Any,
+        anomalies: AnomalyBatch
+    ) -> Dict[Tuple[str, str], Tuple[int, float, float, str]]:
+        """
+        Logged rows for a batch's keys, read inside the upsert transaction.
+        
+        Args:
+            cursor: Open cursor (inside the caller's transaction)
+            anomalies: Batch about to be written
+            
+        Returns:
+            Dict: {(kpi_type, 'YYYY-MM-DD'): (anomaly_id, anomaly_score,
+                actual_value, severity)}, latest row per key
+        """
+        kpis = sorted(set(anomalies.kpi_name.tolist()))
+        query = (
+            f"SELECT anomaly_id, kpi_type, metric_date, anomaly_score, actual_value, severity "
+            f"FROM dbo.anomaly_log {self.backend.upsert_lock_hint} "
+            f"WHERE metric_date >= ? AND metric_date <= ? "
+            f"AND kpi_type IN ({', '.join('?' * len(kpis))}) "
+            f"ORDER BY anomaly_id"
+        )
+        cursor.execute(query, [
+            _date_str(anomalies.metric_date.min()), _date_str(anomalies.metric_date.max()), *kpis
+        ])
+        
+        return {
+            (kpi_type, _date_str(metric_date)): (
+                int(anomaly_id), float(score), float(actual), severity
+            )
+            for anomaly_id, kpi_type, metric_date, score, actual, severity in cursor.fetchall()
+        }
+
+    def _insert_returning(
+        self,
+        cursor: Any,
+        table: str,
+        columns: List[str],
+        rows: List[Tuple[Any, ...]],
+        returning: List[str]
+    ) -> List[Tuple[Any, ...]]:
+        """
+        Multi-row INSERT that returns selected columns of the new rows.
+        
+        Delegates to the backend (OUTPUT INSERTED on SQL Server, RETURNING
+        on the embedded stores), chunked under the statement limits.
+        
+        Args:
+            cursor: Open cursor (inside the caller's transaction)
+            table: Target table
+            columns: Inserted columns
+            rows: Row tuples matching columns
+            returning: Columns to return for each inserted row
+            
+        Returns:
+            List: Returned row tuples (order not guaranteed)
+        """
+        return self.backend.insert_returning(cursor, table, columns, rows, returning)
+
     def get_recent_anomalies(self, days: int = 30) -> pd.DataFrame:
         """
         Retrieve recent anomalies.
@@ -251,7 +1231,10 @@ class AnomalyDBConnector:
         Returns:
             pd.DataFrame: Recent anomalies
         """
-        query = f"""
+        # Same cutoff as metric_date >= DATEADD(DAY, -days, GETDATE())
+        cutoff = _date_str(pd.Timestamp.today().normalize() - timedelta(days=days))
+        
+        query = """
         SELECT 
             al.anomaly_id,
             al.metric_date,
@@ -262,12 +1245,11 @@ class AnomalyDBConnector:
             al.expected_value,
             al.anomaly_score
         FROM dbo.anomaly_log al
-        WHERE al.metric_date >= DATEADD(DAY, -{days}, GETDATE())
+        WHERE al.metric_date > ?
         ORDER BY al.metric_date DESC, al.severity DESC
         """
         
-        conn = self.get_connection()
-        df = pd.read_sql(query, conn)
-        conn.close()
+        with self.pool.connection() as conn:
+            df = self._read_frame(query, conn, [cutoff], ANOMALY_DTYPES)
         
         return df
\ No newline at end of file
@@ -0,0 +1,126 @@
+"""
+dimension_cache.py - Dimension Cache
+====================================
+In-memory copies of the small dimension tables, so fact queries can skip
+the dimension joins and names are resolved only where they are displayed.
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from config import DIMENSION_CACHE_TTL_SECONDS
+from db_backends import read_records
+
+
+class DimensionCache:
+    """TTL + version validated cache of dimension tables."""
+
+    def __init__(
+        self,
+        pool: Any,
+        ttl: float = DIMENSION_CACHE_TTL_SECONDS,
+        read_frame: Optional[Callable[[str, Any, Sequence[Any]], pd.DataFrame]] = None
+    ):
+        """
+        Initialize an empty cache; tables load on first use.
+        
+        Args:
+            pool: ConnectionPool to read through
+            ttl: Seconds a cached table is trusted before its version
+                (row count + MAX(updated_at)) is re-checked
+            read_frame: (query, conn, params) -> DataFrame reader
+                (default: read_records)
+        """
+        self.pool = pool
+        self.ttl = ttl
+        self.read_frame = read_frame or read_records
+        
+        self._tables: Dict[str, pd.DataFrame] = {}
+        self._versions: Dict[str, Optional[Tuple[Any, ...]]] = {}
+        self._checked: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        
+        # Counter for instrumentation
+        self.loads = 0
+
+    def table(self, table: str, id_col: str) -> pd.DataFrame:
+        """
+        Get a dimension table indexed by its id column.
+        
+        Within the TTL the cached copy is returned without a round-trip;
+        after it, the table is reloaded only if its version changed (or
+        its version cannot be determined).
+        
+        Args:
+            table: Dimension table name (e.g. 'dbo.dim_stores')
+            id_col: Primary key column
+            
+        Returns:
+            pd.DataFrame: Dimension rows indexed by id_col
+        """
+        with self._lock:
+            now = time.monotonic()
+            
+            if table in self._tables and now - self._checked[table] < self.ttl:
+                return self._tables[table]
+            
+            version = self._version(table)
+            
+            if (table not in self._tables or version is None or
+                    version != self._versions[table]):
+                with self.pool.connection() as conn:
+                    frame = self.read_frame(f"SELECT * FROM {table}", conn, [])
+                self._tables[table] = frame.set_index(id_col)
+                self.loads += 1
+                print(f"  ✓ Cached {table} ({len(frame):,} rows)")
+            
+            self._versions[table] = version
+            self._checked[table] = now
+            
+            return self._tables[table]
+
+    def names(
+        self,
+        table: str,
+        id_col: str,
+        name_col: str,
+        ids: pd.Series
+    ) -> pd.Series:
+        """
+        Look up display names for entity ids.
+        
+        Args:
+            table: Dimension table name
+            id_col: Primary key column
+            name_col: Name column
+            ids: Entity ids
+            
+        Returns:
+            pd.Series: Names aligned with ids (NaN where unknown)
+        """
+        lookup = self.table(table, id_col)[name_col]
+        return pd.Series(
+            lookup.reindex(ids.to_numpy()).to_numpy(),
+            index=ids.index
+        )
+
+    def invalidate(self) -> None:
+        """Drop all cached tables."""
+        with self._lock:
+            self._tables.clear()
+            self._versions.clear()
+            self._checked.clear()
+
+    def _version(self, table: str) -> Optional[Tuple[Any, ...]]:
+        """Cheap change signal for a table, or None if unavailable."""
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(f"SELECT COUNT(*), MAX(updated_at) FROM {table}")
+                row = cursor.fetchone()
+            return tuple(row)
+        except Exception:
+            return None
@@ -0,0 +1,386 @@
+"""
+instrumentation.py - Pipeline Instrumentation
+=============================================
+Stage timers, counters and peak memory for a pipeline run, written as a
+JSON report or a Prometheus textfile, with optional cProfile/tracemalloc
+deep dives. When disabled every hook is a no-op.
+"""
+
+import contextlib
+import cProfile
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, Optional
+
+import pandas as pd
+
+from config import (
+    INSTRUMENTATION,
+    INSTRUMENTATION_REPORT_PATH,
+    INSTRUMENTATION_FORMAT,
+    INSTRUMENTATION_PROFILE,
+    INSTRUMENTATION_PROFILE_PATH,
+)
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+_DISABLED = contextlib.nullcontext()
+
+# Metric name prefix in Prometheus output
+METRIC_PREFIX = "kpi_pipeline"
+
+
+def _frame_bytes(frame: Any) -> int:
+    """Shallow in-memory size of a DataFrame (0 for anything else)."""
+    if isinstance(frame, pd.DataFrame):
+        return int(frame.memory_usage(index=False).sum())
+    return 0
+
+
+def _db_counters(db: Any) -> Dict[str, int]:
+    """Lifetime pool and dimension cache counters of a connector."""
+    return {
+        'db_connects': db.pool.connects,
+        'db_checkouts': db.pool.connects + db.pool.reuses,
+        'db_round_trips': db.pool.round_trips,
+        'dimension_table_loads': db.dimensions.loads,
+    }
+
+
+def _peak_rss_bytes() -> Optional[int]:
+    """
+    Peak resident set size of this process, if the platform reports it.
+
+    A high-water mark over the process lifetime (it never goes down), not
+    the peak of one run.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return int(peak if sys.platform == "darwin" else peak * 1024)
+
+
+class Instrumentation:
+    """Collects stage timings and counters for one pipeline run."""
+
+    def __init__(
+        self,
+        enabled: bool = INSTRUMENTATION,
+        profile: Optional[str] = INSTRUMENTATION_PROFILE
+    ):
+        """
+        Initialize an empty run record.
+
+        Args:
+            enabled: Record anything at all
+            profile: None, "cprofile" or "tracemalloc" for a deep dive
+        """
+        if profile not in (None, "cprofile", "tracemalloc"):
+            raise ValueError(f"Unknown profiler: {profile!r}")
+
+        self.enabled = enabled
+        self.profile = profile if enabled else None
+
+        self.stages: Dict[str, float] = {}
+        self.calls: Dict[str, int] = {}
+        self.counters: Dict[str, float] = {}
+
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        self._db_baseline: Dict[str, int] = {}
+        self._profiler: Optional[cProfile.Profile] = None
+
+        if self.profile == "cprofile":
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        elif self.profile == "tracemalloc":
+            tracemalloc.start()
+
+    def stage(self, name: str) -> Any:
+        """
+        Context manager timing a pipeline stage (accumulates on re-entry).
+
+        Args:
+            name: Stage name (e.g. 'load', 'detection')
+
+        Returns:
+            Context manager
+        """
+        if not self.enabled:
+            return _DISABLED
+        return self._timed(name)
+
+    @contextlib.contextmanager
+    def _timed(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._add_time(name, time.perf_counter() - start)
+
+    def count(self, name: str, value: float = 1) -> None:
+        """
+        Increment a counter.
+
+        Args:
+            name: Counter name (e.g. 'rows_loaded')
+            value: Amount to add
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def wrap(
+        self,
+        obj: Any,
+        stages: Dict[str, str],
+        measure: Optional[Dict[str, Callable[[Any], Dict[str, float]]]] = None
+    ) -> Any:
+        """
+        Time selected methods of an object in place.
+
+        Methods already wrapped by an earlier run are re-pointed at this
+        run, so long-lived objects can be instrumented once per run.
+
+        Args:
+            obj: Object to instrument (returned unchanged when disabled)
+            stages: {method_name: stage_name}
+            measure: {method_name: fn(result) -> {counter: increment}}
+
+        Returns:
+            The same object
+        """
+        if not self.enabled:
+            return obj
+
+        measure = measure or {}
+        for method_name, stage_name in stages.items():
+            method = getattr(obj, method_name)
+            # Objects reused across runs are re-wrapped, not stacked
+            method = getattr(method, '_instrumented', method)
+            setattr(obj, method_name, self._wrapped(
+                method, stage_name, measure.get(method_name)
+            ))
+        return obj
+
+    def _wrapped(
+        self,
+        method: Callable[..., Any],
+        stage_name: str,
+        measure: Optional[Callable[[Any], Dict[str, float]]]
+    ) -> Callable[..., Any]:
+        @functools.wraps(method)
+        def timed(*args: Any, **kwargs: Any) -> Any:
+            start = time.perf_counter()
+            try:
+                result = method(*args, **kwargs)
+            finally:
+                self._add_time(stage_name, time.perf_counter() - start)
+            if measure is not None:
+                for counter, value in measure(result).items():
+                    self.count(counter, value)
+            return result
+        timed._instrumented = method
+        return timed
+
+    def _add_time(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+            self.calls[name] = self.calls.get(name, 0) + 1
+
+    def instrument_connector(self, db: Any) -> Any:
+        """
+        Time and count database calls of an AnomalyDBConnector.
+
+        Its pool and cache counters are snapshotted here, so the report
+        covers this run only even when the connector is long-lived (e.g.
+        the scheduler's resident daemon).
+        """
+        if self.enabled:
+            self._db_baseline = _db_counters(db)
+
+        def loaded(result: Any) -> Dict[str, float]:
+            # load_kpi_aggregates returns (daily_totals, {dimension: frame})
+            frames = [result[0], *result[1].values()] if isinstance(result, tuple) else [result]
+            return {
+                'rows_fetched': sum(len(f) for f in frames),
+                'bytes_fetched': sum(_frame_bytes(f) for f in frames),
+            }
+
+        def logged(result: Any) -> Dict[str, float]:
+            return {'anomalies_logged': len(result)} if result is not None else {}
+
+        return self.wrap(
+            db,
+            {
+                'test_connection': 'connect',
+                'load_kpi_data': 'load',
+                'load_kpi_data_since': 'load',
+                'load_kpi_aggregates': 'load',
+                'resolve_driver_names': 'dimension_names',
+                'log_anomaly': 'writes',
+                'log_root_causes': 'writes',
+                'log_anomalies_bulk': 'writes',
+                'log_anomaly_batch': 'writes',
+            },
+            {
+                'load_kpi_data': loaded,
+                'load_kpi_data_since': loaded,
+                'load_kpi_aggregates': loaded,
+                'log_anomalies_bulk': logged,
+                'log_anomaly_batch': logged,
+            }
+        )
+
+    def instrument_detector(self, detector: Any) -> Any:
+        """Time detection methods of a KPIAnomalyDetector."""
+        def detected(result: Any) -> Dict[str, float]:
+            return {'anomalies_detected': len(result)}
+
+        return self.wrap(
+            detector,
+            {
+                'detect_anomalies': 'detection',
+                'detect_many': 'detection',
+                'detect_incremental': 'detection',
+                'detect_segments': 'segment_detection',
+            },
+            {
+                'detect_many': detected,
+                'detect_incremental': detected,
+                'detect_segments': lambda result: {'segment_anomalies': len(result)},
+            }
+        )
+
+    def instrument_analyzer(self, analyzer: Any) -> Any:
+        """
+        Time root cause methods of a RootCauseAnalyzer.
+
+        Calls made in forked worker processes are not seen by the parent;
+        time and count in the consuming stage of the caller to cover them.
+        """
+        return self.wrap(
+            analyzer,
+            {
+                'find_root_causes': 'root_cause',
+                'find_root_causes_batch': 'root_cause',
+                'drill_down': 'drill_down',
+            }
+        )
+
+    def report(self, db: Any = None) -> Dict[str, Any]:
+        """
+        Snapshot of the run so far.
+
+        Args:
+            db: Optional connector whose pool and cache counters to include
+                (since instrument_connector; db_round_trips counts
+                statements and fetches)
+
+        Returns:
+            Dict: Run report
+        """
+        counters = dict(self.counters)
+
+        if db is not None:
+            for name, value in _db_counters(db).items():
+                counters[name] = value - self._db_baseline.get(name, 0)
+
+        peak_rss = _peak_rss_bytes()
+        if peak_rss is not None:
+            counters['process_peak_rss_bytes'] = peak_rss
+
+        if self.profile == "tracemalloc" and tracemalloc.is_tracing():
+            counters['peak_traced_bytes'] = tracemalloc.get_traced_memory()[1]
+
+        return {
+            'finished_at': datetime.now().isoformat(timespec='seconds'),
+            'total_seconds': round(time.perf_counter() - self._started, 4),
+            'stages': {
+                name: {'seconds': round(seconds, 4), 'calls': self.calls[name]}
+                for name, seconds in self.stages.items()
+            },
+            'counters': counters,
+        }
+
+    def finish(
+        self,
+        db: Any = None,
+        path: str = INSTRUMENTATION_REPORT_PATH,
+        fmt: str = INSTRUMENTATION_FORMAT,
+        profile_path: str = INSTRUMENTATION_PROFILE_PATH
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Stop profiling and write the run report.
+
+        Args:
+            db: Optional connector whose pool and cache counters to include
+            path: Report file
+            fmt: "json" or "prometheus" (textfile collector format)
+            profile_path: cProfile stats file or tracemalloc top list
+
+        Returns:
+            Dict: The report, or None when disabled
+        """
+        if not self.enabled:
+            return None
+
+        report = self.report(db)
+
+        if self._profiler is not None:
+            self._profiler.disable()
+            self._profiler.dump_stats(profile_path)
+            print(f"  ✓ cProfile stats written to {profile_path}")
+        elif self.profile == "tracemalloc":
+            snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+            with open(profile_path, 'w') as f:
+                for stat in snapshot.statistics('lineno')[:50]:
+                    f.write(f"{stat}\n")
+            print(f"  ✓ Top allocations written to {profile_path}")
+
+        content = (
+            self._prometheus(report) if fmt == "prometheus"
+            else json.dumps(report, indent=2)
+        )
+
+        # Atomic replace, so collectors never read a partial file
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+        print(f"  ✓ Run report written to {path}")
+
+        return report
+
+    @staticmethod
+    def _prometheus(report: Dict[str, Any]) -> str:
+        """Render a report in Prometheus text exposition format."""
+        lines = [
+            f"# TYPE {METRIC_PREFIX}_duration_seconds gauge",
+            f"{METRIC_PREFIX}_duration_seconds {report['total_seconds']}",
+            f"# TYPE {METRIC_PREFIX}_stage_seconds gauge",
+        ]
+        for name, stage in report['stages'].items():
+            lines.append(f'{METRIC_PREFIX}_stage_seconds{{stage="{name}"}} {stage["seconds"]}')
+        lines.append(f"# TYPE {METRIC_PREFIX}_stage_calls gauge")
+        for name, stage in report['stages'].items():
+            lines.append(f'{METRIC_PREFIX}_stage_calls{{stage="{name}"}} {stage["calls"]}')
+        for name, value in report['counters'].items():
+            lines.append(f"# TYPE {METRIC_PREFIX}_{name} gauge")
+            lines.append(f"{METRIC_PREFIX}_{name} {value}")
+
+        return "\n".join(lines) + "\n"
@@ -6,17 +6,153 @@ Orchestrates the end-to-end KPI anomaly detection workflow.
 
 import sys
 from datetime import datetime, timedelta
+from typing import Dict, Optional, Sequence, Tuple
 
+import numpy as np
 import pandas as pd
 
-from config import KPIS_TO_MONITOR, DATA_LOAD_DAYS
-from db_connector import AnomalyDBConnector
+from config import (
+    KPIS_TO_MONITOR,
+    DATA_LOAD_DAYS,
+    INCREMENTAL_DETECTION,
+    DETECTOR_STATE_PATH,
+    AGGREGATION_PUSHDOWN,
+    CACHED_DIMENSION_NAMES,
+    SEGMENT_DETECTION,
+    SEGMENT_ANOMALIES_PATH,
+    DRILL_DOWN,
+    IDEMPOTENT_LOGGING,
+)
+from db_connector import AnomalyDBConnector, same_as_logged
 from anomaly_detector import KPIAnomalyDetector
-from root_cause_analyzer import RootCauseAnalyzer
+from root_cause_analyzer import RootCauseAnalyzer, DimensionCube, DIMENSIONS, ROW_COUNT_COLUMN
+from write_behind import WriteBehindWriter
+from kpi_executor import KPIExecutor
+from instrumentation import Instrumentation
+from anomaly_batch import AnomalyBatch, DriverBatch
 
 
-def main() -> None:
-    """Execute the Enterprise KPI Anomaly Detection pipeline."""
+def split_known_anomalies(
+    anomalies: pd.DataFrame,
+    known: Dict[Tuple[str, pd.Timestamp], Tuple[int, float, float, str]]
+) -> pd.DataFrame:
+    """
+    Drop anomalies that are already logged with the same score.
+    
+    Changed ones are kept; the connector updates their rows in place.
+    
+    Args:
+        anomalies: Detected anomalies (detect_many format)
+        known: Logged anomalies from load_known_anomalies
+        
+    Returns:
+        pd.DataFrame: New or changed anomalies
+    """
+    keep = []
+    
+    for kpi, date, z_score, actual, severity in zip(
+        anomalies["kpi_name"], anomalies["metric_date"], anomalies["z_score"],
+        anomalies["actual_value"], anomalies["severity"]
+    ):
+        logged = known.get((kpi, date))
+        keep.append(logged is None or not same_as_logged(logged, z_score, actual, severity))
+    
+    # A bool array even when empty (an empty list would select columns)
+    return anomalies[np.array(keep, dtype=bool)]
+
+
+def build_cube(
+    data: pd.DataFrame,
+    dimension_totals: Optional[Dict[str, pd.DataFrame]],
+    kpis: Sequence[str]
+) -> DimensionCube:
+    """
+    Precompute the root cause cube once for all KPIs.
+    
+    Args:
+        data: Fact rows, or daily totals under aggregation pushdown
+        dimension_totals: Per-dimension totals from load_kpi_aggregates,
+            or None when data holds fact rows
+        kpis: KPI columns
+        
+    Returns:
+        DimensionCube: Cube for find_root_causes_batch
+    """
+    if dimension_totals is not None:
+        return DimensionCube.from_aggregates(data, dimension_totals, kpis)
+    return DimensionCube(data, kpis)
+
+
+def explain_kpi(
+    db: AnomalyDBConnector,
+    analyzer: RootCauseAnalyzer,
+    data: pd.DataFrame,
+    cube: DimensionCube,
+    anomalies: pd.DataFrame,
+    kpi: str
+) -> Tuple[AnomalyBatch, DriverBatch]:
+    """
+    Root causes of one KPI's anomalies, as batches ready to log.
+    
+    All of the KPI's anomaly dates are explained in one pass over the
+    cube; with CACHED_DIMENSION_NAMES, names are looked up for the top
+    drivers only.
+    
+    Args:
+        db: Connector (for the dimension name cache)
+        analyzer: Root cause analyzer
+        data: Data the cube was built from
+        cube: Cube from build_cube
+        anomalies: The KPI's anomalies (detect_many format)
+        kpi: KPI name
+        
+    Returns:
+        Tuple: (anomalies, their drivers) as columnar batches
+    """
+    drivers_long = analyzer.find_root_causes_batch(
+        full_data=data,
+        anomaly_dates=anomalies["metric_date"],
+        kpi_col=kpi,
+        cube=cube
+    )
+    
+    if CACHED_DIMENSION_NAMES:
+        # Names for the top drivers only, from the dimension cache
+        drivers_long = db.resolve_driver_names(drivers_long, DIMENSIONS)
+    
+    batch = AnomalyBatch.from_frame(anomalies, kpi)
+    return batch, DriverBatch.from_frame(drivers_long, batch)
+
+
+def run_pipeline(
+    db: Optional[AnomalyDBConnector] = None,
+    kpis: Sequence[str] = KPIS_TO_MONITOR,
+    detector: Optional[KPIAnomalyDetector] = None,
+    analyzer: Optional[RootCauseAnalyzer] = None,
+    resident: bool = False,
+    detector_state_path: str = DETECTOR_STATE_PATH,
+    segment_anomalies_path: str = SEGMENT_ANOMALIES_PATH,
+    close_db: bool = True
+) -> bool:
+    """
+    Execute the Enterprise KPI Anomaly Detection pipeline.
+    
+    Args:
+        db: Connector to use (default: SQL Server per DB_CONFIG)
+        kpis: KPI columns to monitor
+        detector: Detector to use (default: medium sensitivity)
+        analyzer: Root cause analyzer (default settings)
+        resident: Refresh the data held by the connector since its last
+            load instead of reloading the whole window (long-lived callers)
+        detector_state_path: Checkpoint for INCREMENTAL_DETECTION
+        segment_anomalies_path: CSV the SEGMENT_DETECTION anomalies are
+            written to
+        close_db: Close the connector's pooled connections at the end
+        
+    Returns:
+        bool: True if the run completed, False if it could not start
+    """
+    kpis = list(kpis)
 
     # Banner
     print("=" * 70)
@@ -31,9 +167,18 @@ def main() -> None:
     print("  STEP 1 — INITIALIZATION")
     print("=" * 70)
     
-    db = AnomalyDBConnector()
-    detector = KPIAnomalyDetector(sensitivity="medium")
-    analyzer = RootCauseAnalyzer()
+    if db is None:
+        db = AnomalyDBConnector()
+    if detector is None:
+        detector = KPIAnomalyDetector(sensitivity="medium")
+    if analyzer is None:
+        analyzer = RootCauseAnalyzer()
+
+    # Stage timers and counters (pass-through when INSTRUMENTATION is off)
+    instrumentation = Instrumentation()
+    instrumentation.instrument_connector(db)
+    instrumentation.instrument_detector(detector)
+    instrumentation.instrument_analyzer(analyzer)
     
     # ------------------------------------------------------------------
     # STEP 2: Test Connection
@@ -46,7 +191,7 @@ def main() -> None:
     if not db.test_connection():
         print()
         print("  ✗ Cannot proceed. Exiting.")
-        sys.exit(1)
+        return False
     
     # ------------------------------------------------------------------
     # STEP 3: Load Data
@@ -61,13 +206,37 @@ def main() -> None:
     
     print(f"  Date range  : {start_date.strftime('%Y-%m-%d')} → {target_date.strftime('%Y-%m-%d')}")
     
-    data = db.load_kpi_data(start_date, target_date)
+    if AGGREGATION_PUSHDOWN and resident:
+        data, dimension_totals = db.load_kpi_aggregates_since(
+            target_date, kpis, DIMENSIONS, with_names=not CACHED_DIMENSION_NAMES
+        )
+    elif AGGREGATION_PUSHDOWN:
+        # Server returns daily and per-dimension totals, not fact rows
+        data, dimension_totals = db.load_kpi_aggregates(
+            start_date, target_date, kpis, DIMENSIONS,
+            with_names=not CACHED_DIMENSION_NAMES
+        )
+    elif resident:
+        data = db.load_kpi_data_since(with_names=not CACHED_DIMENSION_NAMES)
+    else:
+        data = db.load_kpi_data(
+            start_date, target_date, with_names=not CACHED_DIMENSION_NAMES
+        )
     
     if data.empty:
         print("  ✗ No data returned. Exiting.")
-        sys.exit(1)
+        return False
     
-    print(f"  ✓ Loaded {len(data):,} records")
+    if AGGREGATION_PUSHDOWN:
+        rows_loaded = int(data[ROW_COUNT_COLUMN].sum())
+        print(
+            f"  ✓ Loaded {rows_loaded:,} records"
+            f" (aggregated server-side to {len(data):,} daily totals)"
+        )
+    else:
+        rows_loaded = len(data)
+        print(f"  ✓ Loaded {rows_loaded:,} records")
+    instrumentation.count("rows_loaded", rows_loaded)
 
     # ------------------------------------------------------------------
     # STEP 4: Detect Anomalies
@@ -84,23 +253,126 @@ def main() -> None:
     min_date = data['metric_date'].min()
     max_date = data['metric_date'].max()
     print(f"  Data range: {min_date.date()} → {max_date.date()}")
-    print()
 
-    for kpi in KPIS_TO_MONITOR:
-        print(f"  {kpi.upper()}")
-        print("  " + "-" * 66)
+    # Precompute root cause cube once for all KPIs
+    with instrumentation.stage("cube"):
+        cube = build_cube(data, dimension_totals if AGGREGATION_PUSHDOWN else None, kpis)
 
-        kpi_anomaly_count = 0  # Track per-KPI count
+    # Detect anomalies for every KPI in one columnar pass
+    if INCREMENTAL_DETECTION:
+        all_anomalies = detector.detect_incremental(
+            df=data,
+            kpi_columns=kpis,
+            date_column="metric_date",
+            state_path=detector_state_path
+        )
+    else:
+        all_anomalies = detector.detect_many(
+            df=data,
+            kpi_columns=kpis,
+            date_column="metric_date"
+        )
 
-        # Aggregate daily
-        daily_data = data.groupby("metric_date")[kpi].sum().reset_index()
+    if IDEMPOTENT_LOGGING:
+        # Anomalies logged by earlier runs skip root causes and writes
+        known = db.load_known_anomalies(min_date, max_date)
+        
+        if known is None:
+            print("  ⚠ Known anomalies unavailable — logging every detected anomaly")
+        else:
+            detected = len(all_anomalies)
+            all_anomalies = split_known_anomalies(all_anomalies, known)
+            skipped = detected - len(all_anomalies)
+            instrumentation.count("anomalies_skipped", skipped)
+            print(f"  ✓ Skipping {skipped} of {detected} anomalie(s) already logged")
 
-        # Detect anomalies
-        anomalies = detector.detect_anomalies(
-            df=daily_data,
-            kpi_column=kpi,
-            date_column="metric_date"
+    if SEGMENT_DETECTION:
+        # Score every store/product/region series too, so a collapsing
+        # segment isn't masked by the company-wide total
+        segment_frames = (
+            dimension_totals if AGGREGATION_PUSHDOWN
+            else {dim_name: data for dim_name in DIMENSIONS}
         )
+        segment_anomalies = pd.concat([
+            detector.detect_segments(
+                frame, kpis, DIMENSIONS[dim_name][0], dim_name
+            )
+            for dim_name, frame in segment_frames.items()
+        ], ignore_index=True)
+        breakdown = segment_anomalies["segment_type"].value_counts()
+        print(
+            f"  ✓ Segment scan: {len(segment_anomalies)} anomalie(s)"
+            + "".join(f" | {dim_name}: {count}" for dim_name, count in breakdown.items())
+        )
+        segment_anomalies.to_csv(segment_anomalies_path, index=False)
+        print(f"  ✓ Segment anomalies written to {segment_anomalies_path}")
+    print()
+
+    # Drill-down walks fact rows; under pushdown, load just the rows its
+    # windows cover (lookback before the first anomaly to the last one)
+    drill_data = data
+    if DRILL_DOWN and AGGREGATION_PUSHDOWN and not all_anomalies.empty:
+        drill_start = all_anomalies["metric_date"].min() - timedelta(days=analyzer.lookback_days)
+        drill_data = db.load_kpi_data(
+            drill_start, all_anomalies["metric_date"].max(),
+            with_names=not CACHED_DIMENSION_NAMES
+        )
+        print(f"  ✓ Loaded {len(drill_data):,} fact row(s) for drill-down")
+    drill_down = DRILL_DOWN and not drill_data.empty
+
+    def analyze_kpi(kpi):
+        """Root cause analysis for all of one KPI's anomalies in one pass."""
+        anomalies = all_anomalies[all_anomalies["kpi_name"] == kpi]
+
+        if anomalies.empty:
+            return anomalies, None, None, {}
+
+        batch, drivers = explain_kpi(db, analyzer, data, cube, anomalies, kpi)
+
+        # Most specific driving cells, e.g. region > store > product
+        drill_downs = {}
+        if drill_down:
+            for date in anomalies["metric_date"]:
+                drill_downs[date] = analyzer.drill_down(drill_data, date, kpi)
+
+        return anomalies, batch, drivers, drill_downs
+
+    # Fan KPIs out to workers sharing the loaded data and cube; results
+    # come back in KPI order
+    executor = KPIExecutor()
+    analyses = executor.map(analyze_kpi, kpis)
+
+    # Queue one columnar batch per KPI; the writer drains them in the
+    # background while root cause analysis for the next KPI runs
+    writer = WriteBehindWriter(db)
+    queued = {}
+
+    try:
+        # Wall time across workers, including time blocked on their results
+        with instrumentation.stage("analysis"):
+            for kpi, (anomalies, batch, drivers, drill_downs) in zip(kpis, analyses):
+                queued[kpi] = (anomalies, None, None, drill_downs)
+
+                if anomalies.empty:
+                    continue
+
+                instrumentation.count("drivers_found", len(drivers))
+
+                # Every new or changed anomaly in the window, with its drivers
+                queued[kpi] = (anomalies, drivers, writer.submit_batch(batch, drivers), drill_downs)
+
+    finally:
+        # Always flush pending writes before reporting
+        executor.shutdown()
+        with instrumentation.stage("write_flush"):
+            failed_writes = writer.close()
+
+    for kpi in kpis:
+        print(f"  {kpi.upper()}")
+        print("  " + "-" * 66)
+
+        anomalies, drivers, batch_future, drill_downs = queued[kpi]
+        detector.report_anomalies(anomalies)
 
         if anomalies.empty:
             print("  No anomalies detected.")
@@ -109,80 +381,46 @@ def main() -> None:
 
         print(f"  Found {len(anomalies)} anomaly/anomalies to process...\n")
 
-        # Process ALL detected anomalies (not just today's)
-        for _, row in anomalies.iterrows():
-            # Build record
-            anomaly_record = {
-                "kpi_name": kpi,
-                "metric_date": row["metric_date"].date(),
-                "expected_value": round(float(row["expected_value"]), 2),
-                "actual_value": round(float(row["actual_value"]), 2),
-                "deviation_percent": round(float(row["deviation_percent"]), 2),
-                "z_score": round(float(row["z_score"]), 4),
-                "severity": row["severity"],
-            }
-
-            # Log anomaly
-            anomaly_id = db.log_anomaly(anomaly_record)
-
-            if anomaly_id:
-                deviation_sign = "+" if row["deviation_percent"] > 0 else ""
-                print(
-                    f"  ✓ Anomaly #{anomaly_id}"
-                    f"  |  Date: {row['metric_date'].date()}"
-                    f"  |  Severity: {row['severity']:<8}"
-                    f"  |  Deviation: {deviation_sign}{row['deviation_percent']:.1f}%"
-                )
-                print(f"     Expected: ${row['expected_value']:,.2f}  |  Actual: ${row['actual_value']:,.2f}")
-
-                # Root cause analysis
-                root_causes = analyzer.find_root_causes(
-                    full_data=data,
-                    anomaly_date=row["metric_date"],
-                    kpi_col=kpi
-                )
-
-                # Build driver records
-                drivers = []
-                for driver_type, drivers_df in root_causes.items():
-                    dim_map = {
-                        "store": ("store_id", "store_name"),
-                        "product": ("product_id", "product_name"),
-                        "region": ("region_id", "region_name"),
-                    }
-                    id_col, name_col = dim_map[driver_type]
-
-                    for _, d_row in drivers_df.iterrows():
-                        drivers.append({
-                            "anomaly_id": anomaly_id,
-                            "driver_type": driver_type,
-                            "entity_id": int(d_row[id_col]),
-                            "entity_name": str(d_row[name_col]),
-                            "contribution_percent": round(float(d_row["contribution_percent"]), 2),
-                            "impact_value": round(float(d_row["impact_value"]), 2),
-                        })
-
-                if drivers:
-                    db.log_root_causes(drivers)
-                    print(f"     ✓ Logged {len(drivers)} root cause(s)")
-
-                    # Show top 3
-                    print("     Top contributors:")
-                    for i, d in enumerate(drivers[:3], 1):
-                        contrib_sign = "+" if d['contribution_percent'] > 0 else ""
-                        print(f"       {i}. {d['entity_name']}: {contrib_sign}{d['contribution_percent']:.1f}%")
-
-                print()  # Blank line between anomalies
-                
-                # Increment counters
-                kpi_anomaly_count += 1
-                total_anomalies += 1
-            else:
-                print(f"  ✗ Failed to log anomaly for {kpi}")
+        if batch_future.exception() is not None:
+            print(f"  ✗ Failed to log anomalies for {kpi}")
+            print()
+            continue
+
+        anomaly_ids = batch_future.result()
+
+        for i, (row, anomaly_id) in enumerate(zip(anomalies.itertuples(index=False), anomaly_ids)):
+            deviation_sign = "+" if row.deviation_percent > 0 else ""
+            print(
+                f"  ✓ Anomaly #{anomaly_id}"
+                f"  |  Date: {row.metric_date.date()}"
+                f"  |  Severity: {row.severity:<8}"
+                f"  |  Deviation: {deviation_sign}{row.deviation_percent:.1f}%"
+            )
+            print(f"     Expected: ${row.expected_value:,.2f}  |  Actual: ${row.actual_value:,.2f}")
+
+            top = drivers.for_anomaly(i)
+            if top.stop > top.start:
+                print(f"     ✓ Logged {top.stop - top.start} root cause(s)")
+
+                # Show top 3
+                print("     Top contributors:")
+                for rank, j in enumerate(range(top.start, min(top.stop, top.start + 3)), 1):
+                    contribution = drivers.contribution_percent[j]
+                    contrib_sign = "+" if contribution > 0 else ""
+                    print(f"       {rank}. {drivers.entity_name[j]}: {contrib_sign}{contribution:.1f}%")
+
+            cells = drill_downs.get(row.metric_date)
+            if cells is not None and not cells.empty:
+                print("     Drill-down:")
+                for rank, cell in enumerate(cells.head(3).itertuples(index=False), 1):
+                    contrib_sign = "+" if cell.contribution_percent > 0 else ""
+                    print(f"       {rank}. {cell.path}: {contrib_sign}{cell.contribution_percent:.1f}%")
+
+            print()  # Blank line between anomalies
 
         # Store per-KPI count after processing all anomalies for this KPI
-        if kpi_anomaly_count > 0:
-            anomalies_by_kpi[kpi] = kpi_anomaly_count
+        anomalies_by_kpi[kpi] = len(anomaly_ids)
+        total_anomalies += len(anomaly_ids)
         
         print()  # End of KPI section
 
@@ -202,13 +440,37 @@ def main() -> None:
             print(f"    • {kpi_name}: {count} anomaly/anomalies")
     else:
         print("  No anomalies detected across all KPIs.")
+
+    if failed_writes:
+        print()
+        print(f"  ✗ {len(failed_writes)} write(s) failed:")
+        for failure in failed_writes:
+            print(f"    • {failure['kind']} {failure['key'] or ''}: {failure['error']}")
     
+    if close_db:
+        db.close()
+
+    instrumentation.finish(db)
+
     print()
     print("=" * 70)
     print(f"  ✓ Pipeline Complete")
     print(f"  Finished at : {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print("=" * 70)
 
+    return True
+
+
+def main(db: Optional[AnomalyDBConnector] = None) -> None:
+    """
+    Execute the pipeline once, exiting non-zero if it could not start.
+    
+    Args:
+        db: Connector to use (default: SQL Server per DB_CONFIG)
+    """
+    if not run_pipeline(db):
+        sys.exit(1)
+
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
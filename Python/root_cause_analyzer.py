@@ -4,12 +4,302 @@ root_cause_analyzer.py - Root Cause Analysis
 Identifies dimensional drivers of KPI anomalies.
 """
 
+import heapq
+import itertools
+import time
+
 import pandas as pd
 import numpy as np
 from datetime import timedelta
-from typing import Dict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from config import (
+    MIN_CONTRIBUTION_PERCENT,
+    LOOKBACK_PERIOD_DAYS,
+    DRILL_DOWN_HIERARCHY,
+    DRILL_DOWN_MAX_RESULTS,
+    DRILL_DOWN_MAX_CELLS,
+    DRILL_DOWN_TIME_BUDGET_SECONDS,
+)
+
+
+# Dimension name -> (id column, name column)
+DIMENSIONS = {
+    'store': ('store_id', 'store_name'),
+    'product': ('product_id', 'product_name'),
+    'region': ('region_id', 'region_name')
+}
+
+_DIMENSION_BY_ID = {id_col: dim for dim, (id_col, _) in DIMENSIONS.items()}
+
+# Fact-row count carried by pre-aggregated input frames
+ROW_COUNT_COLUMN = 'row_count'
+
+
+class DimensionCube:
+    """
+    Precomputed date × entity cube with prefix sums over dates.
+
+    Built once per run from the loaded fact data. Each dimension holds a
+    dense array indexed by (date ordinal, entity) with cumulative sums
+    along the date axis, so the sum over any date window is a single
+    subtraction of two rows instead of a fresh scan of the fact rows.
+    """
+
+    def __init__(
+        self,
+        full_data: pd.DataFrame,
+        kpi_columns: Iterable[str],
+        date_column: str = "metric_date"
+    ):
+        """
+        Build the cube.
+
+        Args:
+            full_data: Complete dataset with all dimensions (daily grain)
+            kpi_columns: KPI columns to precompute
+            date_column: Name of date column
+        """
+        self._start(full_data[date_column], kpi_columns, date_column)
+        self._add_totals(full_data)
+
+        for dim_name in DIMENSIONS:
+            self._add_dimension(dim_name, full_data)
+
+        self._report()
+
+    @classmethod
+    def from_aggregates(
+        cls,
+        daily_totals: pd.DataFrame,
+        dimension_totals: Dict[str, pd.DataFrame],
+        kpi_columns: Iterable[str],
+        date_column: str = "metric_date"
+    ) -> "DimensionCube":
+        """
+        Build the cube from server-side aggregates instead of fact rows.
+
+        Each frame carries a ROW_COUNT_COLUMN with the number of fact rows
+        it stands for, so the result is identical to building from the
+        fact rows themselves.
+
+        Args:
+            daily_totals: Per-date KPI sums
+            dimension_totals: {dimension_name: per-(date, id, name) KPI sums}
+            kpi_columns: KPI columns to precompute
+            date_column: Name of date column
+
+        Returns:
+            DimensionCube: Populated cube
+        """
+        cube = cls.__new__(cls)
+        cube._start(daily_totals[date_column], kpi_columns, date_column)
+        cube._add_totals(daily_totals)
+
+        for dim_name, frame in dimension_totals.items():
+            cube._add_dimension(dim_name, frame)
+
+        cube._report()
+        return cube
+
+    def _start(
+        self,
+        dates: pd.Series,
+        kpi_columns: Iterable[str],
+        date_column: str
+    ) -> None:
+        """Set up the date axis and empty containers."""
+        self.kpi_columns = list(kpi_columns)
+        self.date_column = date_column
+
+        dates = pd.to_datetime(dates).dt.normalize()
+        self.start_date = dates.min()
+        self.n_days = int((dates.max() - self.start_date).days) + 1
+
+        # Per-dimension cubes, keyed by (id, name) pairs like the groupby
+        self.entities: Dict[str, pd.MultiIndex] = {}
+        self.rows: Dict[str, np.ndarray] = {}
+        self.sums: Dict[str, Dict[str, np.ndarray]] = {}
+
+    def _columns(
+        self,
+        frame: pd.DataFrame
+    ) -> Tuple[np.ndarray, np.ndarray, Dict[str, np.ndarray]]:
+        """
+        Day ordinals, row counts and NaN-free measures of a frame.
+
+        Measures treat NaN as 0, as groupby().sum() does. Row counts come
+        from ROW_COUNT_COLUMN when present (aggregated input), else 1.
+        """
+        dates = pd.to_datetime(frame[self.date_column]).dt.normalize()
+        day_ord = (dates - self.start_date).dt.days.to_numpy()
+
+        if ROW_COUNT_COLUMN in frame:
+            counts = frame[ROW_COUNT_COLUMN].to_numpy(dtype=np.float64)
+        else:
+            counts = np.ones(len(frame))
+
+        values = {
+            kpi: np.nan_to_num(frame[kpi].to_numpy(dtype=np.float64))
+            for kpi in self.kpi_columns
+        }
+        return day_ord, counts, values
+
+    def _add_totals(self, frame: pd.DataFrame) -> None:
+        """Company-wide totals: (n_days + 1) prefix arrays."""
+        day_ord, counts, values = self._columns(frame)
+
+        self.total_rows = self._prefix(
+            np.bincount(day_ord, weights=counts, minlength=self.n_days).astype(np.int64)
+        )
+        self.totals = {
+            kpi: self._prefix(
+                np.bincount(day_ord, weights=vals, minlength=self.n_days)
+            )
+            for kpi, vals in values.items()
+        }
+
+    def _add_dimension(self, dim_name: str, frame: pd.DataFrame) -> None:
+        """(n_days + 1) × entities prefix arrays for one dimension."""
+        id_col, name_col = DIMENSIONS[dim_name]
+
+        if id_col not in frame:
+            return
+
+        day_ord, counts, values = self._columns(frame)
+
+        # Frames fetched without names are keyed by id alone
+        keys = frame[[id_col, name_col] if name_col in frame else [id_col]]
+        valid = keys.notna().all(axis=1).to_numpy()
+        pairs = pd.MultiIndex.from_frame(keys[valid])
+        entities = pairs.unique().sort_values()
+        ent_code = entities.get_indexer(pairs)
+
+        n_ent = len(entities)
+        cell = day_ord[valid] * n_ent + ent_code
+        size = self.n_days * n_ent
+
+        self.entities[dim_name] = entities
+        self.rows[dim_name] = self._prefix(
+            np.bincount(cell, weights=counts[valid], minlength=size)
+            .astype(np.int64)
+            .reshape(self.n_days, n_ent)
+        )
+        self.sums[dim_name] = {
+            kpi: self._prefix(
+                np.bincount(
+                    cell, weights=vals[valid], minlength=size
+                ).reshape(self.n_days, n_ent)
+            )
+            for kpi, vals in values.items()
+        }
 
-from config import MIN_CONTRIBUTION_PERCENT, LOOKBACK_PERIOD_DAYS
+    def _report(self) -> None:
+        """Print cube dimensions."""
+        print(
+            f"  ✓ Root cause cube built — {self.n_days} day(s), "
+            f"{len(self.kpi_columns)} KPI(s), "
+            + ", ".join(f"{len(e)} {d}(s)" for d, e in self.entities.items())
+        )
+
+    @staticmethod
+    def _prefix(arr: np.ndarray) -> np.ndarray:
+        """Cumulative sum over the date axis with a leading zero row."""
+        out = np.zeros((arr.shape[0] + 1,) + arr.shape[1:], dtype=arr.dtype)
+        np.cumsum(arr, axis=0, out=out[1:])
+        return out
+
+    def has_kpi(self, kpi_col: str) -> bool:
+        """Check whether a KPI was precomputed."""
+        return kpi_col in self.totals
+
+    def date_range(
+        self,
+        start: pd.Timestamp,
+        end: pd.Timestamp
+    ) -> Tuple[int, int]:
+        """
+        Convert a [start, end) date window to clamped prefix indices.
+
+        Args:
+            start: Inclusive window start
+            end: Exclusive window end
+
+        Returns:
+            Tuple: (lo, hi) rows into the prefix arrays
+        """
+        lo = (pd.Timestamp(start).normalize() - self.start_date).days
+        hi = (pd.Timestamp(end).normalize() - self.start_date).days
+        lo = min(max(lo, 0), self.n_days)
+        hi = min(max(hi, 0), self.n_days)
+        return lo, max(lo, hi)
+
+    def date_ranges(
+        self,
+        starts: pd.DatetimeIndex,
+        ends: pd.DatetimeIndex
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Vectorized date_range for many [start, end) windows at once.
+
+        Args:
+            starts: Inclusive window starts
+            ends: Exclusive window ends
+
+        Returns:
+            Tuple: (lo, hi) arrays of prefix indices
+        """
+        lo = (pd.DatetimeIndex(starts).normalize() - self.start_date).days
+        hi = (pd.DatetimeIndex(ends).normalize() - self.start_date).days
+        lo = np.clip(np.asarray(lo), 0, self.n_days)
+        hi = np.clip(np.asarray(hi), 0, self.n_days)
+        return lo, np.maximum(lo, hi)
+
+    def window_total(self, kpi_col: str, lo: int, hi: int) -> Tuple[int, float]:
+        """
+        Row count and company-wide KPI sum for a prefix window.
+
+        Args:
+            kpi_col: KPI column
+            lo: Prefix start index
+            hi: Prefix end index
+
+        Returns:
+            Tuple: (row_count, kpi_sum)
+        """
+        rows = int(self.total_rows[hi] - self.total_rows[lo])
+        total = float(self.totals[kpi_col][hi] - self.totals[kpi_col][lo])
+        return rows, total
+
+    def window_aggregate(
+        self,
+        dim_name: str,
+        kpi_col: str,
+        lo: int,
+        hi: int
+    ) -> pd.Series:
+        """
+        Per-entity KPI sum over a prefix window.
+
+        Equivalent to groupby([id_col, name_col])[kpi_col].sum() on the
+        rows in the window: only entities with at least one row appear.
+
+        Args:
+            dim_name: 'store', 'product', or 'region'
+            kpi_col: KPI column
+            lo: Prefix start index
+            hi: Prefix end index
+
+        Returns:
+            pd.Series: KPI sum indexed by (id, name)
+        """
+        present = (self.rows[dim_name][hi] - self.rows[dim_name][lo]) > 0
+        sums = self.sums[dim_name][kpi_col][hi] - self.sums[dim_name][kpi_col][lo]
+        return pd.Series(
+            sums[present],
+            index=self.entities[dim_name][present],
+            name=kpi_col
+        )
 
 
 class RootCauseAnalyzer:
@@ -31,7 +321,8 @@ class RootCauseAnalyzer:
         self,
         full_data: pd.DataFrame,
         anomaly_date: pd.Timestamp,
-        kpi_col: str = "revenue"
+        kpi_col: str = "revenue",
+        cube: Optional[DimensionCube] = None
     ) -> Dict[str, pd.DataFrame]:
         """
         Identify root causes across store, product, region dimensions.
@@ -40,6 +331,9 @@ class RootCauseAnalyzer:
             full_data: Complete dataset with all dimensions
             anomaly_date: Date of the anomaly
             kpi_col: KPI column to analyze
+            cube: Optional precomputed cube built from full_data; when it
+                covers kpi_col, window sums come from its prefix arrays
+                instead of scanning full_data
             
         Returns:
             Dict: {dimension_name: drivers_dataframe}
@@ -50,6 +344,11 @@ class RootCauseAnalyzer:
         # Define normal period (lookback days before anomaly)
         normal_start = anomaly_date - timedelta(days=self.lookback_days)
         
+        if cube is not None and cube.has_kpi(kpi_col):
+            return self._find_root_causes_cube(
+                cube, normal_start, anomaly_date, kpi_col
+            )
+        
         # Split data
         normal_data = full_data[
             (full_data['metric_date'] >= normal_start) & 
@@ -64,13 +363,7 @@ class RootCauseAnalyzer:
         root_causes = {}
         
         # Analyze each dimension
-        dimensions = {
-            'store': ('store_id', 'store_name'),
-            'product': ('product_id', 'product_name'),
-            'region': ('region_id', 'region_name')
-        }
-        
-        for dim_name, (id_col, name_col) in dimensions.items():
+        for dim_name, (id_col, name_col) in DIMENSIONS.items():
             drivers = self._analyze_dimension(
                 normal_data, 
                 anomaly_data, 
@@ -84,31 +377,420 @@ class RootCauseAnalyzer:
         
         return root_causes
 
+    def find_root_causes_batch(
+        self,
+        full_data: pd.DataFrame,
+        anomaly_dates: Iterable[pd.Timestamp],
+        kpi_col: str = "revenue",
+        cube: Optional[DimensionCube] = None
+    ) -> pd.DataFrame:
+        """
+        Identify root causes for many anomaly dates of one KPI in one pass.
+        
+        Window sums for every anomaly date are taken from the cube's prefix
+        arrays as (anomalies × entities) matrices, and drivers are ranked
+        per row with a single argsort. Results match calling
+        find_root_causes once per date.
+        
+        Args:
+            full_data: Complete dataset with all dimensions
+            anomaly_dates: Dates of the anomalies
+            kpi_col: KPI column to analyze
+            cube: Optional precomputed cube; built from full_data if missing
+            
+        Returns:
+            pd.DataFrame: Long-format drivers with columns anomaly_date,
+                driver_type, entity_id, entity_name, normal_value,
+                anomaly_value, impact_value, contribution_percent;
+                entity_name is None when the data carries ids only
+        """
+        columns = [
+            'anomaly_date', 'driver_type', 'entity_id', 'entity_name',
+            'normal_value', 'anomaly_value', 'impact_value',
+            'contribution_percent'
+        ]
+        
+        dates = pd.DatetimeIndex(pd.to_datetime(list(anomaly_dates))).unique()
+        
+        if len(dates) == 0 or full_data.empty:
+            return pd.DataFrame(columns=columns)
+        
+        if cube is None or not cube.has_kpi(kpi_col):
+            cube = DimensionCube(full_data, [kpi_col])
+        
+        # Prefix indices for every anomaly's normal and anomaly windows
+        normal_lo, normal_hi = cube.date_ranges(
+            dates - timedelta(days=self.lookback_days), dates
+        )
+        anomaly_lo, anomaly_hi = cube.date_ranges(
+            dates, dates + timedelta(days=1)
+        )
+        
+        # Skip dates with an empty normal or anomaly window
+        valid = (
+            (cube.total_rows[normal_hi] > cube.total_rows[normal_lo]) &
+            (cube.total_rows[anomaly_hi] > cube.total_rows[anomaly_lo])
+        )
+        
+        if not valid.any():
+            return pd.DataFrame(columns=columns)
+        
+        dates = dates[valid]
+        normal_lo, normal_hi = normal_lo[valid], normal_hi[valid]
+        anomaly_lo, anomaly_hi = anomaly_lo[valid], anomaly_hi[valid]
+        
+        totals = cube.totals[kpi_col]
+        total_change = (
+            (totals[anomaly_hi] - totals[anomaly_lo]) -
+            (totals[normal_hi] - totals[normal_lo])
+        )
+        
+        frames = []
+        
+        for dim_name in DIMENSIONS:
+            if dim_name not in cube.entities:
+                continue
+            
+            rows = cube.rows[dim_name]
+            sums = cube.sums[dim_name][kpi_col]
+            
+            # (anomalies × entities) window matrices
+            present = (
+                (rows[normal_hi] > rows[normal_lo]) |
+                (rows[anomaly_hi] > rows[anomaly_lo])
+            )
+            normal_value = sums[normal_hi] - sums[normal_lo]
+            anomaly_value = sums[anomaly_hi] - sums[anomaly_lo]
+            impact_value = anomaly_value - normal_value
+            
+            with np.errstate(divide='ignore', invalid='ignore'):
+                contribution = np.where(
+                    total_change[:, None] != 0,
+                    impact_value / total_change[:, None] * 100,
+                    0.0
+                )
+            
+            significant = present & (
+                np.abs(contribution) >= self.min_contribution
+            )
+            
+            # Rank by absolute contribution, top 5 per anomaly date
+            rank_key = np.where(significant, np.abs(contribution), -np.inf)
+            top = np.argsort(-rank_key, axis=1, kind='stable')[:, :5]
+            keep = np.take_along_axis(significant, top, axis=1)
+            
+            row_idx = np.broadcast_to(
+                np.arange(len(dates))[:, None], top.shape
+            )[keep]
+            ent_idx = top[keep]
+            entities = cube.entities[dim_name]
+            
+            frames.append(pd.DataFrame({
+                'anomaly_date': dates[row_idx],
+                'driver_type': dim_name,
+                'entity_id': entities.get_level_values(0)[ent_idx],
+                'entity_name': (
+                    entities.get_level_values(1)[ent_idx]
+                    if entities.nlevels > 1 else None
+                ),
+                'normal_value': normal_value[row_idx, ent_idx],
+                'anomaly_value': anomaly_value[row_idx, ent_idx],
+                'impact_value': impact_value[row_idx, ent_idx],
+                'contribution_percent': contribution[row_idx, ent_idx],
+            }))
+        
+        if not frames:
+            return pd.DataFrame(columns=columns)
+        
+        drivers = pd.concat(frames, ignore_index=True)
+        
+        # Group by anomaly date, keeping store → product → region order
+        drivers = drivers.sort_values(
+            'anomaly_date', kind='stable'
+        ).reset_index(drop=True)
+        
+        return drivers[columns]
+
+    def drill_down(
+        self,
+        full_data: pd.DataFrame,
+        anomaly_date: pd.Timestamp,
+        kpi_col: str = "revenue",
+        hierarchy: Optional[Sequence[str]] = None,
+        max_results: int = DRILL_DOWN_MAX_RESULTS,
+        max_cells: int = DRILL_DOWN_MAX_CELLS,
+        time_budget: float = DRILL_DOWN_TIME_BUDGET_SECONDS
+    ) -> pd.DataFrame:
+        """
+        Find the most specific cells (e.g. region > store > product)
+        driving an anomaly with a pruned best-first search.
+        
+        Fact rows are first collapsed to their finest hierarchy cells. A
+        cell is expanded one level down only if its contribution reaches
+        min_contribution, and it is reported when none of its children
+        does (or at the bottom level). The sum of |impact| over a cell's
+        finest cells bounds the contribution of anything below it, so
+        cells are expanded in order of that bound and the search stops
+        once the bound can no longer beat the max_results-th best cell.
+        
+        Args:
+            full_data: Fact rows with the hierarchy columns
+            anomaly_date: Date of the anomaly
+            kpi_col: KPI column to analyze
+            hierarchy: Columns to walk, coarsest first (default:
+                DRILL_DOWN_HIERARCHY); missing columns are skipped
+            max_results: Cells to report
+            max_cells: Cells to expand before stopping
+            time_budget: Seconds before stopping
+            
+        Returns:
+            pd.DataFrame: Cells with columns path, depth, one column per
+                hierarchy level (None below the cell's depth), normal_value,
+                anomaly_value, impact_value, contribution_percent; ordered
+                by absolute contribution
+        """
+        anomaly_date = pd.to_datetime(anomaly_date)
+        normal_start = anomaly_date - timedelta(days=self.lookback_days)
+        
+        levels = [
+            col for col in (hierarchy or DRILL_DOWN_HIERARCHY) if col in full_data
+        ]
+        columns = [
+            'path', 'depth', *levels, 'normal_value', 'anomaly_value',
+            'impact_value', 'contribution_percent'
+        ]
+        
+        window = full_data[
+            (full_data['metric_date'] >= normal_start) &
+            (full_data['metric_date'] <= anomaly_date)
+        ]
+        in_anomaly = (window['metric_date'] == anomaly_date).to_numpy()
+        
+        if not levels or not in_anomaly.any() or in_anomaly.all():
+            return pd.DataFrame(columns=columns)
+        
+        values = window[kpi_col].to_numpy(dtype=np.float64)
+        total_change = values[in_anomaly].sum() - values[~in_anomaly].sum()
+        
+        if total_change == 0:
+            return pd.DataFrame(columns=columns)
+        
+        # Collapse fact rows to their finest cells
+        codes = {}
+        labels = []
+        for col in levels:
+            codes[col], uniques = pd.factorize(window[col], sort=True)
+            labels.append(np.asarray(uniques, dtype=object))
+        cells = pd.DataFrame({
+            **codes,
+            'normal': np.where(in_anomaly, 0.0, values),
+            'anomaly': np.where(in_anomaly, values, 0.0),
+        })
+        cells = cells[(cells[levels] >= 0).all(axis=1)]
+        cells = cells.groupby(levels, sort=True).sum()
+        
+        keys = np.column_stack([
+            cells.index.get_level_values(i) for i in range(len(levels))
+        ])
+        normal = cells['normal'].to_numpy()
+        anomaly = cells['anomaly'].to_numpy()
+        impact = anomaly - normal
+        abs_impact = np.abs(impact)
+        
+        def record(path: Tuple[int, ...], idx: np.ndarray) -> Dict:
+            """Report row for the cell at path covering finest cells idx."""
+            parts = [labels[i][code] for i, code in enumerate(path)]
+            normal_value = normal[idx].sum()
+            anomaly_value = anomaly[idx].sum()
+            return {
+                'path': " > ".join(f"{col}={v}" for col, v in zip(levels, parts)),
+                'depth': len(path),
+                **{col: (parts[i] if i < len(path) else None) for i, col in enumerate(levels)},
+                'normal_value': normal_value,
+                'anomaly_value': anomaly_value,
+                'impact_value': anomaly_value - normal_value,
+                'contribution_percent': (anomaly_value - normal_value) / total_change * 100,
+            }
+        
+        scale = 100 / abs(total_change)
+        tiebreak = itertools.count()
+        best: List[Tuple[float, int, Dict]] = []  # min-heap of reported cells
+        
+        def report(path: Tuple[int, ...], idx: np.ndarray) -> None:
+            row = record(path, idx)
+            item = (abs(row['contribution_percent']), next(tiebreak), row)
+            if len(best) < max_results:
+                heapq.heappush(best, item)
+            elif item[0] > best[0][0]:
+                heapq.heapreplace(best, item)
+        
+        # Best-first frontier of (-bound, tiebreak, path, finest cell idx)
+        frontier = [(-abs_impact.sum() * scale, next(tiebreak), (), np.arange(len(keys)))]
+        deadline = time.perf_counter() + time_budget
+        expanded = 0
+        
+        while frontier:
+            bound = -frontier[0][0]
+            if len(best) >= max_results and bound <= best[0][0]:
+                break
+            
+            if expanded >= max_cells or time.perf_counter() > deadline:
+                print(f"  ⚠ Drill-down budget reached after {expanded:,} cell(s)")
+                for _, _, path, idx in frontier:
+                    if path:
+                        report(path, idx)
+                break
+            
+            _, _, path, idx = heapq.heappop(frontier)
+            expanded += 1
+            
+            # Split into children on the next level
+            child_codes, inverse = np.unique(keys[idx, len(path)], return_inverse=True)
+            contribution = np.bincount(inverse, weights=impact[idx]) * np.sign(total_change) * scale
+            child_bound = np.bincount(inverse, weights=abs_impact[idx]) * scale
+            significant = np.abs(contribution) >= self.min_contribution
+            
+            if not significant.any():
+                if path:
+                    report(path, idx)
+                continue
+            
+            groups = np.split(
+                idx[np.argsort(inverse, kind='stable')],
+                np.cumsum(np.bincount(inverse))[:-1]
+            )
+            
+            for j in np.flatnonzero(significant):
+                child = path + (int(child_codes[j]),)
+                if len(child) == len(levels):
+                    report(child, groups[j])
+                else:
+                    heapq.heappush(
+                        frontier, (-child_bound[j], next(tiebreak), child, groups[j])
+                    )
+        
+        rows = [row for _, _, row in sorted(best, key=lambda item: (-item[0], item[1]))]
+        return pd.DataFrame(rows, columns=columns)
+
+    def _find_root_causes_cube(
+        self,
+        cube: DimensionCube,
+        normal_start: pd.Timestamp,
+        anomaly_date: pd.Timestamp,
+        kpi_col: str
+    ) -> Dict[str, pd.DataFrame]:
+        """
+        Cube-backed variant of find_root_causes.
+        
+        Args:
+            cube: Precomputed dimension cube
+            normal_start: Start of normal period (inclusive)
+            anomaly_date: Date of the anomaly
+            kpi_col: KPI column to analyze
+            
+        Returns:
+            Dict: {dimension_name: drivers_dataframe}
+        """
+        normal_range = cube.date_range(normal_start, anomaly_date)
+        anomaly_range = cube.date_range(
+            anomaly_date, anomaly_date + timedelta(days=1)
+        )
+        
+        normal_rows, _ = cube.window_total(kpi_col, *normal_range)
+        anomaly_rows, _ = cube.window_total(kpi_col, *anomaly_range)
+        
+        if normal_rows == 0 or anomaly_rows == 0:
+            return {}
+        
+        root_causes = {}
+        
+        for dim_name, (id_col, name_col) in DIMENSIONS.items():
+            if dim_name not in cube.entities:
+                continue
+            
+            drivers = self._analyze_dimension(
+                None,
+                None,
+                id_col,
+                name_col,
+                kpi_col,
+                cube=cube,
+                windows=(normal_range, anomaly_range)
+            )
+            
+            if not drivers.empty:
+                root_causes[dim_name] = drivers
+        
+        return root_causes
+
     def _analyze_dimension(
         self,
-        normal_data: pd.DataFrame,
-        anomaly_data: pd.DataFrame,
+        normal_data: Optional[pd.DataFrame],
+        anomaly_data: Optional[pd.DataFrame],
         id_col: str,
         name_col: str,
-        kpi_col: str
+        kpi_col: str,
+        cube: Optional[DimensionCube] = None,
+        windows: Optional[Tuple[Tuple[int, int], Tuple[int, int]]] = None
     ) -> pd.DataFrame:
         """
         Analyze impact for a single dimension.
         
         Args:
-            normal_data: Normal period data
-            anomaly_data: Anomaly period data
+            normal_data: Normal period data (ignored when cube is given)
+            anomaly_data: Anomaly period data (ignored when cube is given)
             id_col: ID column name
-            name_col: Name column name
+            name_col: Name column name (optional in the data)
             kpi_col: KPI column to analyze
+            cube: Optional precomputed cube to aggregate from
+            windows: (normal_range, anomaly_range) cube prefix indices
             
         Returns:
             pd.DataFrame: Significant drivers
         """
         # Aggregate by dimension
-        normal_agg = normal_data.groupby([id_col, name_col])[kpi_col].sum()
-        anomaly_agg = anomaly_data.groupby([id_col, name_col])[kpi_col].sum()
+        if cube is not None and windows is not None:
+            dim_name = _DIMENSION_BY_ID[id_col]
+            normal_range, anomaly_range = windows
+            normal_agg = cube.window_aggregate(dim_name, kpi_col, *normal_range)
+            anomaly_agg = cube.window_aggregate(dim_name, kpi_col, *anomaly_range)
+            total_change = (
+                cube.window_total(kpi_col, *anomaly_range)[1] -
+                cube.window_total(kpi_col, *normal_range)[1]
+            )
+        else:
+            # Sum in float64 (measures may be stored as float32); observed=True
+            # so categorical names don't expand to a cross product
+            normal_values = normal_data[kpi_col].astype(np.float64)
+            anomaly_values = anomaly_data[kpi_col].astype(np.float64)
+            keys = [col for col in (id_col, name_col) if col in normal_data]
+            normal_agg = normal_values.groupby(
+                [normal_data[col] for col in keys], observed=True
+            ).sum()
+            anomaly_agg = anomaly_values.groupby(
+                [anomaly_data[col] for col in keys], observed=True
+            ).sum()
+            total_change = anomaly_values.sum() - normal_values.sum()
         
+        return self._rank_drivers(normal_agg, anomaly_agg, total_change)
+
+    def _rank_drivers(
+        self,
+        normal_agg: pd.Series,
+        anomaly_agg: pd.Series,
+        total_change: float
+    ) -> pd.DataFrame:
+        """
+        Rank entity-level changes into significant drivers.
+        
+        Args:
+            normal_agg: Normal period KPI sum indexed by (id, name)
+            anomaly_agg: Anomaly day KPI sum indexed by (id, name)
+            total_change: Company-wide change (anomaly - normal)
+            
+        Returns:
+            pd.DataFrame: Top significant drivers
+        """
         # Combine
         comparison = pd.DataFrame({
             'normal_value': normal_agg,
@@ -121,8 +803,6 @@ class RootCauseAnalyzer:
         )
         
         # Calculate contribution
-        total_change = anomaly_data[kpi_col].sum() - normal_data[kpi_col].sum()
-        
         if total_change != 0:
             comparison['contribution_percent'] = (
                 comparison['impact_value'] / total_change * 100
@@ -139,7 +819,8 @@ class RootCauseAnalyzer:
         drivers = drivers.sort_values(
             'contribution_percent', 
             key=abs, 
-            ascending=False
+            ascending=False,
+            kind='stable'
         )
         
         # Reset index to get ID and name as columns
@@ -0,0 +1,423 @@
+"""
+scheduler.py - Scheduler Daemon
+===============================
+Runs the pipeline for each KPI group in SCHEDULE from one long-lived
+process. Imports, pooled connections, cached dimension tables, the loaded
+history and the detectors stay warm between runs, and each run refreshes
+only the dates that changed.
+
+Usage:
+    python scheduler.py
+
+    curl http://127.0.0.1:8765/health           # Status of every group
+    curl -X POST http://127.0.0.1:8765/run/all  # Run one group now
+    curl -X POST http://127.0.0.1:8765/run      # Run every group now
+    kill -USR1 <pid>                            # Run every group now
+"""
+
+import json
+import os
+import queue
+import signal
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, FrozenSet, Optional, Sequence
+
+from config import (
+    SCHEDULE,
+    SCHEDULER_HOST,
+    SCHEDULER_PORT,
+    DETECTOR_STATE_PATH,
+)
+from db_connector import AnomalyDBConnector
+from anomaly_detector import KPIAnomalyDetector
+from root_cause_analyzer import RootCauseAnalyzer
+from main_pipeline import run_pipeline
+
+
+# (name, lowest, highest) of the five cron fields; weekday 0 and 7 are Sunday
+CRON_FIELDS = [
+    ("minute", 0, 59),
+    ("hour", 0, 23),
+    ("day", 1, 31),
+    ("month", 1, 12),
+    ("weekday", 0, 7),
+]
+
+
+def _parse_cron_field(field: str, low: int, high: int) -> FrozenSet[int]:
+    """
+    Values matched by one cron field ("*", "5", "1-5", "*/15", "0,30").
+
+    Args:
+        field: Field text
+        low: Lowest allowed value
+        high: Highest allowed value
+
+    Returns:
+        FrozenSet: Matching values
+    """
+    values = set()
+
+    for part in field.split(","):
+        term, _, step = part.partition("/")
+
+        if term == "*":
+            start, stop = low, high
+        elif "-" in term:
+            start, stop = (int(value) for value in term.split("-", 1))
+        else:
+            start = int(term)
+            stop = high if step else start
+
+        step_size = int(step) if step else 1
+        if not low <= start <= stop <= high or step_size < 1:
+            raise ValueError(f"Invalid cron field {field!r} (allowed {low}-{high})")
+
+        values.update(range(start, stop + 1, step_size))
+
+    return frozenset(values)
+
+
+class CronSpec:
+    """Five-field cron schedule (minute hour day-of-month month day-of-week)."""
+
+    def __init__(self, spec: str):
+        """
+        Parse a cron spec.
+
+        Args:
+            spec: e.g. "*/15 6-22 * * 1-5"
+        """
+        fields = spec.split()
+        if len(fields) != len(CRON_FIELDS):
+            raise ValueError(f"Cron spec needs {len(CRON_FIELDS)} fields: {spec!r}")
+
+        self.spec = spec
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            _parse_cron_field(field, low, high)
+            for field, (_, low, high) in zip(fields, CRON_FIELDS)
+        )
+        self.weekdays = frozenset(day % 7 for day in weekdays)
+
+        # As in cron, a restricted day-of-month OR day-of-week matches
+        self.any_day = fields[2] == "*" or fields[4] == "*"
+
+    def _day_matches(self, moment: datetime) -> bool:
+        """Whether the date of moment is a scheduled day."""
+        in_month = moment.day in self.days
+        # Python counts weekdays from Monday = 0, cron from Sunday = 0
+        in_week = (moment.weekday() + 1) % 7 in self.weekdays
+
+        if self.any_day:
+            return in_month and in_week
+        return in_month or in_week
+
+    def next_after(self, moment: datetime) -> datetime:
+        """
+        First scheduled minute strictly after moment.
+
+        Args:
+            moment: Reference time
+
+        Returns:
+            datetime: Next run time
+        """
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        give_up = candidate.year + 5
+
+        while candidate.year <= give_up:
+            if candidate.month not in self.months:
+                month_start = candidate.replace(day=1, hour=0, minute=0)
+                candidate = (month_start + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(candidate):
+                candidate = candidate.replace(hour=0, minute=0) + timedelta(days=1)
+            elif candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+
+        raise ValueError(f"Cron spec never matches: {self.spec!r}")
+
+
+class ScheduledJob:
+    """One KPI group, when it runs and how its last run went."""
+
+    def __init__(
+        self,
+        name: str,
+        kpis: Sequence[str],
+        interval: Optional[float] = None,
+        cron: Optional[str] = None
+    ):
+        """
+        Initialize a job from its SCHEDULE entry.
+
+        Args:
+            name: Group name
+            kpis: KPI columns of the group
+            interval: Seconds between runs
+            cron: Cron spec (instead of interval)
+        """
+        if (interval is None) == (cron is None):
+            raise ValueError(f"Group {name!r} needs exactly one of interval or cron")
+
+        self.name = name
+        self.kpis = list(kpis)
+        self.interval = interval
+        self.cron = CronSpec(cron) if cron is not None else None
+
+        # Incremental detection checkpoints must not be shared across groups
+        root, ext = os.path.splitext(DETECTOR_STATE_PATH)
+        self.state_path = f"{root}_{name}{ext}"
+
+        self.next_run: Optional[datetime] = None
+        self.last_run: Optional[Dict[str, Any]] = None
+        self.runs = 0
+
+    def start(self, now: datetime) -> None:
+        """Schedule the first run: interval groups at once, cron groups on their spec."""
+        self.next_run = now if self.cron is None else self.cron.next_after(now)
+
+    def advance(self, now: datetime) -> None:
+        """Schedule the run after the current one, skipping missed slots."""
+        if self.cron is not None:
+            self.next_run = self.cron.next_after(now)
+            return
+
+        step = timedelta(seconds=self.interval)
+        self.next_run += step
+        while self.next_run <= now:
+            self.next_run += step
+
+
+class SchedulerDaemon:
+    """Runs scheduled and on-demand pipeline runs in one warm process."""
+
+    def __init__(
+        self,
+        schedule: Dict[str, Dict[str, Any]] = SCHEDULE,
+        db: Optional[AnomalyDBConnector] = None,
+        host: str = SCHEDULER_HOST,
+        port: Optional[int] = SCHEDULER_PORT
+    ):
+        """
+        Initialize the resident connector, detectors and analyzer.
+
+        Args:
+            schedule: {group_name: {kpis, interval | cron}}
+            db: Connector kept open across runs (default: per DB_CONFIG /
+                DB_BACKEND)
+            host: Health/trigger endpoint interface
+            port: Health/trigger endpoint port (None to disable)
+        """
+        self.jobs = {name: ScheduledJob(name, **spec) for name, spec in schedule.items()}
+        if not self.jobs:
+            raise ValueError("SCHEDULE has no groups")
+
+        self.db = db or AnomalyDBConnector()
+        self.analyzer = RootCauseAnalyzer()
+        self.detectors = {
+            name: KPIAnomalyDetector(sensitivity="medium") for name in self.jobs
+        }
+
+        self.host = host
+        self.port = port
+        self.started = datetime.now()
+        self.running: Optional[str] = None
+
+        # SimpleQueue.put is safe to call from a signal handler
+        self.triggers: "queue.SimpleQueue[Optional[str]]" = queue.SimpleQueue()
+        self.stopping = threading.Event()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def trigger(self, name: Optional[str] = None) -> bool:
+        """
+        Queue an on-demand run.
+
+        Args:
+            name: Group to run (default: every group)
+
+        Returns:
+            bool: False if the group is unknown
+        """
+        if name is not None and name not in self.jobs:
+            return False
+
+        for job_name in ([name] if name is not None else self.jobs):
+            self.triggers.put(job_name)
+        return True
+
+    def stop(self) -> None:
+        """Stop after the current run."""
+        self.stopping.set()
+        self.triggers.put(None)  # Wake the loop
+
+    def status(self) -> Dict[str, Any]:
+        """
+        Health snapshot for the endpoint.
+
+        Returns:
+            Dict: Uptime, the running group and every group's schedule and
+                last run
+        """
+        return {
+            'started': self.started.isoformat(timespec='seconds'),
+            'uptime_seconds': round((datetime.now() - self.started).total_seconds()),
+            'running': self.running,
+            'groups': {
+                name: {
+                    'kpis': job.kpis,
+                    'schedule': job.cron.spec if job.cron else f"every {job.interval}s",
+                    'next_run': job.next_run.isoformat(timespec='seconds') if job.next_run else None,
+                    'runs': job.runs,
+                    'last_run': job.last_run,
+                }
+                for name, job in self.jobs.items()
+            },
+        }
+
+    def run_job(self, job: ScheduledJob, reason: str) -> bool:
+        """
+        Run one group's pipeline on the resident state.
+
+        Args:
+            job: Group to run
+            reason: "scheduled" or "triggered", for the log
+
+        Returns:
+            bool: True if the run completed
+        """
+        self.running = job.name
+        started = datetime.now()
+        start = time.perf_counter()
+
+        try:
+            ok = run_pipeline(
+                db=self.db,
+                kpis=job.kpis,
+                detector=self.detectors[job.name],
+                analyzer=self.analyzer,
+                resident=True,
+                detector_state_path=job.state_path,
+                close_db=False
+            )
+        except Exception as e:
+            print(f"  ✗ Group {job.name} failed: {e}")
+            ok = False
+        finally:
+            self.running = None
+
+        seconds = time.perf_counter() - start
+        job.runs += 1
+        job.last_run = {
+            'started': started.isoformat(timespec='seconds'),
+            'reason': reason,
+            'seconds': round(seconds, 3),
+            'ok': ok,
+        }
+
+        mark = "✓" if ok else "✗"
+        print(f"  {mark} Group {job.name} ({reason}) finished in {seconds:.2f}s")
+        return ok
+
+    def serve_forever(self) -> None:
+        """Run groups on schedule and on demand until stopped."""
+        self._install_signal_handlers()
+        self._start_endpoint()
+
+        now = datetime.now()
+        for job in self.jobs.values():
+            job.start(now)
+
+        print(f"  ✓ Scheduler running {len(self.jobs)} group(s): {', '.join(self.jobs)}")
+
+        try:
+            while not self.stopping.is_set():
+                due = min(self.jobs.values(), key=lambda job: job.next_run)
+                wait = max(0.0, (due.next_run - datetime.now()).total_seconds())
+
+                try:
+                    name = self.triggers.get(timeout=wait)
+                except queue.Empty:
+                    self.run_job(due, "scheduled")
+                    due.advance(datetime.now())
+                    continue
+
+                if name is not None:
+                    self.run_job(self.jobs[name], "triggered")
+
+        except KeyboardInterrupt:
+            pass
+
+        finally:
+            if self._server is not None:
+                self._server.shutdown()
+                self._server.server_close()
+            self.db.close()
+            print("  ✓ Scheduler stopped")
+
+    def _install_signal_handlers(self) -> None:
+        """SIGTERM stops after the current run, SIGUSR1 runs every group."""
+        if threading.current_thread() is not threading.main_thread():
+            return  # Embedded in another thread: use trigger() and stop()
+
+        signal.signal(signal.SIGTERM, lambda signum, frame: self.stop())
+        if hasattr(signal, "SIGUSR1"):  # Not on Windows
+            signal.signal(signal.SIGUSR1, lambda signum, frame: self.trigger())
+
+    def _start_endpoint(self) -> None:
+        """Serve GET /health and POST /run[/<group>] on a background thread."""
+        if self.port is None:
+            return
+
+        self._server = ThreadingHTTPServer((self.host, self.port), _handler_for(self))
+        threading.Thread(
+            target=self._server.serve_forever, name="scheduler-endpoint", daemon=True
+        ).start()
+
+        print(f"  ✓ Health/trigger endpoint on http://{self.host}:{self._server.server_port}")
+
+
+def _handler_for(daemon: SchedulerDaemon) -> type:
+    """Request handler class bound to a daemon."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path.rstrip("/") != "/health":
+                self._reply(404, {'error': 'not found'})
+                return
+            self._reply(200, daemon.status())
+
+        def do_POST(self) -> None:
+            parts = self.path.strip("/").split("/")
+            if parts[0] != "run" or len(parts) > 2:
+                self._reply(404, {'error': 'not found'})
+                return
+
+            name = parts[1] if len(parts) == 2 else None
+            if not daemon.trigger(name):
+                self._reply(404, {'error': f"unknown group {name!r}"})
+                return
+            self._reply(202, {'queued': [name] if name else list(daemon.jobs)})
+
+        def _reply(self, code: int, body: Dict[str, Any]) -> None:
+            payload = json.dumps(body).encode()
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass  # Keep the run log readable
+
+    return Handler
+
+
+if __name__ == "__main__":
+    SchedulerDaemon().serve_forever()
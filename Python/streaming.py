@@ -0,0 +1,484 @@
+"""
+streaming.py - Streaming Detection
+==================================
+Consumes fact rows as they arrive (tailed file, socket or in-process
+iterable) and scores the current day continuously, logging anomalies
+through the write-behind writer instead of waiting for the next batch run.
+
+Usage:
+    python streaming.py file PATH [--follow]
+    python streaming.py socket [HOST:]PORT
+
+Events are CSV lines in fact_kpi_metrics column order (see FACT_COLUMNS);
+a header line at the start of a file is skipped.
+"""
+
+import asyncio
+import copy
+import io
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import (
+    AsyncIterable, AsyncIterator, Callable, Dict, Iterable, List, Optional,
+    Set, Tuple
+)
+
+import numpy as np
+import pandas as pd
+
+from config import (
+    KPIS_TO_MONITOR,
+    STREAM_MIN_DAY_FRACTION,
+    STREAM_READ_BYTES,
+    STREAM_POLL_SECONDS,
+    STREAM_QUEUE_BATCHES,
+)
+from db_connector import AnomalyDBConnector
+from anomaly_detector import KPIAnomalyDetector, RollingWindowState
+from write_behind import WriteBehindWriter
+from anomaly_batch import AnomalyBatch
+
+
+# fact_kpi_metrics column order (as written by synthetic_data.iter_facts)
+FACT_COLUMNS = [
+    'metric_date', 'store_id', 'product_id', 'region_id',
+    'revenue', 'profit', 'margin', 'units_sold'
+]
+
+
+def parse_fact_lines(data: bytes, kpi_columns: Iterable[str] = KPIS_TO_MONITOR) -> pd.DataFrame:
+    """
+    Parse complete CSV fact lines, keeping the date and KPI columns.
+
+    Args:
+        data: Newline-terminated CSV lines in FACT_COLUMNS order
+        kpi_columns: KPI columns to keep
+
+    Returns:
+        pd.DataFrame: metric_date and KPI columns
+    """
+    if data.startswith(b"metric_date"):
+        data = data.partition(b"\n")[2]
+
+    frame = pd.read_csv(
+        io.BytesIO(data),
+        names=FACT_COLUMNS,
+        header=None,
+        usecols=['metric_date', *kpi_columns]
+    )
+    frame['metric_date'] = pd.to_datetime(frame['metric_date'], format='%Y-%m-%d')
+
+    return frame
+
+
+def _complete_lines(buffer: bytes) -> Tuple[bytes, bytes]:
+    """Split a buffer into its complete lines and the trailing partial line."""
+    cut = buffer.rfind(b"\n") + 1
+    return buffer[:cut], buffer[cut:]
+
+
+async def tail_file(
+    path: str,
+    follow: bool = True,
+    read_bytes: int = STREAM_READ_BYTES,
+    poll_interval: float = STREAM_POLL_SECONDS
+) -> AsyncIterator[pd.DataFrame]:
+    """
+    Stream fact rows appended to a CSV file.
+
+    Args:
+        path: CSV file
+        follow: Keep polling for appended lines at end of file (like
+            tail -f); otherwise stop at end of file
+        read_bytes: Bytes read per batch
+        poll_interval: Seconds between polls at end of file
+
+    Yields:
+        pd.DataFrame: Parsed batch of fact rows
+    """
+    pending = b""
+
+    with open(path, 'rb') as f:
+        while True:
+            # Local reads of at most read_bytes don't stall the loop
+            chunk = f.read(read_bytes)
+
+            if not chunk:
+                if not follow:
+                    break
+                await asyncio.sleep(poll_interval)
+                continue
+
+            lines, pending = _complete_lines(pending + chunk)
+            if lines:
+                yield parse_fact_lines(lines)
+                await asyncio.sleep(0)
+
+    if pending.strip():
+        yield parse_fact_lines(pending + b"\n")
+
+
+async def socket_source(
+    host: str = "127.0.0.1",
+    port: int = 9009,
+    read_bytes: int = STREAM_READ_BYTES,
+    max_batches: int = STREAM_QUEUE_BATCHES
+) -> AsyncIterator[pd.DataFrame]:
+    """
+    Stream fact rows sent as CSV lines to a local TCP socket.
+
+    Any number of clients may connect; each connection's lines are parsed
+    as they arrive. Readers pause while max_batches parsed batches wait,
+    so a slow consumer bounds memory instead of buffering without limit.
+
+    Args:
+        host: Interface to listen on
+        port: TCP port
+        read_bytes: Bytes read per batch per connection
+        max_batches: Parsed batches buffered for the consumer
+
+    Yields:
+        pd.DataFrame: Parsed batch of fact rows
+    """
+    batches: "asyncio.Queue[pd.DataFrame]" = asyncio.Queue(maxsize=max_batches)
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        pending = b""
+        try:
+            while True:
+                chunk = await reader.read(read_bytes)
+                if not chunk:
+                    break
+                lines, pending = _complete_lines(pending + chunk)
+                if lines:
+                    await batches.put(parse_fact_lines(lines))
+            if pending.strip():
+                await batches.put(parse_fact_lines(pending + b"\n"))
+        except Exception as e:
+            print(f"  ✗ Stream connection error: {e}")
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    print(f"  ✓ Listening for fact events on {host}:{port}")
+
+    try:
+        while True:
+            yield await batches.get()
+    finally:
+        server.close()
+
+
+async def iterable_source(frames: Iterable[pd.DataFrame]) -> AsyncIterator[pd.DataFrame]:
+    """
+    Stream fact frames from an in-process iterable (e.g. iter_facts).
+
+    Args:
+        frames: Fact frames with metric_date and KPI columns
+
+    Yields:
+        pd.DataFrame: The frames, in order
+    """
+    for frame in frames:
+        yield frame
+        await asyncio.sleep(0)
+
+
+class StreamingMonitor:
+    """
+    Online detection over a stream of fact rows.
+
+    Holds running KPI totals for open days plus the detector's per-KPI
+    rolling window state, so memory does not grow with the stream. After
+    every batch, today's totals are projected to a full day and scored.
+    A day is closed once events for a later day arrive. Its final totals
+    are then pushed into the windows and scored as a batch run would
+    score them. Final anomalies are always reported, replacing any
+    projection of the same day (the connector updates the row in place).
+    Projections the final totals don't confirm are collected for
+    retraction (pop_retracted).
+    """
+
+    def __init__(
+        self,
+        detector: Optional[KPIAnomalyDetector] = None,
+        kpi_columns: Iterable[str] = KPIS_TO_MONITOR,
+        min_day_fraction: float = STREAM_MIN_DAY_FRACTION,
+        clock: Callable[[], datetime] = datetime.now
+    ):
+        """
+        Initialize empty day totals.
+
+        Args:
+            detector: Detector whose window state to keep (default: medium)
+            kpi_columns: KPI columns to monitor
+            min_day_fraction: Share of today elapsed before it is scored
+            clock: Current time, for today's date and elapsed share
+        """
+        self.detector = detector or KPIAnomalyDetector(sensitivity="medium")
+        self.kpi_columns = list(kpi_columns)
+        self.min_day_fraction = min_day_fraction
+        self.clock = clock
+
+        self.open_days: Dict[pd.Timestamp, np.ndarray] = {}
+        self.flagged: Set[Tuple[str, pd.Timestamp]] = set()
+        self.retracted: List[Tuple[str, pd.Timestamp]] = []
+        self.events = 0
+        self.late_events = 0
+
+        for kpi in self.kpi_columns:
+            self.detector.states.setdefault(kpi, RollingWindowState(self.detector.window))
+
+        # Columns of detector.update's output, for batches with nothing new
+        self._no_anomalies = self.detector.update(
+            pd.DataFrame({'metric_date': pd.DatetimeIndex([])}), []
+        ).assign(intraday=pd.Series(dtype=bool))
+
+    def warm_up(self, daily: pd.DataFrame, date_column: str = "metric_date") -> None:
+        """
+        Seed the windows with completed daily totals.
+
+        Args:
+            daily: One row per date with KPI totals
+            date_column: Name of date column
+        """
+        daily = daily.sort_values(date_column).tail(self.detector.window)
+
+        for kpi in self.kpi_columns:
+            state = RollingWindowState(self.detector.window)
+            for date, value in zip(daily[date_column], daily[kpi]):
+                state.push(date, float(value))
+            self.detector.states[kpi] = state
+
+    @property
+    def last_closed(self) -> Optional[pd.Timestamp]:
+        """Latest date already pushed into every KPI window."""
+        dates = [self.detector.states[kpi].last_date for kpi in self.kpi_columns]
+        if any(date is None for date in dates):
+            return None
+        return min(dates)
+
+    def ingest(self, facts: pd.DataFrame, date_column: str = "metric_date") -> pd.DataFrame:
+        """
+        Add a batch of fact rows and score what changed.
+
+        Rows for already closed days are counted as late and dropped.
+
+        Args:
+            facts: Fact rows with date and KPI columns
+            date_column: Name of date column
+
+        Returns:
+            pd.DataFrame: New anomalies in detect_many format plus an
+                intraday flag (True for projections of today, False for
+                closed days, including ones projected earlier)
+        """
+        self.events += len(facts)
+
+        last_closed = self.last_closed
+        if last_closed is not None:
+            late = (facts[date_column] <= last_closed).to_numpy()
+            if late.any():
+                self.late_events += int(late.sum())
+                facts = facts[~late]
+
+        daily = facts.groupby(date_column, sort=True)[self.kpi_columns].sum()
+        for date, totals in zip(daily.index, daily.to_numpy(dtype=np.float64)):
+            self.open_days[date] = self.open_days.get(date, 0.0) + totals
+
+        if not self.open_days:
+            return self._no_anomalies
+
+        newest = max(self.open_days)
+        found = [
+            self._close(date)
+            for date in sorted(self.open_days) if date < newest
+        ]
+        found.append(self._score_today(newest))
+
+        return self._anomalies(found)
+
+    def flush(self) -> pd.DataFrame:
+        """
+        Close every open day before today, e.g. at the end of a replay.
+
+        Returns:
+            pd.DataFrame: New anomalies, as for ingest
+        """
+        today = pd.Timestamp(self.clock()).normalize()
+        found = [
+            self._close(date)
+            for date in sorted(self.open_days) if date < today
+        ]
+        return self._anomalies(found)
+
+    def _frame(self, date: pd.Timestamp, totals: np.ndarray) -> pd.DataFrame:
+        """One-row daily totals frame for the detector."""
+        return pd.DataFrame(
+            [totals], columns=self.kpi_columns
+        ).assign(metric_date=date)
+
+    def pop_retracted(self) -> List[Tuple[str, pd.Timestamp]]:
+        """
+        Take the projections that their closed day did not confirm.
+
+        Returns:
+            List: (kpi_name, metric_date) of anomalies reported intraday
+                whose final totals are not anomalous
+        """
+        retracted, self.retracted = self.retracted, []
+        return retracted
+
+    def _close(self, date: pd.Timestamp) -> pd.DataFrame:
+        """Push a finished day into the windows and score its final totals."""
+        totals = self.open_days.pop(date)
+        anomalies = self.detector.update(self._frame(date, totals), self.kpi_columns)
+
+        # Final scores supersede the projection; unconfirmed ones are retracted
+        confirmed = set(anomalies['kpi_name'])
+        self.retracted.extend(
+            (kpi, date) for kpi in self.kpi_columns
+            if (kpi, date) in self.flagged and kpi not in confirmed
+        )
+        self.flagged = {key for key in self.flagged if key[1] > date}
+
+        return anomalies.assign(intraday=False)
+
+    def _score_today(self, date: pd.Timestamp) -> Optional[pd.DataFrame]:
+        """Score today's totals projected to a full day, without pushing them."""
+        now = pd.Timestamp(self.clock())
+        fraction = (now - now.normalize()) / timedelta(days=1)
+
+        if date != now.normalize() or fraction < self.min_day_fraction:
+            return None
+
+        # Score against a copy so the windows only ever see closed days
+        probe = copy.copy(self.detector)
+        probe.states = copy.deepcopy(self.detector.states)
+        anomalies = probe.update(
+            self._frame(date, self.open_days[date] / fraction), self.kpi_columns
+        )
+
+        keep = [(kpi, date) not in self.flagged for kpi in anomalies['kpi_name']]
+        anomalies = anomalies[keep]
+        for kpi in anomalies['kpi_name']:
+            self.flagged.add((kpi, date))
+
+        return anomalies.assign(intraday=True)
+
+    def _anomalies(self, frames: List[Optional[pd.DataFrame]]) -> pd.DataFrame:
+        """Concatenate scored frames, skipping unscored and empty ones."""
+        frames = [frame for frame in frames if frame is not None and not frame.empty]
+        if not frames:
+            return self._no_anomalies
+        return pd.concat(frames, ignore_index=True)
+
+
+async def run_stream(
+    source: AsyncIterable[pd.DataFrame],
+    db: Optional[AnomalyDBConnector] = None,
+    monitor: Optional[StreamingMonitor] = None,
+    warm_start: bool = True
+) -> StreamingMonitor:
+    """
+    Score a stream of fact batches and log anomalies as they are found.
+
+    Args:
+        source: Async iterable of fact frames (tail_file, socket_source,
+            iterable_source or any other)
+        db: Connector to log through (default: per DB_CONFIG / DB_BACKEND)
+        monitor: Streaming state (default: new StreamingMonitor)
+        warm_start: Seed the windows with daily totals up to yesterday
+            from the database
+
+    Returns:
+        StreamingMonitor: Final state, with event counters
+    """
+    if db is None:
+        db = AnomalyDBConnector()
+    if monitor is None:
+        monitor = StreamingMonitor()
+
+    if warm_start:
+        today = pd.Timestamp(monitor.clock()).normalize()
+        daily, _ = db.load_kpi_aggregates(
+            today - timedelta(days=monitor.detector.window),
+            today - timedelta(days=1),
+            monitor.kpi_columns
+        )
+        if not daily.empty:
+            monitor.warm_up(daily)
+            print(f"  ✓ Warmed up on {len(daily)} day(s) of history")
+
+    writer = WriteBehindWriter(db)
+    logged = 0
+    loop = asyncio.get_running_loop()
+
+    async def emit(anomalies: pd.DataFrame) -> None:
+        nonlocal logged
+        # Submits block while the writer's queue is full (backpressure);
+        # wait for room in an executor thread so the loop keeps serving
+        # the source
+        if not anomalies.empty:
+            await loop.run_in_executor(
+                None, writer.submit_batch, AnomalyBatch.from_frame(anomalies)
+            )
+            logged += len(anomalies)
+        for _, row in anomalies.iterrows():
+            label = "projected " if row["intraday"] else ""
+            print(
+                f"  ⚠ {row['kpi_name']} {row['metric_date'].date()}"
+                f"  |  Severity: {row['severity']:<8}"
+                f"  |  Deviation: {label}{row['deviation_percent']:+.1f}%"
+            )
+
+        # Queued behind the projection's write, so it can't be overtaken
+        retracted = monitor.pop_retracted()
+        if retracted:
+            await loop.run_in_executor(None, writer.submit_retraction, retracted)
+            for kpi, date in retracted:
+                print(f"  ✓ {kpi} {date.date()}  |  Projection not confirmed at day close — retracted")
+
+    start = time.perf_counter()
+
+    try:
+        async for facts in source:
+            await emit(monitor.ingest(facts))
+        await emit(monitor.flush())
+    finally:
+        failed_writes = await loop.run_in_executor(None, writer.close)
+
+    elapsed = time.perf_counter() - start
+
+    print(
+        f"  ✓ Streamed {monitor.events:,} event(s) in {elapsed:.1f}s"
+        f" ({monitor.events / max(elapsed, 1e-9):,.0f}/s)"
+        f" — {logged} anomalie(s), {monitor.late_events:,} late event(s) dropped"
+    )
+    if failed_writes:
+        print(f"  ✗ {len(failed_writes)} write(s) failed")
+
+    return monitor
+
+
+def main() -> None:
+    """Stream from the source given on the command line."""
+    if len(sys.argv) < 3 or sys.argv[1] not in ("file", "socket"):
+        print(__doc__)
+        sys.exit(1)
+
+    if sys.argv[1] == "file":
+        source = tail_file(sys.argv[2], follow="--follow" in sys.argv[3:])
+    else:
+        host, _, port = sys.argv[2].rpartition(":")
+        source = socket_source(host or "127.0.0.1", int(port))
+
+    try:
+        asyncio.run(run_stream(source))
+    except KeyboardInterrupt:
+        print("  ✓ Stream stopped")
+
+
+if __name__ == "__main__":
+    main()
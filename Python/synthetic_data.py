@@ -0,0 +1,216 @@
+"""
+synthetic_data.py - Synthetic Data Generator
+============================================
+Vectorized NumPy port of the sample data scripts (SQL/2A, SQL/2B) that
+scales from a few thousand to tens of millions of fact rows.
+"""
+
+import math
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+# Defaults of SQL/2A and SQL/2B
+REGION_NAMES = [
+    ('North America East', 'USA'),
+    ('North America West', 'USA'),
+    ('Europe', 'Multi-Country'),
+    ('Asia Pacific', 'Multi-Country'),
+    ('Latin America', 'Multi-Country'),
+]
+N_STORES = 50
+N_PRODUCTS = 100
+STORES_PER_DAY = 10
+PRODUCTS_PER_DAY = 5
+DAYS = 90
+
+# Share of rows with an injected spike or drop (half each)
+ANOMALY_RATE = 0.10
+
+
+def generate_dimensions(
+    n_stores: int = N_STORES,
+    n_products: int = N_PRODUCTS
+) -> Dict[str, pd.DataFrame]:
+    """
+    Build the dimension tables as populated by SQL/2A.
+
+    Args:
+        n_stores: Number of stores
+        n_products: Number of products
+
+    Returns:
+        Dict: {table_name: frame} for dim_regions, dim_stores, dim_products
+    """
+    store_id = np.arange(1, n_stores + 1)
+    product_id = np.arange(1, n_products + 1)
+
+    return {
+        'dim_regions': pd.DataFrame({
+            'region_id': np.arange(1, len(REGION_NAMES) + 1),
+            'region_name': [name for name, _ in REGION_NAMES],
+            'country': [country for _, country in REGION_NAMES],
+        }),
+        'dim_stores': pd.DataFrame({
+            'store_id': store_id,
+            'store_name': [f"Store_{i:03d}" for i in store_id],
+            'region_id': (store_id - 1) % len(REGION_NAMES) + 1,
+            'store_type': np.array(['Mall', 'Standalone', 'Online'])[store_id % 3],
+        }),
+        'dim_products': pd.DataFrame({
+            'product_id': product_id,
+            'product_name': [f"Product_{i:03d}" for i in product_id],
+            'category': np.array(
+                ['Electronics', 'Clothing', 'Food', 'Home & Garden']
+            )[product_id % 4],
+            'subcategory': [f"Subcategory_{i % 10}" for i in product_id],
+        }),
+    }
+
+
+def scale_for_rows(rows: int, days: int = DAYS) -> Dict[str, int]:
+    """
+    Pick daily store × product sample sizes for a target row count.
+
+    Keeps SQL/2B's 2:1 stores-to-products ratio; the dimension tables grow
+    when a day needs more stores or products than the defaults provide.
+
+    Args:
+        rows: Approximate total fact rows
+        days: Days to generate (SQL/2B covers days + 1 dates)
+
+    Returns:
+        Dict: Keyword arguments for iter_facts / generate_facts
+    """
+    per_day = max(1, math.ceil(rows / (days + 1)))
+    stores_per_day = max(1, round(math.sqrt(per_day * 2)))
+    products_per_day = max(1, math.ceil(per_day / stores_per_day))
+
+    return {
+        'days': days,
+        'stores_per_day': stores_per_day,
+        'products_per_day': products_per_day,
+        'n_stores': max(N_STORES, stores_per_day),
+        'n_products': max(N_PRODUCTS, products_per_day),
+    }
+
+
+def iter_facts(
+    days: int = DAYS,
+    stores_per_day: int = STORES_PER_DAY,
+    products_per_day: int = PRODUCTS_PER_DAY,
+    n_stores: int = N_STORES,
+    n_products: int = N_PRODUCTS,
+    end_date: Optional[Any] = None,
+    seed: int = 42,
+    chunk_rows: int = 1_000_000
+) -> Iterator[pd.DataFrame]:
+    """
+    Generate fact rows with SQL/2B's distribution, in chunks of whole days.
+
+    Each date cross-joins a random sample of stores and products. Revenue
+    is (1000 + U[0, 4000)) × seasonal factor; 10% of rows are multiplied
+    by a spike (2.5-4.0×) or a drop (0.3-0.6×). Margin is U[20, 40), profit
+    is revenue × margin and units_sold is revenue / U[50, 200).
+
+    Every date draws from its own seeded generator, so the output depends
+    only on the arguments (not on chunk_rows).
+
+    Args:
+        days: Days before end_date to start from (inclusive of both ends)
+        stores_per_day: Stores sampled per date
+        products_per_day: Products sampled per date
+        n_stores: Stores in dim_stores
+        n_products: Products in dim_products
+        end_date: Last date (default: today)
+        seed: Random seed
+        chunk_rows: Approximate rows per yielded frame
+
+    Yields:
+        pd.DataFrame: Fact rows in fact_kpi_metrics column order
+    """
+    end = pd.Timestamp(end_date if end_date is not None else pd.Timestamp.today()).normalize()
+    dates = pd.date_range(end - pd.Timedelta(days=days), end, freq='D')
+    per_day = stores_per_day * products_per_day
+    days_per_chunk = max(1, chunk_rows // per_day)
+
+    for lo in range(0, len(dates), days_per_chunk):
+        chunk = dates[lo:lo + days_per_chunk]
+        store_id = np.empty((len(chunk), per_day), dtype=np.int64)
+        product_id = np.empty((len(chunk), per_day), dtype=np.int64)
+        draws = np.empty((len(chunk), 6, per_day))
+
+        for i, date in enumerate(chunk):
+            rng = np.random.default_rng([seed, lo + i])
+            stores = rng.choice(n_stores, stores_per_day, replace=False) + 1
+            products = rng.choice(n_products, products_per_day, replace=False) + 1
+            store_id[i] = np.repeat(stores, products_per_day)
+            product_id[i] = np.tile(products, stores_per_day)
+            draws[i] = rng.random((6, per_day))
+
+        base, pick, spike, drop, margin_u, units_u = (draws[:, k] for k in range(6))
+
+        # DECIMAL(5,2) seasonal factor per date
+        seasonal = np.round(
+            1 + 0.3 * np.sin(2 * np.pi * chunk.dayofyear.to_numpy() / 365.0), 2
+        )[:, None]
+
+        revenue = (1000 + np.floor(base * 4000)) * seasonal
+        is_spike = pick < ANOMALY_RATE / 2
+        is_drop = (pick >= ANOMALY_RATE / 2) & (pick < ANOMALY_RATE)
+        revenue = np.where(is_spike, revenue * (2.5 + np.floor(spike * 150) / 100), revenue)
+        revenue = np.where(is_drop, revenue * (0.3 + np.floor(drop * 30) / 100), revenue)
+        revenue = np.round(revenue, 2)
+
+        margin = 20 + np.floor(margin_u * 20)
+
+        yield pd.DataFrame({
+            'metric_date': np.repeat(chunk.to_numpy(), per_day),
+            'store_id': store_id.ravel(),
+            'product_id': product_id.ravel(),
+            'region_id': (store_id.ravel() - 1) % len(REGION_NAMES) + 1,
+            'revenue': revenue.ravel(),
+            'profit': np.round(revenue * margin / 100, 2).ravel(),
+            'margin': margin.ravel(),
+            'units_sold': (revenue / (50 + np.floor(units_u * 150))).astype(np.int64).ravel(),
+        })
+
+
+def generate_facts(**kwargs: Any) -> pd.DataFrame:
+    """
+    Generate all fact rows in one frame.
+
+    Args:
+        **kwargs: Arguments of iter_facts
+
+    Returns:
+        pd.DataFrame: Fact rows
+    """
+    return pd.concat(iter_facts(**kwargs), ignore_index=True)
+
+
+def generate_dataset(
+    rows: int,
+    days: int = DAYS,
+    seed: int = 42,
+    end_date: Optional[Any] = None
+) -> Tuple[pd.DataFrame, Dict[str, pd.DataFrame]]:
+    """
+    Generate facts and matching dimensions for a target row count.
+
+    Args:
+        rows: Approximate total fact rows (e.g. 10_000 to 50_000_000)
+        days: Days of history
+        seed: Random seed
+        end_date: Last date (default: today)
+
+    Returns:
+        Tuple: (facts, {table_name: dimension_frame})
+    """
+    scale = scale_for_rows(rows, days)
+    facts = generate_facts(**scale, end_date=end_date, seed=seed)
+    dimensions = generate_dimensions(scale['n_stores'], scale['n_products'])
+
+    return facts, dimensions
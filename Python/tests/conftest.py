@@ -0,0 +1,36 @@
+"""
+conftest.py - Shared Test Fixtures
+==================================
+Puts the flat Python/ modules on the import path and provides embedded
+SQLite connectors, so tests run without SQL Server.
+
+Usage (from Python/):
+    python -m pytest -q tests
+"""
+
+import contextlib
+import io
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_backends import create_backend  # noqa: E402
+from db_connector import AnomalyDBConnector  # noqa: E402
+
+
+@pytest.fixture
+def quiet():
+    """Swallow the modules' progress output."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+@pytest.fixture
+def db(tmp_path):
+    """Connector on a fresh embedded SQLite store."""
+    connector = AnomalyDBConnector(backend=create_backend("sqlite", str(tmp_path / "test.db")))
+    yield connector
+    connector.close()
@@ -0,0 +1,127 @@
+"""Columnar anomaly and driver batches against per-row record building."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from anomaly_batch import AnomalyBatch, DriverBatch
+from anomaly_detector import KPIAnomalyDetector
+from root_cause_analyzer import RootCauseAnalyzer
+from synthetic_data import generate_facts
+
+
+def anomaly_record(kpi, row):
+    """Record as the pipeline built it per iterrows() row."""
+    return {
+        "kpi_name": kpi,
+        "metric_date": row["metric_date"].date(),
+        "expected_value": round(float(row["expected_value"]), 2),
+        "actual_value": round(float(row["actual_value"]), 2),
+        "deviation_percent": round(float(row["deviation_percent"]), 2),
+        "z_score": round(float(row["z_score"]), 4),
+        "severity": row["severity"],
+    }
+
+
+def driver_records(date_drivers):
+    """Driver records as the pipeline built them per anomaly date."""
+    if date_drivers is None:
+        return []
+    return [
+        {
+            "driver_type": d_row.driver_type,
+            "entity_id": int(d_row.entity_id),
+            "entity_name": str(d_row.entity_name),
+            "contribution_percent": round(float(d_row.contribution_percent), 2),
+            "impact_value": round(float(d_row.impact_value), 2),
+        }
+        for d_row in date_drivers.itertuples(index=False)
+    ]
+
+
+@pytest.fixture(scope="module")
+def detected():
+    facts = generate_facts(
+        days=200, stores_per_day=8, products_per_day=6, n_stores=20, n_products=15,
+        end_date='2025-03-01'
+    ).assign(store_name=lambda f: 'Store ' + f['store_id'].astype(str))
+    anomalies = KPIAnomalyDetector(sensitivity="high").detect_many(facts, ['revenue', 'profit'])
+    analyzer = RootCauseAnalyzer(min_contribution=2.0)
+    return facts, anomalies, analyzer
+
+
+@pytest.mark.usefixtures("quiet")
+def test_batches_match_per_row_records(detected):
+    facts, anomalies, analyzer = detected
+    batches, driver_batches, records, drivers_per_anomaly = [], [], [], []
+
+    for kpi, kpi_anomalies in anomalies.groupby('kpi_name', sort=False):
+        drivers_long = analyzer.find_root_causes_batch(facts, kpi_anomalies['metric_date'], kpi)
+        by_date = {date: group for date, group in drivers_long.groupby('anomaly_date', sort=False)}
+
+        batch = AnomalyBatch.from_frame(kpi_anomalies, kpi)
+        batches.append(batch)
+        driver_batches.append(DriverBatch.from_frame(drivers_long, batch))
+
+        for _, row in kpi_anomalies.iterrows():
+            records.append(anomaly_record(kpi, row))
+            drivers_per_anomaly.append(driver_records(by_date.get(row['metric_date'])))
+
+    anomaly_batch = AnomalyBatch.concat(batches)
+    driver_batch = DriverBatch.concat(driver_batches, [len(batch) for batch in batches])
+    assert len(records) > 0 and len(driver_batch) > 0
+
+    assert anomaly_batch.rows() == [
+        (r['metric_date'], r['kpi_name'], r['z_score'], r['expected_value'],
+         r['actual_value'], r['deviation_percent'], r['severity'])
+        for r in records
+    ]
+
+    ids = np.arange(1, len(records) + 1)
+    assert driver_batch.rows(ids) == [
+        (anomaly_id, d['driver_type'], d['entity_id'], d['entity_name'],
+         d['contribution_percent'], d['impact_value'])
+        for anomaly_id, drivers in zip(ids.tolist(), drivers_per_anomaly)
+        for d in drivers
+    ]
+
+
+def test_from_records_round_trips(detected):
+    _, anomalies, _ = detected
+    batch = AnomalyBatch.from_frame(anomalies)
+
+    again = AnomalyBatch.from_records([
+        anomaly_record(kpi, row) for kpi, (_, row) in zip(anomalies['kpi_name'], anomalies.iterrows())
+    ])
+
+    assert again.rows() == batch.rows()
+
+
+def test_rounding_and_names_match_records_on_ties():
+    # Decimal ties where np.round (scale, round half to even) and round() differ
+    values = np.array([-1999.995, -1999.975, 2.675, 0.125, 1.005, 1e6 + 0.015])
+    anomalies = pd.DataFrame({
+        'metric_date': pd.date_range('2025-01-01', periods=len(values)),
+        'expected_value': values, 'actual_value': values, 'deviation_percent': values,
+        'z_score': values / 100, 'severity': 'high',
+    })
+    drivers = pd.DataFrame({
+        'anomaly_date': anomalies['metric_date'], 'driver_type': 'store',
+        'entity_id': np.arange(len(values)),
+        'entity_name': pd.Series(['Store 1', None, 'Store 3', np.nan, 7, 'Store 6'], dtype=object),
+        'contribution_percent': values, 'impact_value': values,
+    })
+
+    batch = AnomalyBatch.from_frame(anomalies, 'revenue')
+    driver_batch = DriverBatch.from_frame(drivers, batch)
+
+    assert batch.rows() == [
+        (r['metric_date'], r['kpi_name'], r['z_score'], r['expected_value'],
+         r['actual_value'], r['deviation_percent'], r['severity'])
+        for r in (anomaly_record('revenue', row) for _, row in anomalies.iterrows())
+    ]
+    assert driver_batch.rows(np.arange(1, len(values) + 1)) == [
+        (anomaly_id, d['driver_type'], d['entity_id'], d['entity_name'],
+         d['contribution_percent'], d['impact_value'])
+        for anomaly_id, d in enumerate(driver_records(drivers), start=1)
+    ]
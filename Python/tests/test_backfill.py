@@ -0,0 +1,121 @@
+"""Backfill chunk scheduling, connector lifetime and logged results."""
+
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+import backfill
+from db_backends import create_backend
+from db_connector import AnomalyDBConnector
+from synthetic_data import generate_dimensions, iter_facts
+
+
+@pytest.fixture
+def loads(monkeypatch):
+    """Replace chunk analysis with a recorder of chunks held at once."""
+    state = {'held': 0, 'peak': 0, 'started': 0}
+    lock = threading.Lock()
+
+    def analyze_chunk(db, detector, analyzer, chunk):
+        with lock:
+            state['held'] += 1
+            state['started'] += 1
+            state['peak'] = max(state['peak'], state['held'])
+        time.sleep(0.01)
+        return chunk['n']
+
+    def consumed():
+        with lock:
+            state['held'] -= 1
+
+    monkeypatch.setattr(backfill, 'analyze_chunk', analyze_chunk)
+    state['consumed'] = consumed
+    return state
+
+
+def test_workers_bound_the_chunks_held_at_once(loads):
+    chunks = [{'n': n} for n in range(12)]
+
+    results = []
+    for chunk, result in backfill.iter_backfill(None, chunks, workers=3, detector=object(), analyzer=object()):
+        results.append(result)
+        time.sleep(0.02)
+        loads['consumed']()
+
+    assert results == list(range(12))
+    assert loads['peak'] <= 3
+
+
+def test_closing_early_cancels_unstarted_chunks(loads):
+    chunks = [{'n': n} for n in range(50)]
+
+    results = backfill.iter_backfill(None, chunks, workers=4, detector=object(), analyzer=object())
+    assert next(results)[1] == 0
+    results.close()
+
+    assert loads['started'] <= 5
+
+
+class StubDB:
+    """Connector stand-in recording whether it was closed."""
+
+    def __init__(self, connected=True):
+        self.connected = connected
+        self.closed = False
+
+    def test_connection(self):
+        return self.connected
+
+    def load_metric_dates(self, end_date=None):
+        return pd.date_range('2025-01-01', '2025-03-31')
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.mark.usefixtures("quiet")
+def test_connector_is_closed_when_the_connection_fails(tmp_path):
+    db = StubDB(connected=False)
+    result = backfill.run_backfill(
+        '2025-02-01', '2025-03-31', db=db, checkpoint_path=str(tmp_path / "c.json")
+    )
+
+    assert result is None
+    assert db.closed
+
+
+@pytest.mark.usefixtures("quiet")
+def test_connector_is_closed_when_a_chunk_fails(tmp_path, monkeypatch):
+    monkeypatch.setattr(backfill, 'analyze_chunk', lambda db, detector, analyzer, chunk: None)
+    db = StubDB()
+    result = backfill.run_backfill(
+        '2025-02-01', '2025-03-31', db=db, checkpoint_path=str(tmp_path / "c.json")
+    )
+
+    assert result is None
+    assert db.closed
+
+
+@pytest.mark.usefixtures("quiet")
+def test_backfill_logs_every_chunk_and_closes_the_connector(tmp_path):
+    path = str(tmp_path / "store.db")
+    db = AnomalyDBConnector(backend=create_backend("sqlite", path))
+    for table, frame in generate_dimensions().items():
+        db.load_table(f"dbo.{table}", frame)
+    db.load_table("dbo.fact_kpi_metrics", pd.concat(iter_facts(days=120, end_date='2025-03-31'), ignore_index=True))
+
+    logged = backfill.run_backfill(
+        '2025-01-15', '2025-03-31', db=db, chunk_days=20, workers=2,
+        checkpoint_path=str(tmp_path / "c.json")
+    )
+
+    with pytest.raises(RuntimeError):
+        db.pool.acquire()
+    with sqlite3.connect(path) as conn:
+        anomalies = conn.execute("SELECT COUNT(*) FROM anomaly_log").fetchone()[0]
+        drivers = conn.execute("SELECT COUNT(*) FROM root_cause_drivers").fetchone()[0]
+    assert logged > 0 and anomalies == logged
+    assert drivers > 0
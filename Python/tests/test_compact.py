@@ -0,0 +1,39 @@
+"""Compact KPI frames: float32 measures keep every cent."""
+
+import numpy as np
+import pandas as pd
+
+from db_connector import compact_kpi_frame
+
+
+def cents(rng, low, high, n):
+    return rng.integers(low * 100, high * 100, n) / 100
+
+
+def test_float32_measures_round_trip_to_the_cent():
+    rng = np.random.default_rng(0)
+    n = 200_000
+    frame = pd.DataFrame({
+        'revenue': cents(rng, 0, 100_000, n),
+        'profit': cents(rng, -10_000, 30_000, n),
+        'margin': cents(rng, 0, 60, n),
+        'store_name': rng.choice(['Store_1', 'Store_2'], n),
+    })
+    original = frame.copy()
+
+    compact = compact_kpi_frame(frame)
+
+    assert compact['store_name'].dtype == 'category'
+    for col in ['revenue', 'profit', 'margin']:
+        assert compact[col].dtype == np.float32
+        restored = np.round(compact[col].to_numpy(dtype=np.float64), 2)
+        np.testing.assert_array_equal(restored, original[col].to_numpy())
+
+
+def test_measures_too_large_for_float32_stay_float64():
+    frame = pd.DataFrame({'revenue': [12_345_678.91, 0.01, np.nan]})
+
+    compact = compact_kpi_frame(frame)
+
+    assert compact['revenue'].dtype == np.float64
+    np.testing.assert_array_equal(compact['revenue'], [12_345_678.91, 0.01, np.nan])
@@ -0,0 +1,131 @@
+"""Connection pool checkout, health checks and idle eviction on SQLite."""
+
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from connection_pool import ConnectionPool
+
+
+@pytest.fixture
+def opened():
+    """Raw connections handed to the pool, in order."""
+    connections = []
+    yield connections
+    for conn in connections:
+        conn.close()
+
+
+def pool(opened, **kwargs):
+    def connect():
+        opened.append(sqlite3.connect(":memory:", check_same_thread=False))
+        return opened[-1]
+    return ConnectionPool(connect, **kwargs)
+
+
+def is_open(conn):
+    try:
+        conn.execute("SELECT 1")
+        return True
+    except sqlite3.ProgrammingError:
+        return False
+
+
+def test_connections_are_reused_and_counted(opened):
+    connections = pool(opened, max_size=2, health_check_after=60)
+
+    with connections.connection() as first:
+        first.execute("CREATE TABLE t (x INTEGER)")
+    with connections.connection() as again:
+        again.execute("INSERT INTO t VALUES (1)")
+        rows = again.execute("SELECT x FROM t").fetchall()
+
+    assert rows == [(1,)]
+    assert (connections.connects, connections.reuses, connections.size) == (1, 1, 1)
+    assert connections.round_trips == 4
+    assert len(opened) == 1
+
+
+def test_checkout_times_out_when_pool_is_exhausted(opened):
+    connections = pool(opened, max_size=1, checkout_timeout=0.05)
+    held = connections.acquire()
+
+    start = time.monotonic()
+    with pytest.raises(TimeoutError):
+        connections.acquire()
+
+    assert time.monotonic() - start >= 0.05
+    connections.release(held)
+    assert connections.acquire() is held
+
+
+def test_waiting_checkout_gets_released_connection(opened):
+    connections = pool(opened, max_size=1, checkout_timeout=5)
+    held = connections.acquire()
+
+    releaser = threading.Timer(0.05, connections.release, [held])
+    releaser.start()
+    conn = connections.acquire()
+    releaser.join()
+
+    assert conn is held
+    assert connections.connects == 1
+
+
+def test_stale_connection_is_pinged_and_replaced_when_dead(opened):
+    connections = pool(opened, health_check_after=0)
+
+    with connections.connection():
+        pass
+    with connections.connection() as alive:
+        pass
+    assert connections.reuses == 1
+
+    opened[0].close()
+    with connections.connection() as replacement:
+        replacement.execute("SELECT 1")
+
+    assert replacement is not alive
+    assert (connections.connects, connections.reuses, connections.size) == (2, 1, 1)
+
+
+def test_idle_connections_are_evicted(opened):
+    connections = pool(opened, idle_timeout=0.02, health_check_after=60)
+
+    with connections.connection():
+        pass
+    time.sleep(0.05)
+    with connections.connection():
+        pass
+
+    assert not is_open(opened[0])
+    assert is_open(opened[1])
+    assert (connections.connects, connections.reuses, connections.size) == (2, 0, 1)
+
+
+def test_failed_block_discards_its_connection(opened):
+    connections = pool(opened)
+
+    with pytest.raises(sqlite3.OperationalError):
+        with connections.connection() as conn:
+            conn.execute("SELECT * FROM missing")
+
+    assert connections.size == 0
+    assert not is_open(opened[0])
+
+
+def test_closed_pool_refuses_checkouts(opened):
+    connections = pool(opened)
+    held = connections.acquire()
+    with connections.connection():
+        pass
+
+    connections.close()
+    connections.release(held)
+
+    assert connections.size == 0
+    assert not any(is_open(conn) for conn in opened)
+    with pytest.raises(RuntimeError):
+        connections.acquire()
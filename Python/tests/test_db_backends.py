@@ -0,0 +1,178 @@
+"""Embedded SQLite/DuckDB backends: schema, RETURNING inserts, loading."""
+
+import contextlib
+import io
+
+import pandas as pd
+import pytest
+
+import db_backends
+from anomaly_batch import AnomalyBatch
+from db_backends import LOCAL_INDEXES, create_backend
+from db_connector import AnomalyDBConnector, _date_str
+from root_cause_analyzer import DIMENSIONS
+from synthetic_data import generate_dimensions, generate_facts
+
+TODAY = pd.Timestamp.today().normalize()
+
+KPIS = ['revenue', 'profit', 'units_sold']
+
+
+@pytest.fixture(scope="module")
+def facts():
+    return generate_facts(
+        days=40, stores_per_day=6, products_per_day=4, n_stores=12, n_products=10
+    )
+
+
+@pytest.fixture(params=["sqlite", "duckdb"])
+def store(request, tmp_path):
+    """Connector on a fresh embedded store holding the dimension tables."""
+    if request.param == "duckdb":
+        pytest.importorskip("duckdb")
+    db = AnomalyDBConnector(backend=create_backend(request.param, str(tmp_path / "store.db")))
+    with contextlib.redirect_stdout(io.StringIO()):
+        for table, frame in generate_dimensions().items():
+            db.load_table(f"dbo.{table}", frame)
+    yield db
+    db.close()
+
+
+def execute(db, query, params=()):
+    with db.pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(query, list(params))
+        rows = cursor.fetchall() if cursor.description else None
+        conn.commit()
+    return rows
+
+
+def index_names(db):
+    if isinstance(db.backend, db_backends.DuckDBBackend):
+        return execute(db, "SELECT index_name FROM duckdb_indexes() WHERE schema_name = 'dbo'")
+    return execute(db, "SELECT name FROM dbo.sqlite_master WHERE type = 'index'")
+
+
+def sorted_rows(frame):
+    keys = ['metric_date', 'store_id', 'product_id']
+    return frame.sort_values(keys).reset_index(drop=True)
+
+
+def anomalies(n, kpi='revenue'):
+    return AnomalyBatch.from_records([
+        {
+            'kpi_name': kpi, 'metric_date': (TODAY - pd.Timedelta(days=day)).date(),
+            'expected_value': 100.0, 'actual_value': 150.0 + day,
+            'deviation_percent': 50.0 + day, 'z_score': 3.5, 'severity': 'high',
+        }
+        for day in range(n)
+    ])
+
+
+def test_schema_creates_local_indexes(store):
+    expected = {name for name, _, _ in LOCAL_INDEXES}
+
+    assert expected <= {name for (name,) in index_names(store)}
+
+
+def test_insert_returning_maps_ids_across_chunks(store, monkeypatch):
+    monkeypatch.setattr(db_backends, "MAX_VALUES_ROWS", 4)
+    batch = anomalies(10)
+
+    ids = store.log_anomaly_batch(batch, raise_errors=True)
+
+    logged = execute(store, "SELECT anomaly_id, kpi_type, metric_date FROM dbo.anomaly_log")
+    assert len(set(ids.tolist())) == 10
+    assert {int(i): (kpi, _date_str(date)) for i, kpi, date in logged} == {
+        int(i): (kpi, _date_str(date)) for i, (kpi, date) in zip(ids, batch.keys())
+    }
+    assert store.log_anomaly_batch(batch, raise_errors=True).tolist() == ids.tolist()
+
+
+@pytest.mark.usefixtures("quiet")
+def test_incremental_load_matches_full_load(store, facts):
+    cut = TODAY - pd.Timedelta(days=5)
+    store.load_table("dbo.fact_kpi_metrics", facts[facts['metric_date'] <= cut])
+
+    first = store.load_kpi_data_since()
+    assert store.watermark == cut
+
+    store.load_table("dbo.fact_kpi_metrics", facts[facts['metric_date'] > cut])
+    execute(
+        store, "UPDATE dbo.fact_kpi_metrics SET revenue = revenue + 1000 WHERE metric_date = ?",
+        [_date_str(cut - pd.Timedelta(days=1))]
+    )
+    history = store.load_kpi_data_since(history_days=30)
+
+    expected = store.load_kpi_data(TODAY - pd.Timedelta(days=30), TODAY)
+    assert len(first) > 0 and store.watermark == TODAY
+    pd.testing.assert_frame_equal(sorted_rows(history), sorted_rows(expected))
+
+
+@pytest.mark.usefixtures("quiet")
+def test_incremental_load_without_names_carries_ids_only(store, facts):
+    store.load_table("dbo.fact_kpi_metrics", facts)
+
+    named = store.load_kpi_data_since(history_days=30)
+    ids_only = store.load_kpi_data_since(history_days=30, with_names=False)
+
+    expected = store.load_kpi_data(TODAY - pd.Timedelta(days=30), TODAY, with_names=False)
+    assert 'store_name' in named.columns
+    assert not any(column.endswith('_name') for column in ids_only.columns)
+    pd.testing.assert_frame_equal(sorted_rows(ids_only), sorted_rows(expected))
+
+
+def client_totals(data, keys):
+    """The client-side groupby the pushdown replaces, with row counts."""
+    grouped = data.groupby(keys)
+    totals = grouped[KPIS].sum().astype('float64')
+    totals['row_count'] = grouped.size()
+    return totals.reset_index().sort_values(keys).reset_index(drop=True)
+
+
+@pytest.mark.usefixtures("quiet")
+@pytest.mark.parametrize("with_names", [True, False])
+def test_aggregates_match_client_side_groupby(store, facts, with_names, monkeypatch):
+    monkeypatch.setattr(store, "compact", False)
+    store.load_table("dbo.fact_kpi_metrics", facts)
+    start, end = TODAY - pd.Timedelta(days=30), TODAY - pd.Timedelta(days=2)
+
+    daily, by_dimension = store.load_kpi_aggregates(start, end, KPIS, DIMENSIONS, with_names)
+
+    data = store.load_kpi_data(start, end)
+    pd.testing.assert_frame_equal(
+        daily, client_totals(data, ['metric_date']), check_exact=False, rtol=1e-12
+    )
+    assert by_dimension.keys() == DIMENSIONS.keys()
+    for dim_name, (id_col, name_col) in DIMENSIONS.items():
+        keys = ['metric_date', id_col] + ([name_col] if with_names else [])
+        actual = by_dimension[dim_name].sort_values(keys).reset_index(drop=True)
+        pd.testing.assert_frame_equal(
+            actual[keys + KPIS + ['row_count']], client_totals(data, keys),
+            check_exact=False, rtol=1e-12
+        )
+
+
+@pytest.mark.usefixtures("quiet")
+def test_incremental_aggregates_match_full_aggregates(store, facts):
+    cut = TODAY - pd.Timedelta(days=5)
+    store.load_table("dbo.fact_kpi_metrics", facts[facts['metric_date'] <= cut])
+    store.load_kpi_aggregates_since(cut, KPIS, DIMENSIONS, history_days=30)
+
+    store.load_table("dbo.fact_kpi_metrics", facts[facts['metric_date'] > cut])
+    execute(
+        store, "UPDATE dbo.fact_kpi_metrics SET revenue = revenue + 1000 WHERE metric_date = ?",
+        [_date_str(cut - pd.Timedelta(days=1))]
+    )
+    daily, by_dimension = store.load_kpi_aggregates_since(TODAY, KPIS, DIMENSIONS, history_days=30)
+
+    expected_daily, expected_dimensions = store.load_kpi_aggregates(
+        TODAY - pd.Timedelta(days=30), TODAY, KPIS, DIMENSIONS
+    )
+    pd.testing.assert_frame_equal(daily, expected_daily)
+    for dim_name, (id_col, _) in DIMENSIONS.items():
+        keys = ['metric_date', id_col]
+        pd.testing.assert_frame_equal(
+            by_dimension[dim_name].sort_values(keys).reset_index(drop=True),
+            expected_dimensions[dim_name].sort_values(keys).reset_index(drop=True)
+        )
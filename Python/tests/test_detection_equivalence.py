@@ -0,0 +1,101 @@
+"""Fast detection paths against the reference implementations they replace."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import anomaly_detector
+from anomaly_detector import MAD_SCALE, KPIAnomalyDetector, _rolling_median_mad
+from synthetic_data import generate_facts
+
+KPIS = ['revenue', 'profit', 'units_sold']
+
+
+@pytest.fixture(scope="module")
+def facts():
+    return generate_facts(
+        days=400, stores_per_day=6, products_per_day=5, n_stores=20, n_products=15,
+        end_date='2025-03-01'
+    )
+
+
+@pytest.fixture(scope="module")
+def daily(facts):
+    return facts.groupby('metric_date', as_index=False)[KPIS].sum()
+
+
+def detector(method="zscore", numpy_kernel=True):
+    return KPIAnomalyDetector(sensitivity="high", method=method, numpy_kernel=numpy_kernel)
+
+
+@pytest.mark.usefixtures("quiet")
+@pytest.mark.parametrize("method", ["zscore", "robust"])
+def test_kernel_matches_frame_detection(daily, method):
+    shuffled = daily.sample(frac=1.0, random_state=3)
+
+    expected = detector(method, numpy_kernel=False).detect_anomalies(shuffled, 'revenue')
+    actual = detector(method, numpy_kernel=True).detect_anomalies(shuffled, 'revenue')
+
+    assert len(expected) > 0
+    pd.testing.assert_frame_equal(actual, expected, check_exact=True)
+
+
+@pytest.mark.usefixtures("quiet")
+def test_kernel_matches_frame_detection_on_constant_stretches():
+    values = np.r_[np.full(40, 500.0), 900.0, np.full(40, 500.0), np.linspace(500, 700, 40), 50.0]
+    values[[10, 60]] = np.nan
+    frame = pd.DataFrame({
+        'metric_date': pd.date_range('2025-01-01', periods=len(values)), 'revenue': values,
+    })
+
+    expected = detector(numpy_kernel=False).detect_anomalies(frame, 'revenue')
+    actual = detector(numpy_kernel=True).detect_anomalies(frame, 'revenue')
+
+    assert len(expected) > 0
+    pd.testing.assert_frame_equal(actual, expected, check_exact=True)
+
+
+def brute_force_median_mad(values, window, min_periods):
+    median = np.full_like(values, np.nan)
+    mad = np.full_like(values, np.nan)
+    for t in range(len(values)):
+        for j in range(values.shape[1]):
+            seen = values[max(0, t - window + 1):t + 1, j]
+            seen = seen[~np.isnan(seen)]
+            if len(seen) >= min_periods:
+                median[t, j] = np.median(seen)
+                mad[t, j] = np.median(np.abs(seen - median[t, j])) * MAD_SCALE
+    return median, mad
+
+
+@pytest.mark.parametrize("n, k, block_cells", [
+    (120, 3, 1 << 22), (5000, 1, 1 << 22), (0, 2, 1 << 22),
+    (120, 7, 28 * 100), (90, 5, 28 * 7),
+])
+def test_rolling_median_mad_matches_brute_force(n, k, block_cells, monkeypatch):
+    monkeypatch.setattr(anomaly_detector, "MEDIAN_BLOCK_CELLS", block_cells)
+    rng = np.random.default_rng(n)
+    values = np.round(rng.normal(1000, 50, (n, k)), 1)
+    values[rng.random((n, k)) < 0.05] = np.nan
+
+    median, mad = _rolling_median_mad(values, 28, 7)
+    expected_median, expected_mad = brute_force_median_mad(values, 28, 7)
+
+    np.testing.assert_allclose(median, expected_median, rtol=1e-12)
+    np.testing.assert_allclose(mad, expected_mad, rtol=1e-12)
+
+
+@pytest.mark.usefixtures("quiet")
+@pytest.mark.parametrize("method", ["zscore", "robust"])
+def test_detect_many_matches_detection_per_kpi(facts, daily, method):
+    many = detector(method).detect_many(facts, KPIS)
+
+    for kpi in KPIS:
+        expected = detector(method, numpy_kernel=False).detect_anomalies(daily, kpi)
+        actual = many[many['kpi_name'] == kpi]
+
+        assert len(actual) == len(expected)
+        np.testing.assert_array_equal(actual['metric_date'], expected['metric_date'])
+        for column in ['rolling_mean', 'rolling_std', 'z_score', 'deviation_percent', 'actual_value']:
+            np.testing.assert_allclose(actual[column], expected[column], rtol=1e-9)
+        assert actual['severity'].tolist() == expected['severity'].tolist()
@@ -0,0 +1,67 @@
+"""Detector checkpoints: resume only when the data covers the checkpoint."""
+
+import numpy as np
+import pandas as pd
+
+from anomaly_detector import KPIAnomalyDetector
+
+
+def daily(start, days):
+    return pd.DataFrame({
+        'metric_date': pd.date_range(start, periods=days),
+        'revenue': 1000.0 + np.random.default_rng(1).normal(0, 20, days),
+    })
+
+
+def test_checkpoint_inside_the_data_resumes(tmp_path, capsys):
+    path = str(tmp_path / "state.json")
+    history = daily('2025-01-01', 90)
+    KPIAnomalyDetector().detect_incremental(history.iloc[:60], ['revenue'], state_path=path)
+    capsys.readouterr()
+
+    KPIAnomalyDetector().detect_incremental(history, ['revenue'], state_path=path)
+
+    assert "scoring 30 new date(s)" in capsys.readouterr().out
+
+
+def test_checkpoint_before_the_data_recomputes(tmp_path, capsys):
+    path = str(tmp_path / "state.json")
+    KPIAnomalyDetector().detect_incremental(daily('2025-01-01', 60), ['revenue'], state_path=path)
+    capsys.readouterr()
+
+    later = daily('2025-06-01', 60)
+    anomalies = KPIAnomalyDetector().detect_incremental(later, ['revenue'], state_path=path)
+
+    assert "full recompute" in capsys.readouterr().out
+    expected = KPIAnomalyDetector().detect_many(later, ['revenue'])
+    pd.testing.assert_frame_equal(anomalies, expected)
+
+
+def test_resident_state_is_used_without_reading_the_checkpoint(tmp_path, capsys, monkeypatch):
+    path = str(tmp_path / "state.json")
+    history = daily('2025-01-01', 90)
+    detector = KPIAnomalyDetector()
+    detector.detect_incremental(history.iloc[:60], ['revenue'], state_path=path)
+    capsys.readouterr()
+
+    def load_state(path):
+        raise AssertionError("checkpoint read while resident state matches")
+
+    monkeypatch.setattr(detector, "load_state", load_state)
+    detector.detect_incremental(history, ['revenue'], state_path=path)
+
+    assert "scoring 30 new date(s)" in capsys.readouterr().out
+
+
+def test_resident_state_not_matching_the_data_reloads_the_checkpoint(tmp_path, capsys):
+    path = str(tmp_path / "state.json")
+    history = daily('2025-01-01', 90)
+    KPIAnomalyDetector().detect_incremental(history.iloc[:60], ['revenue'], state_path=path)
+
+    detector = KPIAnomalyDetector()
+    detector.detect_incremental(daily('2025-06-01', 60), ['revenue'], state_path=str(tmp_path / "other.json"))
+    capsys.readouterr()
+
+    detector.detect_incremental(history, ['revenue'], state_path=path)
+
+    assert "scoring 30 new date(s)" in capsys.readouterr().out
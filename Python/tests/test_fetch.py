@@ -0,0 +1,64 @@
+"""Columnar fetch against pd.read_sql on SQLite."""
+
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from db_connector import KPI_DATA_DTYPES, fetch_columnar
+
+
+@pytest.fixture
+def cursor():
+    conn = sqlite3.connect(":memory:")
+    conn.execute(
+        "CREATE TABLE facts (metric_date TEXT, store_id INTEGER, revenue REAL, "
+        "units_sold INTEGER, store_name TEXT)"
+    )
+    rng = np.random.default_rng(0)
+    rows = [
+        (f"2025-01-{1 + i % 28:02d}", int(rng.integers(1, 50)), round(float(rng.uniform(1, 5000)), 2),
+         int(rng.integers(0, 100)), f"Store_{i % 7}")
+        for i in range(2500)
+    ]
+    rows[1700] = ("2025-02-01", None, None, 5, None)  # NULLs in a late batch
+    conn.executemany("INSERT INTO facts VALUES (?, ?, ?, ?, ?)", rows)
+    yield conn.cursor()
+    conn.close()
+
+
+def test_matches_read_sql_across_batches_and_nulls(cursor):
+    query = "SELECT * FROM facts"
+    expected = pd.read_sql(query, cursor.connection)
+
+    cursor.execute(query)
+    columns = fetch_columnar(cursor, KPI_DATA_DTYPES, batch_size=1000)
+
+    assert columns['metric_date'].dtype == np.dtype('datetime64[ns]')
+    assert columns['units_sold'].dtype == np.int64
+    assert columns['store_id'].dtype == np.float64  # NULL in an integer column
+    assert columns['store_name'][1700] is None
+    actual = pd.DataFrame(columns)
+    pd.testing.assert_frame_equal(
+        actual.drop(columns='metric_date'), expected.drop(columns='metric_date'), check_dtype=False
+    )
+    np.testing.assert_array_equal(columns['metric_date'], pd.to_datetime(expected['metric_date']).to_numpy())
+
+
+def test_repeated_strings_share_one_object(cursor):
+    cursor.execute("SELECT store_name FROM facts")
+    names = fetch_columnar(cursor, {}, batch_size=1000)['store_name']
+
+    assert len({id(name) for name in names[:1000]}) == 7
+
+
+def test_empty_result_keeps_column_types(cursor):
+    cursor.execute("SELECT * FROM facts WHERE 0")
+    columns = fetch_columnar(cursor, KPI_DATA_DTYPES)
+
+    assert {name: column.dtype for name, column in columns.items()} == {
+        'metric_date': np.dtype('datetime64[ns]'), 'store_id': np.int64,
+        'revenue': np.float64, 'units_sold': np.int64, 'store_name': object,
+    }
+    assert all(len(column) == 0 for column in columns.values())
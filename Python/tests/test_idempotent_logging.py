@@ -0,0 +1,137 @@
+"""Idempotent anomaly logging: known-anomaly filtering and the upsert."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import main_pipeline
+from anomaly_batch import AnomalyBatch, DriverBatch
+from backfill import run_backfill
+from db_backends import create_backend
+from db_connector import AnomalyDBConnector
+from synthetic_data import generate_dimensions, iter_facts
+
+DETECTED_COLUMNS = [
+    'metric_date', 'kpi_name', 'rolling_mean', 'rolling_std', 'z_score', 'is_anomaly',
+    'anomaly_score', 'expected_value', 'actual_value', 'deviation_percent', 'severity'
+]
+
+
+def anomaly(date, z_score=3.5, actual=1000.0, severity='high'):
+    return {
+        'kpi_name': 'revenue', 'metric_date': pd.Timestamp(date), 'expected_value': 800.0,
+        'actual_value': actual, 'deviation_percent': (actual - 800.0) / 8.0,
+        'z_score': z_score, 'severity': severity,
+    }
+
+
+def driver(entity_id, contribution=60.0):
+    return {
+        'driver_type': 'store', 'entity_id': entity_id, 'entity_name': f"Store {entity_id}",
+        'contribution_percent': contribution, 'impact_value': 120.0,
+    }
+
+
+def fetch(db, query):
+    with db.pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(query)
+        return cursor.fetchall()
+
+
+def test_split_known_anomalies_keeps_columns_when_nothing_detected():
+    empty = pd.DataFrame({column: [] for column in DETECTED_COLUMNS})
+
+    kept = main_pipeline.split_known_anomalies(empty, {})
+
+    assert list(kept.columns) == DETECTED_COLUMNS
+    assert kept.empty
+    assert kept[kept["kpi_name"] == "revenue"].empty
+
+
+def test_split_known_anomalies_drops_unchanged_keeps_changed():
+    detected = pd.DataFrame([anomaly('2025-01-05'), anomaly('2025-01-06', z_score=4.5)])
+    known = {
+        ('revenue', pd.Timestamp('2025-01-05')): (1, 3.5, 1000.0, 'high'),
+        ('revenue', pd.Timestamp('2025-01-06')): (2, 3.5, 1000.0, 'high'),
+    }
+
+    kept = main_pipeline.split_known_anomalies(detected, known)
+
+    assert kept['metric_date'].tolist() == [pd.Timestamp('2025-01-06')]
+
+
+def test_relogging_a_batch_writes_nothing_new(db):
+    records = [anomaly('2025-01-05'), anomaly('2025-01-06')]
+    batch = AnomalyBatch.from_records(records)
+    drivers = DriverBatch.from_records([[driver(1)], [driver(2), driver(3)]])
+
+    first = db.log_anomaly_batch(batch, drivers)
+    second = db.log_anomaly_batch(batch, drivers)
+
+    np.testing.assert_array_equal(first, second)
+    assert fetch(db, "SELECT COUNT(*) FROM dbo.anomaly_log")[0][0] == 2
+    assert fetch(db, "SELECT COUNT(*) FROM dbo.root_cause_drivers")[0][0] == 3
+
+
+def test_changed_anomaly_is_updated_in_place_keeping_triage(db):
+    (anomaly_id,) = db.log_anomaly_batch(
+        AnomalyBatch.from_records([anomaly('2025-01-05')]),
+        DriverBatch.from_records([[driver(1)]])
+    )
+    with db.pool.connection() as conn:
+        conn.execute(
+            "UPDATE dbo.anomaly_log SET status = 'investigating', assigned_to = 'ops' "
+            "WHERE anomaly_id = ?", [int(anomaly_id)]
+        )
+        conn.commit()
+
+    revised = db.log_anomaly_batch(
+        AnomalyBatch.from_records([anomaly('2025-01-05', z_score=5.0, actual=1300.0, severity='critical')]),
+        DriverBatch.from_records([[driver(7), driver(8)]])
+    )
+
+    assert revised.tolist() == [anomaly_id]
+    assert fetch(db, "SELECT anomaly_id, anomaly_score, actual_value, severity, status, assigned_to "
+                     "FROM dbo.anomaly_log") == [(anomaly_id, 5.0, 1300.0, 'critical', 'investigating', 'ops')]
+    assert fetch(db, "SELECT anomaly_id, driver_entity_id FROM dbo.root_cause_drivers "
+                     "ORDER BY driver_entity_id") == [(anomaly_id, 7), (anomaly_id, 8)]
+
+
+def test_failed_upsert_rolls_back_everything(db):
+    db.log_anomaly_batch(AnomalyBatch.from_records([anomaly('2025-01-05')]), DriverBatch.from_records([[driver(1)]]))
+    changed = AnomalyBatch.from_records([anomaly('2025-01-05', z_score=5.0), anomaly('2025-01-06')])
+    broken = DriverBatch.from_records([[driver(2)], [driver(3)]])
+    broken.entity_name = np.array(['Store 2', None], dtype=object)  # NOT NULL violation
+
+    assert db.log_anomaly_batch(changed, broken) is None
+    assert fetch(db, "SELECT metric_date, anomaly_score FROM dbo.anomaly_log") == [('2025-01-05', 3.5)]
+    assert fetch(db, "SELECT driver_entity_id FROM dbo.root_cause_drivers") == [(1,)]
+
+
+@pytest.mark.usefixtures("quiet")
+def test_pipeline_then_backfill_logs_each_anomaly_once(tmp_path):
+    path = str(tmp_path / "store.db")
+
+    def connect():
+        return AnomalyDBConnector(backend=create_backend("sqlite", path))
+
+    seed = connect()
+    for table, frame in generate_dimensions().items():
+        seed.load_table(f"dbo.{table}", frame)
+    facts = pd.concat(iter_facts(days=80), ignore_index=True)
+    seed.load_table("dbo.fact_kpi_metrics", facts)
+
+    assert main_pipeline.run_pipeline(connect())
+    before = fetch(connect(), "SELECT kpi_type, metric_date FROM dbo.anomaly_log ORDER BY 1, 2")
+    assert before
+
+    dates = pd.to_datetime(facts['metric_date'])
+    assert run_backfill(
+        dates.min(), dates.max(), db=connect(), chunk_days=30,
+        checkpoint_path=str(tmp_path / "backfill.json"), resume=False
+    ) is not None
+
+    after = fetch(connect(), "SELECT kpi_type, metric_date FROM dbo.anomaly_log ORDER BY 1, 2")
+    assert len(after) == len(set(after))
+    assert set(before) <= set(after)
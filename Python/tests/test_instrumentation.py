@@ -0,0 +1,41 @@
+"""Run reports: per-run database counters on a long-lived connector."""
+
+import pandas as pd
+import pytest
+
+from instrumentation import Instrumentation
+
+
+def run(db):
+    instrumentation = Instrumentation(enabled=True, profile=None)
+    instrumentation.instrument_connector(db)
+    db.load_kpi_data('2025-01-01', '2025-01-31')
+    return instrumentation.report(db)['counters']
+
+
+def test_statements_and_fetches_are_round_trips(db):
+    before = db.pool.round_trips
+    with db.pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1")
+        cursor.fetchall()
+        conn.execute("SELECT 2").fetchone()
+
+    assert db.pool.round_trips - before == 4
+
+
+@pytest.mark.usefixtures("quiet")
+def test_resident_connector_reports_each_run_alone(db):
+    db.load_table("dbo.fact_kpi_metrics", pd.DataFrame({
+        'metric_date': pd.to_datetime(['2025-01-05']), 'store_id': [1], 'product_id': [1],
+        'region_id': [1], 'revenue': [10.0], 'profit': [2.0], 'margin': [20.0], 'units_sold': [1],
+    }))
+
+    first = run(db)
+    second = run(db)
+
+    assert first['db_round_trips'] > 0
+    assert second['db_round_trips'] == first['db_round_trips']
+    assert second['db_connects'] == 0
+    assert second['db_checkouts'] == 1
+    assert 'process_peak_rss_bytes' in second
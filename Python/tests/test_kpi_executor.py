@@ -0,0 +1,28 @@
+"""Per-KPI executor: results in KPI order on every backend."""
+
+import multiprocessing
+
+import pandas as pd
+import pytest
+
+from kpi_executor import KPIExecutor
+
+KPIS = ['revenue', 'orders', 'units', 'margin', 'returns']
+
+
+@pytest.mark.parametrize("backend", ["thread", "process"])
+def test_results_match_a_sequential_run(backend):
+    if backend == "process" and "fork" not in multiprocessing.get_all_start_methods():
+        pytest.skip("fork unavailable")
+    frame = pd.DataFrame({kpi: range(i, i + 10) for i, kpi in enumerate(KPIS)})
+
+    def total(kpi):
+        return int(frame[kpi].sum())
+
+    with KPIExecutor(workers=3, backend=backend) as executor:
+        results = list(executor.map(total, KPIS))
+    with KPIExecutor(workers=3, backend=backend) as executor:
+        again = list(executor.map(lambda kpi: kpi.upper(), KPIS))
+
+    assert results == [total(kpi) for kpi in KPIS]
+    assert again == [kpi.upper() for kpi in KPIS]
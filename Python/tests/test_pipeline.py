@@ -0,0 +1,67 @@
+"""End-to-end pipeline runs on a seeded SQLite store."""
+
+import contextlib
+import io
+
+import pandas as pd
+
+import main_pipeline
+from anomaly_detector import KPIAnomalyDetector
+from db_backends import create_backend
+from db_connector import AnomalyDBConnector
+from synthetic_data import generate_dimensions, iter_facts
+
+
+def run(path, **kwargs):
+    """Run the pipeline on a freshly seeded store; return its output."""
+    db = AnomalyDBConnector(backend=create_backend("sqlite", path))
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        for table, frame in generate_dimensions().items():
+            db.load_table(f"dbo.{table}", frame)
+        db.load_table("dbo.fact_kpi_metrics", pd.concat(iter_facts(days=80), ignore_index=True))
+        assert main_pipeline.run_pipeline(db, **kwargs)
+    return output.getvalue()
+
+
+def drill_downs(output):
+    """Lines of every Drill-down block in a run's output."""
+    report, inside = [], False
+    for line in output.splitlines():
+        if line.strip() == "Drill-down:":
+            inside = True
+        elif not (inside and line.startswith("       ")):
+            inside = False
+            continue
+        report.append(line)
+    return report
+
+
+def test_drill_down_under_pushdown_matches_fact_row_loading(tmp_path, monkeypatch):
+    monkeypatch.setattr(main_pipeline, "DRILL_DOWN", True)
+
+    monkeypatch.setattr(main_pipeline, "AGGREGATION_PUSHDOWN", True)
+    pushdown = run(str(tmp_path / "pushdown.db"))
+    monkeypatch.setattr(main_pipeline, "AGGREGATION_PUSHDOWN", False)
+    fact_rows = run(str(tmp_path / "facts.db"))
+
+    assert "fact row(s) for drill-down" in pushdown
+    assert drill_downs(pushdown)
+    assert drill_downs(pushdown) == drill_downs(fact_rows)
+
+
+def test_segment_anomalies_are_written(tmp_path, monkeypatch, quiet):
+    monkeypatch.setattr(main_pipeline, "SEGMENT_DETECTION", True)
+    path = tmp_path / "segments.csv"
+
+    output = run(str(tmp_path / "store.db"), segment_anomalies_path=str(path))
+
+    segments = pd.read_csv(path)
+    assert f"Segment anomalies written to {path}" in output
+    assert not segments.empty
+    assert set(segments["segment_type"]) <= {"store", "product", "region"}
+    assert set(segments["severity"]) <= {"low", "medium", "high", "critical"}
+    detector = KPIAnomalyDetector()
+    assert segments["severity"].tolist() == [
+        detector._classify_severity(z) for z in segments["z_score"]
+    ]
@@ -0,0 +1,91 @@
+"""Cube-backed and batched root causes against the fact-row scan."""
+
+import pandas as pd
+import pytest
+
+from root_cause_analyzer import DIMENSIONS, DimensionCube, RootCauseAnalyzer
+from synthetic_data import generate_facts
+
+KPIS = ['revenue', 'profit']
+
+
+@pytest.fixture(scope="module")
+def facts():
+    facts = generate_facts(
+        days=90, stores_per_day=8, products_per_day=6, n_stores=20, n_products=15,
+        end_date='2025-03-01'
+    )
+    return facts.assign(
+        store_name='Store ' + facts['store_id'].astype(str),
+        product_name='Product ' + facts['product_id'].astype(str),
+        region_name='Region ' + facts['region_id'].astype(str),
+    )
+
+
+@pytest.fixture(scope="module")
+def analyzer():
+    return RootCauseAnalyzer(min_contribution=2.0)
+
+
+# First date has no normal window; the last one is past the data
+DATES = pd.to_datetime(['2024-12-01', '2025-01-10', '2025-02-03', '2025-03-01', '2025-03-05'])
+
+
+def long_format(root_causes, date):
+    """find_root_causes output in find_root_causes_batch layout."""
+    frames = []
+    for dim_name, drivers in root_causes.items():
+        id_col, name_col = DIMENSIONS[dim_name]
+        frames.append(pd.DataFrame({
+            'anomaly_date': date,
+            'driver_type': dim_name,
+            'entity_id': drivers[id_col].to_numpy(),
+            'entity_name': drivers[name_col].to_numpy(),
+            'normal_value': drivers['normal_value'].to_numpy(),
+            'anomaly_value': drivers['anomaly_value'].to_numpy(),
+            'impact_value': drivers['impact_value'].to_numpy(),
+            'contribution_percent': drivers['contribution_percent'].to_numpy(),
+        }))
+    return frames
+
+
+@pytest.mark.usefixtures("quiet")
+@pytest.mark.parametrize("kpi", KPIS)
+def test_cube_matches_fact_scan(facts, analyzer, kpi):
+    cube = DimensionCube(facts, KPIS)
+
+    for date in DATES:
+        expected = analyzer.find_root_causes(facts, date, kpi)
+        actual = analyzer.find_root_causes(facts, date, kpi, cube=cube)
+
+        assert actual.keys() == expected.keys()
+        for dim_name in expected:
+            pd.testing.assert_frame_equal(
+                actual[dim_name].reset_index(drop=True), expected[dim_name].reset_index(drop=True),
+                check_exact=False, rtol=1e-9, check_dtype=False
+            )
+
+
+@pytest.mark.usefixtures("quiet")
+@pytest.mark.parametrize("kpi", KPIS)
+def test_batch_matches_one_call_per_date(facts, analyzer, kpi):
+    expected = pd.concat(
+        [frame for date in DATES for frame in long_format(analyzer.find_root_causes(facts, date, kpi), date)],
+        ignore_index=True
+    )
+
+    actual = analyzer.find_root_causes_batch(facts, DATES, kpi)
+
+    assert len(expected) > 0
+    pd.testing.assert_frame_equal(actual, expected, check_exact=False, rtol=1e-9, check_dtype=False)
+
+
+@pytest.mark.usefixtures("quiet")
+def test_batch_without_dimensions_is_empty(facts, analyzer):
+    drivers = analyzer.find_root_causes_batch(facts[['metric_date', 'revenue']], DATES, 'revenue')
+
+    assert drivers.empty
+    assert list(drivers.columns) == [
+        'anomaly_date', 'driver_type', 'entity_id', 'entity_name',
+        'normal_value', 'anomaly_value', 'impact_value', 'contribution_percent',
+    ]
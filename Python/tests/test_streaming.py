@@ -0,0 +1,137 @@
+"""Streaming monitor: intraday projections are corrected at day close."""
+
+import asyncio
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import streaming
+from anomaly_detector import KPIAnomalyDetector
+from streaming import StreamingMonitor, iterable_source, run_stream
+from write_behind import WriteBehindWriter
+
+TODAY = pd.Timestamp('2025-03-01')
+
+
+def monitor():
+    history = pd.DataFrame({
+        'metric_date': pd.date_range(end=TODAY - pd.Timedelta(days=1), periods=60),
+        'revenue': 1000.0 + np.random.default_rng(0).normal(0, 20, 60),
+    })
+    streaming = StreamingMonitor(
+        KPIAnomalyDetector(sensitivity='medium'), kpi_columns=['revenue'],
+        min_day_fraction=0.1, clock=lambda: datetime(2025, 3, 1, 6)
+    )
+    streaming.warm_up(history)
+    return streaming
+
+
+def facts(*rows):
+    return pd.DataFrame(rows, columns=['metric_date', 'revenue'])
+
+
+def stream(db, batches):
+    streaming = monitor()
+    asyncio.run(run_stream(iterable_source(batches), db=db, monitor=streaming, warm_start=False))
+    with db.pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT kpi_type, metric_date, actual_value FROM dbo.anomaly_log")
+        return cursor.fetchall()
+
+
+def test_projection_is_flagged_once_and_retracted_when_day_closes_normal():
+    streaming = monitor()
+
+    projected = streaming.ingest(facts((TODAY, 400.0)))
+    again = streaming.ingest(facts((TODAY, 10.0)))
+    closed = streaming.ingest(facts((TODAY, 590.0), (TODAY + pd.Timedelta(days=1), 50.0)))
+
+    assert projected[['kpi_name', 'intraday']].values.tolist() == [['revenue', True]]
+    assert projected['actual_value'].iloc[0] == pytest.approx(1600.0)
+    assert again.empty
+    assert closed.empty
+    assert streaming.pop_retracted() == [('revenue', TODAY)]
+    assert streaming.pop_retracted() == []
+
+
+def test_closed_day_reports_final_values_of_a_projected_anomaly():
+    streaming = monitor()
+
+    streaming.ingest(facts((TODAY, 400.0)))
+    closed = streaming.ingest(facts((TODAY, 1600.0), (TODAY + pd.Timedelta(days=1), 50.0)))
+
+    assert closed[['kpi_name', 'intraday']].values.tolist() == [['revenue', False]]
+    assert closed['actual_value'].iloc[0] == pytest.approx(2000.0)
+    assert streaming.pop_retracted() == []
+
+
+@pytest.mark.usefixtures("quiet")
+def test_unconfirmed_projection_is_deleted_from_the_log(db):
+    logged = stream(db, [
+        facts((TODAY, 400.0)),
+        facts((TODAY, 600.0), (TODAY + pd.Timedelta(days=1), 50.0)),
+    ])
+
+    assert logged == []
+
+
+@pytest.mark.usefixtures("quiet")
+def test_confirmed_projection_is_updated_to_the_final_value(db):
+    logged = stream(db, [
+        facts((TODAY, 400.0)),
+        facts((TODAY, 1600.0), (TODAY + pd.Timedelta(days=1), 50.0)),
+    ])
+
+    assert logged == [('revenue', '2025-03-01', 2000.0)]
+
+
+class SlowDB:
+    """Connector stand-in whose writes wait until released."""
+
+    def __init__(self):
+        self.released = threading.Event()
+
+    def log_anomaly_batch(self, anomalies, drivers, raise_errors=False):
+        self.released.wait(timeout=5)
+        return list(range(1, len(anomalies) + 1))
+
+    def retract_anomalies(self, keys, raise_errors=False):
+        return len(keys)
+
+
+@pytest.mark.usefixtures("quiet")
+def test_full_write_queue_does_not_block_the_event_loop(monkeypatch):
+    writers = []
+
+    def writer(db):
+        writers.append(WriteBehindWriter(db, max_queue=1))
+        return writers[-1]
+
+    monkeypatch.setattr(streaming, "WriteBehindWriter", writer)
+    db = SlowDB()
+    day = pd.Timedelta(days=1)
+
+    async def main():
+        async def release_when_queue_is_full():
+            while not (writers and writers[0]._queue.full()):
+                await asyncio.sleep(0.001)
+            # Still scheduled while the next submit waits for room
+            await asyncio.sleep(0.05)
+            db.released.set()
+
+        releaser = asyncio.create_task(release_when_queue_is_full())
+        await run_stream(
+            iterable_source([facts((TODAY + n * day, 5000.0)) for n in range(4)]),
+            db=db, monitor=monitor(), warm_start=False
+        )
+        await releaser
+
+    start = time.perf_counter()
+    asyncio.run(main())
+
+    assert time.perf_counter() - start < 4
+    assert writers[0].anomalies_written == 4
@@ -0,0 +1,51 @@
+"""Write-behind writer: failed writes carry the database error."""
+
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from anomaly_batch import AnomalyBatch, DriverBatch
+from write_behind import WriteBehindWriter, WriteError
+
+
+def anomaly(date):
+    return {
+        'kpi_name': 'revenue', 'metric_date': pd.Timestamp(date), 'expected_value': 800.0,
+        'actual_value': 1000.0, 'deviation_percent': 25.0, 'z_score': 3.5, 'severity': 'high',
+    }
+
+
+def driver(entity_name):
+    return {
+        'driver_type': 'store', 'entity_id': 1, 'entity_name': entity_name,
+        'contribution_percent': 60.0, 'impact_value': 120.0,
+    }
+
+
+def test_failed_batch_chains_the_database_error(db):
+    drivers = DriverBatch.from_records([[driver('Store 1')]])
+    drivers.entity_name = np.array([None], dtype=object)  # NOT NULL violation
+
+    with WriteBehindWriter(db) as writer:
+        future = writer.submit_batch(AnomalyBatch.from_records([anomaly('2025-01-05')]), drivers)
+        with pytest.raises(WriteError) as raised:
+            future.result(timeout=10)
+
+    assert isinstance(raised.value.__cause__, sqlite3.IntegrityError)
+    (failure,) = writer.failures
+    assert failure['exception'] is raised.value
+    assert 'NOT NULL' in failure['error']
+
+
+def test_failed_queued_anomaly_fails_its_drivers_with_the_same_cause(db):
+    with WriteBehindWriter(db) as writer:
+        anomaly_future = writer.submit_anomaly(anomaly('2025-01-05'))
+        broken = {**driver('Store 1'), 'driver_type': None}  # NOT NULL violation
+        drivers_future = writer.submit_root_causes(anomaly_future, [broken])
+        writer.flush()
+
+    for future in (anomaly_future, drivers_future):
+        assert isinstance(future.exception().__cause__, sqlite3.IntegrityError)
+    assert [failure['kind'] for failure in writer.failures] == ['anomaly', 'drivers']
@@ -0,0 +1,370 @@
+"""
+write_behind.py - Write-Behind Writer
+=====================================
+Background queue that batches anomaly and root cause writes so detection
+never waits on the database.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import WRITE_BATCH_SIZE, WRITE_FLUSH_SECONDS, WRITE_QUEUE_SIZE
+from anomaly_batch import AnomalyBatch, DriverBatch
+
+
+class WriteError(Exception):
+    """Raised through a write future when its batch could not be written."""
+
+
+def _write_error(message: str, cause: Exception) -> WriteError:
+    """WriteError for a failed write, chained to the error that caused it."""
+    try:
+        raise WriteError(f"{message}: {cause}") from cause
+    except WriteError as error:
+        return error
+
+
+class _Flush:
+    """Queue marker asking the writer thread to flush now."""
+
+    def __init__(self):
+        self.done = threading.Event()
+
+
+_STOP = object()
+
+
+class WriteBehindWriter:
+    """
+    Batched background writer in front of AnomalyDBConnector.
+    
+    Producers enqueue anomalies and root causes and get futures back; a
+    dedicated thread drains the bounded queue and writes batches with
+    log_anomalies_bulk once WRITE_BATCH_SIZE writes are pending or the oldest
+    has waited WRITE_FLUSH_SECONDS. Root causes reference their anomaly's
+    future, so they can be queued before the anomaly id exists. Columnar
+    batches from submit_batch skip the batching and go straight to
+    log_anomaly_batch.
+    """
+
+    def __init__(
+        self,
+        db: Any,
+        batch_size: int = WRITE_BATCH_SIZE,
+        flush_interval: float = WRITE_FLUSH_SECONDS,
+        max_queue: int = WRITE_QUEUE_SIZE
+    ):
+        """
+        Start the writer thread.
+        
+        Args:
+            db: AnomalyDBConnector (or compatible) to write through
+            batch_size: Pending writes that trigger a flush
+            flush_interval: Max seconds a write waits before a flush
+            max_queue: Queue bound; submit blocks when full (backpressure)
+        """
+        self.db = db
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.failures: List[Dict[str, Any]] = []
+        self.anomalies_written = 0
+        self.drivers_written = 0
+        
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_queue)
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run, name="write-behind", daemon=True
+        )
+        self._thread.start()
+
+    def __enter__(self) -> "WriteBehindWriter":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def submit_anomaly(self, record: Dict[str, Any]) -> "Future[int]":
+        """
+        Queue an anomaly insert.
+        
+        Args:
+            record: Anomaly dictionary as for log_anomaly
+            
+        Returns:
+            Future: Resolves to the anomaly_id, or raises WriteError
+        """
+        future: "Future[int]" = Future()
+        self._put(('anomaly', record, future))
+        return future
+
+    def submit_root_causes(
+        self,
+        anomaly_future: "Future[int]",
+        drivers: List[Dict[str, Any]]
+    ) -> "Future[int]":
+        """
+        Queue root cause drivers for an anomaly that may not be written yet.
+        
+        Args:
+            anomaly_future: Future returned by submit_anomaly
+            drivers: Driver dictionaries without anomaly_id
+            
+        Returns:
+            Future: Resolves to the number of drivers written, or raises
+                WriteError
+        """
+        future: "Future[int]" = Future()
+        self._put(('drivers', (anomaly_future, drivers), future))
+        return future
+
+    def submit_batch(
+        self,
+        anomalies: AnomalyBatch,
+        drivers: Optional[DriverBatch] = None
+    ) -> "Future[np.ndarray]":
+        """
+        Queue a columnar batch of anomalies and drivers, written as is in
+        one transaction (after any writes queued before it).
+        
+        Args:
+            anomalies: Anomalies, one row per (kpi_name, metric_date)
+            drivers: Their root cause drivers
+            
+        Returns:
+            Future: Resolves to the anomaly ids in row order, or raises
+                WriteError
+        """
+        future: "Future[np.ndarray]" = Future()
+        self._put(('batch', (anomalies, drivers), future))
+        return future
+
+    def submit_retraction(self, keys: List[Tuple[str, Any]]) -> "Future[int]":
+        """
+        Queue deleting logged anomalies by key, after every write queued
+        before it (so a retraction never overtakes the row it removes).
+        
+        Args:
+            keys: (kpi_name, metric_date) of the anomalies to delete
+            
+        Returns:
+            Future: Resolves to the number of rows deleted, or raises
+                WriteError
+        """
+        future: "Future[int]" = Future()
+        self._put(('retract', keys, future))
+        return future
+
+    def flush(self) -> None:
+        """Block until everything queued so far has been written."""
+        marker = _Flush()
+        self._put(marker)
+        marker.done.wait()
+
+    def close(self) -> List[Dict[str, Any]]:
+        """
+        Flush remaining writes and stop the writer thread.
+        
+        Returns:
+            List: Failed writes ({kind, key, error, exception}) over the
+                writer's lifetime; exception is the WriteError, chained to
+                the database error behind it
+        """
+        if not self._closed:
+            self._put(_STOP)
+            self._closed = True
+            self._thread.join()
+        
+        return self.failures
+
+    def _put(self, item: Any) -> None:
+        """Enqueue an item, blocking while the queue is full."""
+        if self._closed:
+            raise RuntimeError("Writer is closed")
+        self._queue.put(item)
+
+    def _run(self) -> None:
+        """Writer thread: collect batches and flush by size or age."""
+        pending: List[Tuple[str, Any, Future]] = []
+        pending_keys = set()
+        deadline = 0.0
+        
+        while True:
+            timeout = max(0.0, deadline - time.monotonic()) if pending else None
+            
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                self._flush_batch(pending)
+                pending, pending_keys = [], set()
+                continue
+            
+            if item is _STOP or isinstance(item, _Flush):
+                self._flush_batch(pending)
+                pending, pending_keys = [], set()
+                if item is _STOP:
+                    return
+                item.done.set()
+                continue
+            
+            kind, payload, future = item
+            
+            # Already a batch, or a retraction: run it on its own, in queue order
+            if kind in ('batch', 'retract'):
+                self._flush_batch(pending)
+                pending, pending_keys = [], set()
+                if kind == 'batch':
+                    self._write_columnar(payload, future)
+                else:
+                    self._retract(payload, future)
+                continue
+            
+            # One key per batch, so returned ids map back unambiguously
+            if kind == 'anomaly':
+                key = (payload['kpi_name'], payload['metric_date'])
+                if key in pending_keys:
+                    self._flush_batch(pending)
+                    pending, pending_keys = [], set()
+                pending_keys.add(key)
+            
+            if not pending:
+                deadline = time.monotonic() + self.flush_interval
+            pending.append(item)
+            
+            if len(pending) >= self.batch_size:
+                self._flush_batch(pending)
+                pending, pending_keys = [], set()
+
+    def _flush_batch(self, batch: List[Tuple[str, Any, Future]]) -> None:
+        """Write a batch; unexpected errors fail its futures, not the thread."""
+        try:
+            self._write_batch(batch)
+        except Exception as e:
+            for kind, payload, future in batch:
+                if not future.done():
+                    key = (payload['kpi_name'], payload['metric_date']) if kind == 'anomaly' else None
+                    self._fail(kind, key, _write_error("Batch not written", e), future)
+
+    def _write_columnar(
+        self,
+        payload: Tuple[AnomalyBatch, Optional[DriverBatch]],
+        future: Future
+    ) -> None:
+        """Write one submitted batch and resolve its future."""
+        anomalies, drivers = payload
+        
+        try:
+            anomaly_ids = self.db.log_anomaly_batch(anomalies, drivers, raise_errors=True)
+        except Exception as e:
+            error = _write_error(f"Batch of {len(anomalies)} anomalies not written", e)
+            self._fail('batch', None, error, future)
+            return
+        
+        future.set_result(anomaly_ids)
+        self.anomalies_written += len(anomalies)
+        self.drivers_written += len(drivers) if drivers is not None else 0
+
+    def _retract(self, keys: List[Tuple[str, Any]], future: Future) -> None:
+        """Delete retracted anomalies and resolve the future."""
+        try:
+            deleted = self.db.retract_anomalies(keys, raise_errors=True)
+        except Exception as e:
+            self._fail('retract', None, _write_error(f"{len(keys)} anomalies not retracted", e), future)
+            return
+        
+        future.set_result(deleted)
+
+    def _write_batch(self, batch: List[Tuple[str, Any, Future]]) -> None:
+        """
+        Write one batch: new anomalies with their drivers in a single bulk
+        transaction, plus drivers of anomalies written in earlier batches.
+        
+        Args:
+            batch: Queued (kind, payload, future) items
+        """
+        if not batch:
+            return
+        
+        records = []
+        key_of: Dict[Future, Tuple[str, Any]] = {}
+        drivers_by_key: Dict[Tuple[str, Any], List[Dict[str, Any]]] = {}
+        driver_futures: Dict[Tuple[str, Any], List[Tuple[Future, int]]] = {}
+        late: List[Tuple[Future, List[Dict[str, Any]], Future]] = []
+        
+        for kind, payload, future in batch:
+            if kind == 'anomaly':
+                key = (payload['kpi_name'], payload['metric_date'])
+                records.append(payload)
+                key_of[future] = key
+                drivers_by_key.setdefault(key, [])
+                driver_futures.setdefault(key, [])
+            else:
+                anomaly_future, drivers = payload
+                key = key_of.get(anomaly_future)
+                if key is None:
+                    late.append((anomaly_future, drivers, future))
+                else:
+                    drivers_by_key[key].extend(drivers)
+                    driver_futures[key].append((future, len(drivers)))
+        
+        # New anomalies and their drivers, one transaction
+        if records:
+            try:
+                anomaly_ids = self.db.log_anomalies_bulk(records, drivers_by_key, raise_errors=True)
+                cause = None
+            except Exception as e:
+                anomaly_ids, cause = {}, e
+            
+            for anomaly_future, key in key_of.items():
+                if key not in anomaly_ids:
+                    if cause is not None:
+                        error = _write_error(f"Anomaly {key} not written", cause)
+                    else:
+                        error = WriteError(f"Anomaly {key} not written")
+                    self._fail('anomaly', key, error, anomaly_future)
+                    for future, _ in driver_futures[key]:
+                        self._fail('drivers', key, error, future)
+                    continue
+                
+                anomaly_future.set_result(anomaly_ids[key])
+                self.anomalies_written += 1
+                for future, count in driver_futures[key]:
+                    future.set_result(count)
+                    self.drivers_written += count
+        
+        # Drivers whose anomaly was written by an earlier batch
+        late_rows = []
+        late_ok = []
+        for anomaly_future, drivers, future in late:
+            if anomaly_future.exception() is not None:
+                self._fail('drivers', None, _write_error("Anomaly not written", anomaly_future.exception()), future)
+                continue
+            anomaly_id = anomaly_future.result()
+            late_rows.extend({**d, 'anomaly_id': anomaly_id} for d in drivers)
+            late_ok.append((future, len(drivers)))
+        
+        if late_ok:
+            try:
+                self.db.log_root_causes(late_rows, raise_errors=True)
+            except Exception as e:
+                for future, _ in late_ok:
+                    self._fail('drivers', None, _write_error("Root causes not written", e), future)
+            else:
+                for future, count in late_ok:
+                    future.set_result(count)
+                    self.drivers_written += count
+
+    def _fail(
+        self,
+        kind: str,
+        key: Optional[Tuple[str, Any]],
+        error: Exception,
+        future: Future
+    ) -> None:
+        """Record a failed write and propagate it through its future."""
+        self.failures.append({'kind': kind, 'key': key, 'error': str(error), 'exception': error})
+        future.set_exception(error)
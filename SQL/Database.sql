@@ -117,6 +117,7 @@ Go
 
 Create index idx_anomaly_date ON dbo.anomaly_log(metric_date);
 Create Index idx_anomaly_kpi ON dbo.anomaly_log(Kpi_type);
+Create Index idx_anomaly_kpi_date ON dbo.anomaly_log(Kpi_type, metric_date);
 Create Index idx_anomaly_severity ON dbo.anomaly_log(severity);
 Create Index idx_anomaly_status ON dbo.anomaly_log(status);
 Create index idx_anomaly_detection_date ON dbo.anomaly_log(detection_date);